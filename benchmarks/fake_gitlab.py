@@ -0,0 +1,526 @@
+import functools
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import List, NamedTuple, Optional
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import dateutil.parser
+import pytz
+
+
+@functools.lru_cache(maxsize=None)
+def _parse_timestamp(timestamp: str) -> datetime:
+    """
+    Parses a timestamp, taken to be UTC if it has no offset. Records are
+    filtered on every list request, so each timestamp is parsed once.
+    """
+
+    parsed = dateutil.parser.parse(timestamp)
+    return parsed if parsed.tzinfo else pytz.utc.localize(parsed)
+
+
+class InstanceSize(NamedTuple):
+    """
+    Size of a synthetic GitLab instance, per project where it applies.
+    """
+
+    projects: int = 20
+    members: int = 10
+    issues: int = 20
+    merge_requests: int = 20
+    merged_branches: int = 5
+
+
+class FakeGitLab:
+    """
+    Synthetic GitLab instance generated from a seed, holding the records
+    that the fake server lists and updates.
+    """
+
+    def __init__(self, size: InstanceSize, seed: int = 0):
+        self.size = size
+        self.seed = seed
+        self.reset()
+
+    def reset(self):
+        """
+        Regenerates the instance, discarding any updates made to it.
+        """
+
+        rng = random.Random(self.seed)
+        now = pytz.utc.localize(datetime.utcnow())
+        user_count = max(self.size.members * 4, 1)
+        self.users = {
+            user_id: {
+                "id": user_id,
+                "username": f"user{user_id}",
+                "name": f"User {user_id}",
+                "state": "active",
+            }
+            for user_id in range(1, user_count + 1)
+        }
+        self.projects = {}
+        self.members = {}
+        self.issues = {}
+        self.merge_requests = {}
+        self.merged_branches = {}
+        self.notes = 0
+
+        for project_id in range(1, self.size.projects + 1):
+            self.projects[project_id] = {
+                "id": project_id,
+                "name": f"project-{project_id}",
+                "path_with_namespace": f"group/project-{project_id}",
+            }
+            self.members[project_id] = [
+                self.users[user_id]
+                for user_id in rng.sample(
+                    sorted(self.users), min(self.size.members, user_count)
+                )
+            ]
+            self.merged_branches[project_id] = self.size.merged_branches
+
+            for iid in range(1, self.size.issues + 1):
+                assignee = (
+                    rng.choice(self.members[project_id])
+                    if self.members[project_id] and rng.random() < 0.5
+                    else None
+                )
+                created_at = now - timedelta(days=rng.randint(0, 60))
+                due_date = (
+                    (now + timedelta(days=rng.randint(-14, 14))).strftime(
+                        "%Y-%m-%d"
+                    )
+                    if rng.random() < 0.5
+                    else None
+                )
+                self.issues[(project_id, iid)] = {
+                    "id": project_id * 100000 + iid,
+                    "iid": iid,
+                    "project_id": project_id,
+                    "title": f"Issue {iid}",
+                    "description": "x" * rng.randint(0, 500),
+                    "state": "opened",
+                    "created_at": created_at.isoformat(),
+                    "updated_at": created_at.isoformat(),
+                    "due_date": due_date,
+                    "author": rng.choice(list(self.users.values())),
+                    "assignee": assignee,
+                    "assignees": [assignee] if assignee else [],
+                }
+
+            for iid in range(1, self.size.merge_requests + 1):
+                assignee = (
+                    rng.choice(self.members[project_id])
+                    if self.members[project_id] and rng.random() < 0.5
+                    else None
+                )
+                created_at = now - timedelta(days=rng.randint(0, 30))
+                self.merge_requests[(project_id, iid)] = {
+                    "id": project_id * 100000 + iid,
+                    "iid": iid,
+                    "project_id": project_id,
+                    "title": f"Merge request {iid}",
+                    "description": "x" * rng.randint(0, 500),
+                    "state": "opened",
+                    "created_at": created_at.isoformat(),
+                    "updated_at": created_at.isoformat(),
+                    "work_in_progress": rng.random() < 0.2,
+                    "merge_status": rng.choice(
+                        ("can_be_merged", "cannot_be_merged")
+                    ),
+                    "author": rng.choice(list(self.users.values())),
+                    "assignee": assignee,
+                    "assignees": [assignee] if assignee else [],
+                }
+
+    def list_records(self, records: dict, query: dict) -> List[dict]:
+        """
+        Returns the records matching the list filters GitLab supports.
+        """
+
+        state = query.get("state", "all")
+        wip = query.get("wip")
+        assignee_id = query.get("assignee_id")
+        created_before = query.get("created_before")
+        updated_after = query.get("updated_after")
+        if created_before:
+            created_before = _parse_timestamp(created_before)
+        if updated_after:
+            updated_after = _parse_timestamp(updated_after)
+
+        matches = []
+        for record in records.values():
+            if state != "all" and record["state"] != state:
+                continue
+            if wip and record["work_in_progress"] != (wip == "yes"):
+                continue
+            if assignee_id == "None" and record["assignee"]:
+                continue
+            if assignee_id == "Any" and not record["assignee"]:
+                continue
+            if created_before and (
+                _parse_timestamp(record["created_at"]) >= created_before
+            ):
+                continue
+            if updated_after and (
+                _parse_timestamp(record["updated_at"]) <= updated_after
+            ):
+                continue
+            matches.append(record)
+        return matches
+
+    def assign(self, record: dict, user_id: int) -> dict:
+        """
+        Assigns a record to a user, as GitLab does on an update.
+        """
+
+        user = self.users.get(user_id)
+        record["assignee"] = user
+        record["assignees"] = [user] if user else []
+        record["updated_at"] = pytz.utc.localize(datetime.utcnow()).isoformat()
+        return record
+
+
+class ServerStats:
+    """
+    Counts of the requests served and bytes transferred.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.by_method = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self, method: str, status: int, bytes_sent: int, bytes_received: int
+    ):
+        with self._lock:
+            self.requests += 1
+            self.by_method[method] = self.by_method.get(method, 0) + 1
+            self.bytes_sent += bytes_sent
+            self.bytes_received += bytes_received
+            if status >= 500:
+                self.errors += 1
+            if status == 304:
+                self.not_modified += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "not_modified": self.not_modified,
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "by_method": dict(self.by_method),
+            }
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class FakeGitLabServer:
+    """
+    Local HTTP server speaking the parts of the GitLab v4 REST API that
+    the GitLab Attendant uses, with GitLab's pagination and ETag headers.
+    Every response can be delayed, and a fraction of them replaced with
+    server errors.
+    """
+
+    ROUTES = (
+        ("GET", re.compile(r"^/api/v4/projects$"), "_projects"),
+        ("GET", re.compile(r"^/api/v4/projects/(\d+)$"), "_project"),
+        ("GET", re.compile(r"^/api/v4/projects/(\d+)/members$"), "_members"),
+        ("GET", re.compile(r"^/api/v4/users/(\d+)$"), "_user"),
+        ("GET", re.compile(r"^/api/v4/issues$"), "_issues"),
+        ("GET", re.compile(r"^/api/v4/merge_requests$"), "_merge_requests"),
+        (
+            "GET",
+            re.compile(r"^/api/v4/projects/(\d+)/issues/(\d+)$"),
+            "_issue",
+        ),
+        (
+            "GET",
+            re.compile(r"^/api/v4/projects/(\d+)/merge_requests/(\d+)$"),
+            "_merge_request",
+        ),
+        (
+            "PUT",
+            re.compile(r"^/api/v4/projects/(\d+)/issues/(\d+)$"),
+            "_update_issue",
+        ),
+        (
+            "PUT",
+            re.compile(r"^/api/v4/projects/(\d+)/merge_requests/(\d+)$"),
+            "_update_merge_request",
+        ),
+        (
+            "POST",
+            re.compile(
+                r"^/api/v4/projects/(\d+)/(?:issues|merge_requests)/(\d+)/notes$"
+            ),
+            "_add_note",
+        ),
+        (
+            "DELETE",
+            re.compile(r"^/api/v4/projects/(\d+)/repository/merged_branches$"),
+            "_delete_merged_branches",
+        ),
+    )
+
+    def __init__(
+        self,
+        instance: FakeGitLab,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.instance = instance
+        self.latency = latency
+        self.error_rate = error_rate
+        self.stats = ServerStats()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _ThreadingHTTPServer(
+            ("127.0.0.1", 0), self._handler_class()
+        )
+        self._thread = None
+
+    @property
+    def address(self) -> str:
+        """
+        Host and port the server listens on, as passed to --ip.
+        """
+
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def start(self) -> "FakeGitLabServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset(self):
+        """
+        Restores the instance to its generated state and clears the stats.
+        """
+
+        with self._lock:
+            self.instance.reset()
+        self.stats = ServerStats()
+
+    def __enter__(self) -> "FakeGitLabServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def handle(
+        self, method: str, path: str, body: bytes, headers
+    ) -> (int, dict, Optional[bytes]):
+        """
+        Returns the status, headers and body of the response to a request.
+        """
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            inject_error = self._rng.random() < self.error_rate
+        if inject_error:
+            return 500, {}, b'{"message": "500 Internal Server Error"}'
+
+        url = urlsplit(path)
+        query = {
+            name: values[-1] for name, values in parse_qs(url.query).items()
+        }
+        form = {
+            name: values[-1]
+            for name, values in parse_qs(body.decode("utf-8")).items()
+        }
+
+        for route_method, pattern, handler_name in self.ROUTES:
+            match = pattern.match(url.path)
+            if match and route_method == method:
+                with self._lock:
+                    result = getattr(self, handler_name)(
+                        *(int(group) for group in match.groups()),
+                        query=query,
+                        form=form,
+                    )
+                    status, payload, page_headers = (
+                        result if len(result) == 3 else result + ({},)
+                    )
+                    response_body = json.dumps(payload).encode("utf-8")
+                break
+        else:
+            return 404, {}, b'{"message": "404 Not Found"}'
+
+        response_headers = dict(page_headers)
+        if method == "GET" and status == 200:
+            etag = f'W/"{hashlib.md5(response_body).hexdigest()}"'
+            response_headers["ETag"] = etag
+            if headers.get("If-None-Match") == etag:
+                return 304, response_headers, None
+        return status, response_headers, response_body
+
+    def _paginate(self, url_path: str, records: list, query: dict):
+        per_page = min(int(query.get("per_page", 20)), 100)
+        page = max(int(query.get("page", 1)), 1)
+        total_pages = max((len(records) + per_page - 1) // per_page, 1)
+        headers = {
+            "X-Page": str(page),
+            "X-Per-Page": str(per_page),
+            "X-Total": str(len(records)),
+            "X-Total-Pages": str(total_pages),
+        }
+        if page < total_pages:
+            headers["X-Next-Page"] = str(page + 1)
+            next_url = f"http://{self.address}{url_path}?" + urlencode(
+                {**query, "page": page + 1}
+            )
+            headers["Link"] = f'<{next_url}>; rel="next"'
+        return (
+            200,
+            records[(page - 1) * per_page : page * per_page],
+            headers,
+        )
+
+    def _projects(self, query, form):
+        return self._paginate(
+            "/api/v4/projects", list(self.instance.projects.values()), query
+        )
+
+    def _project(self, project_id, query, form):
+        project = self.instance.projects.get(project_id)
+        if project is None:
+            return 404, {"message": "404 Project Not Found"}
+        return 200, project
+
+    def _members(self, project_id, query, form):
+        if project_id not in self.instance.members:
+            return 404, {"message": "404 Project Not Found"}
+        return self._paginate(
+            f"/api/v4/projects/{project_id}/members",
+            self.instance.members[project_id],
+            query,
+        )
+
+    def _user(self, user_id, query, form):
+        user = self.instance.users.get(user_id)
+        if user is None:
+            return 404, {"message": "404 User Not Found"}
+        return 200, user
+
+    def _issues(self, query, form):
+        return self._paginate(
+            "/api/v4/issues",
+            self.instance.list_records(self.instance.issues, query),
+            query,
+        )
+
+    def _merge_requests(self, query, form):
+        return self._paginate(
+            "/api/v4/merge_requests",
+            self.instance.list_records(self.instance.merge_requests, query),
+            query,
+        )
+
+    def _issue(self, project_id, iid, query, form):
+        issue = self.instance.issues.get((project_id, iid))
+        if issue is None:
+            return 404, {"message": "404 Not found"}
+        return 200, issue
+
+    def _merge_request(self, project_id, iid, query, form):
+        merge_request = self.instance.merge_requests.get((project_id, iid))
+        if merge_request is None:
+            return 404, {"message": "404 Not found"}
+        return 200, merge_request
+
+    def _update_issue(self, project_id, iid, query, form):
+        issue = self.instance.issues.get((project_id, iid))
+        if issue is None:
+            return 404, {"message": "404 Not found"}
+        return 200, self.instance.assign(issue, int(form["assignee_ids"]))
+
+    def _update_merge_request(self, project_id, iid, query, form):
+        merge_request = self.instance.merge_requests.get((project_id, iid))
+        if merge_request is None:
+            return 404, {"message": "404 Not found"}
+        return (
+            200,
+            self.instance.assign(merge_request, int(form["assignee_id"])),
+        )
+
+    def _add_note(self, project_id, iid, query, form):
+        self.instance.notes += 1
+        return 201, {"id": self.instance.notes, "body": form.get("body")}
+
+    def _delete_merged_branches(self, project_id, query, form):
+        if project_id not in self.instance.projects:
+            return 404, {"message": "404 Project Not Found"}
+        self.instance.merged_branches[project_id] = 0
+        return 202, {"message": "202 Accepted"}
+
+    def _handler_class(self):
+        server = self
+
+        class FakeGitLabHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately, which would
+            # otherwise stall each keep-alive response on a delayed ACK
+            disable_nagle_algorithm = True
+
+            def _respond(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                status, headers, response_body = server.handle(
+                    self.command, self.path, body, self.headers
+                )
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header(
+                    "Content-Length", str(len(response_body or b""))
+                )
+                self.end_headers()
+                if response_body:
+                    self.wfile.write(response_body)
+
+                server.stats.record(
+                    self.command,
+                    status,
+                    len(response_body or b""),
+                    len(body),
+                )
+
+            do_GET = do_PUT = do_POST = do_DELETE = _respond
+
+            def log_message(self, format, *args):
+                pass
+
+        return FakeGitLabHandler
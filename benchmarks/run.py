@@ -0,0 +1,243 @@
+"""
+Runs the GitLab Attendant's scheduled tasks end to end against a local
+fake GitLab server and reports wall time, requests made, bytes
+transferred and peak memory for each scenario.
+
+    python -m benchmarks.run --scenario medium --json after.json \\
+        --compare before.json -- --concurrency 8
+
+Options after `--` are passed to the GitLab Attendant as on its command
+line.
+"""
+
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+
+from argparse import ArgumentParser
+from typing import List, NamedTuple, Optional
+
+from benchmarks.fake_gitlab import FakeGitLab, FakeGitLabServer, InstanceSize
+from gitlab_attendant.log_handlers import configure_logging
+from gitlab_attendant.main import (
+    add_long_lived_state,
+    process_arguments,
+    tasks,
+)
+
+
+class Scenario(NamedTuple):
+    name: str
+    size: InstanceSize
+    latency: float = 0.0
+    error_rate: float = 0.0
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario("small", InstanceSize(5, 5, 10, 10, 2)),
+        Scenario("medium", InstanceSize(50, 20, 40, 40, 10)),
+        Scenario("large", InstanceSize(200, 30, 100, 100, 20)),
+        Scenario("latency", InstanceSize(20, 10, 20, 20, 5), latency=0.02),
+        Scenario("errors", InstanceSize(20, 10, 20, 20, 5), error_rate=0.05),
+    )
+}
+
+# Compared between runs, with lower being better for each
+COMPARED = ("wall_time_median", "requests", "bytes_sent", "peak_memory")
+
+
+def run_once(
+    server: FakeGitLabServer, attendant_argv: List[str], trace_memory: bool
+) -> dict:
+    """
+    Runs the tasks once against a freshly generated instance, returning
+    the wall time, server stats and, if traced, peak memory.
+    """
+
+    server.reset()
+    args = add_long_lived_state(
+        process_arguments(
+            ["--ip", server.address, "--token", "benchmark"] + attendant_argv
+        )
+    )
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        tasks(args)
+    finally:
+        wall_time = time.perf_counter() - start
+        peak_memory = None
+        if trace_memory:
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    return {
+        "wall_time": wall_time,
+        "peak_memory": peak_memory,
+        **server.stats.as_dict(),
+    }
+
+
+def run_scenario(
+    scenario: Scenario, attendant_argv: List[str], repeat: int, seed: int
+) -> dict:
+    """
+    Times the tasks over several cold runs against the scenario's
+    instance, then measures peak memory in a separate traced run, since
+    tracing slows everything down. The peak includes the fake server's
+    allocations while handling requests, as it runs in process.
+    """
+
+    instance = FakeGitLab(scenario.size, seed)
+    with FakeGitLabServer(
+        instance, scenario.latency, scenario.error_rate, seed
+    ) as server:
+        runs = [
+            run_once(server, attendant_argv, trace_memory=False)
+            for _ in range(repeat)
+        ]
+        traced = run_once(server, attendant_argv, trace_memory=True)
+
+    wall_times = [run["wall_time"] for run in runs]
+    return {
+        "scenario": scenario.name,
+        "size": scenario.size._asdict(),
+        "latency": scenario.latency,
+        "error_rate": scenario.error_rate,
+        "attendant_args": attendant_argv,
+        "wall_time_min": min(wall_times),
+        "wall_time_median": statistics.median(wall_times),
+        "wall_times": wall_times,
+        "requests": runs[0]["requests"],
+        "requests_by_method": runs[0]["by_method"],
+        "errors": runs[0]["errors"],
+        "not_modified": runs[0]["not_modified"],
+        "bytes_sent": runs[0]["bytes_sent"],
+        "bytes_received": runs[0]["bytes_received"],
+        "peak_memory": traced["peak_memory"],
+    }
+
+
+def format_result(result: dict, baseline: Optional[dict] = None) -> str:
+    """
+    Formats a scenario's results as one line, with the change from the
+    baseline's results for the same scenario if there are any.
+    """
+
+    line = (
+        f"{result['scenario']:<10} "
+        f"wall {result['wall_time_median'] * 1000:9.1f}ms "
+        f"(min {result['wall_time_min'] * 1000:.1f}ms)  "
+        f"requests {result['requests']:6}  "
+        f"sent {result['bytes_sent'] / 1024:9.1f}KiB  "
+        f"peak memory {result['peak_memory'] / 1024 / 1024:7.2f}MiB"
+    )
+    if baseline is None:
+        return line
+
+    changes = []
+    for metric in COMPARED:
+        before, after = baseline.get(metric), result[metric]
+        if before:
+            changes.append(f"{metric} {(after - before) / before:+.1%}")
+    return line + "\n" + " " * 11 + "vs baseline: " + ", ".join(changes)
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if "--" in argv:
+        split = argv.index("--")
+        argv, attendant_argv = argv[:split], argv[split + 1 :]
+    else:
+        attendant_argv = []
+
+    parser = ArgumentParser(prog="python -m benchmarks.run")
+    parser.add_argument(
+        "--scenario",
+        dest="scenarios",
+        action="append",
+        choices=sorted(SCENARIOS),
+        help="scenario to run, may be repeated [default: small, medium]",
+    )
+    parser.add_argument("--projects", type=int, help="custom scenario size")
+    parser.add_argument("--members", type=int, default=10)
+    parser.add_argument("--issues", type=int, default=20)
+    parser.add_argument("--merge-requests", type=int, default=20)
+    parser.add_argument("--merged-branches", type=int, default=5)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="seconds added to each response in the custom scenario",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="fraction of responses replaced with server errors in the "
+        "custom scenario",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="file for results")
+    parser.add_argument(
+        "--compare", help="results file from an earlier benchmark run"
+    )
+    options = parser.parse_args(argv)
+
+    # Logging would otherwise dominate the measurements
+    attendant_argv = ["--log-level", "CRITICAL"] + attendant_argv
+    configure_logging("CRITICAL")
+
+    scenarios = [SCENARIOS[name] for name in options.scenarios or ()]
+    if options.projects:
+        scenarios.append(
+            Scenario(
+                "custom",
+                InstanceSize(
+                    options.projects,
+                    options.members,
+                    options.issues,
+                    options.merge_requests,
+                    options.merged_branches,
+                ),
+                options.latency,
+                options.error_rate,
+            )
+        )
+    if not scenarios:
+        scenarios = [SCENARIOS["small"], SCENARIOS["medium"]]
+
+    baselines = {}
+    if options.compare:
+        with open(options.compare) as baseline_file:
+            baselines = {
+                result["scenario"]: result
+                for result in json.load(baseline_file)["results"]
+            }
+
+    results = []
+    for scenario in scenarios:
+        result = run_scenario(
+            scenario, attendant_argv, options.repeat, options.seed
+        )
+        results.append(result)
+        print(format_result(result, baselines.get(scenario.name)))
+
+    if options.json_path:
+        with open(options.json_path, "w") as results_file:
+            json.dump(
+                {"python": sys.version.split()[0], "results": results},
+                results_file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,169 @@
+from datetime import datetime
+from typing import Iterable, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from gitlab_attendant.filters import has_assignee
 from gitlab_attendant.log_handlers import logger
+from gitlab_attendant.records import (
+    RECORD_TYPES,
+    Issue,
+    MergeRequest,
+    Project,
+    User,
+)
+from gitlab_attendant.sharding import owned_records
 from gitlab_attendant.utils import (
     delete_request,
+    get_paginated_request,
     get_request,
     post_request,
     put_request,
+    with_query_params,
 )
 
+# Datasets that grow with the instance, which --stream-json passes straight
+# through to the tasks rather than holding in the run snapshot
+STREAMED_DATASETS = ("issues", "merge_requests")
+
+
+def build_query(
+    work_in_progress: Optional[bool] = None,
+    assigned: Optional[bool] = None,
+    created_before: Optional[datetime] = None,
+    due_date: Optional[str] = None,
+) -> dict:
+    """
+    Turns task criteria into GitLab list query parameters so that records
+    are filtered server side. Criteria left as None aren't filtered on.
+    """
+
+    query = {}
+    if work_in_progress is not None:
+        query["wip"] = "yes" if work_in_progress else "no"
+    if assigned is not None:
+        query["assignee_id"] = "Any" if assigned else "None"
+    if created_before is not None:
+        query["created_before"] = created_before.isoformat()
+    if due_date is not None:
+        query["due_date"] = due_date
+    return query
+
+
+def _get_dataset(
+    cli_args: dict,
+    dataset: str,
+    request_url: str,
+    query: Optional[dict] = None,
+    caller: Optional[str] = None,
+) -> Iterable[dict]:
+    """
+    Lazily yields the records found at a list endpoint, or returns them
+    from the run snapshot or incremental sync working set when in use,
+    as the dataset's typed records. Streamed issues and merge requests
+    skip the snapshot, so a run never holds a whole listing of them. A
+    failed request is reported as made by the caller named.
+    """
+
+    incremental_sync = cli_args.get("incremental_sync")
+    if incremental_sync and dataset in incremental_sync.DATASETS:
+        # The working set holds every open record, so tasks filter it
+        # client side rather than by query
+        query = None
+    if query:
+        request_url = with_query_params(request_url, query)
+
+    def fetch(url: str) -> Iterable[dict]:
+        return get_paginated_request(
+            url,
+            cli_args["session"],
+            response_cache=cli_args.get("response_cache"),
+            stream=cli_args.get("stream_json", False),
+            caller=caller,
+        )
+
+    record_type = RECORD_TYPES.get(dataset)
+
+    def loader():
+        if incremental_sync and dataset in incremental_sync.DATASETS:
+            records = incremental_sync.fetch(
+                dataset, request_url, fetch, cli_args.get("sync_pending")
+            )
+        else:
+            records = fetch(request_url)
+        # JSON is turned into typed records once, as it is read, so the
+        # tasks sharing the snapshot never parse the same fields again
+        if record_type is None:
+            return records
+        return (record_type.from_json(record) for record in records)
+
+    snapshot = cli_args.get("snapshot")
+    if snapshot is None or (
+        cli_args.get("stream_json") and dataset in STREAMED_DATASETS
+    ):
+        records = loader()
+    else:
+        records = snapshot.fetch(dataset, request_url, loader)
+
+    # Each replica only attends to the projects of its own shard
+    if cli_args.get("shard") is not None:
+        return owned_records(cli_args, dataset, records)
+    return records
+
+
+def _update_snapshot(cli_args: dict, dataset: str, record: dict):
+    """
+    Records the result of a write in the run snapshot, if one is in use.
+    """
+
+    snapshot = cli_args.get("snapshot")
+    if snapshot is not None and record:
+        record = RECORD_TYPES[dataset].from_json(record)
+        # A record that was just assigned now belongs in listings of
+        # assigned records too, which tasks filter again client side
+        snapshot.update(
+            dataset,
+            record,
+            include=_lists_assigned if has_assignee(record) else None,
+        )
+
+
+def _lists_assigned(request_url: str) -> bool:
+    """
+    Returns whether a list URL only asks for records with an assignee.
+    """
+
+    query = dict(parse_qsl(urlsplit(request_url).query))
+    return query.get("assignee_id") == "Any"
+
 
-def get_all_projects(cli_args: dict) -> list:
+def _planned(
+    cli_args: dict,
+    method: str,
+    request_url: str,
+    body: Optional[dict],
+    category: str,
+    description: str,
+) -> bool:
     """
-    Queries the GitLab API and returns all projects found.
+    Records a write in the dry run plan instead of sending it, returning
+    whether this is a dry run.
+    """
+
+    plan = cli_args.get("plan")
+    if plan is None:
+        return False
+    plan.record_write(method, request_url, body, category, description)
+    return True
+
+
+def get_all_projects(cli_args: dict) -> Iterable[Project]:
+    """
+    Queries the GitLab API and lazily yields all projects found.
     """
     request_url = f"http://{cli_args['ip_address']}/api/v4/projects"
-    return get_request(request_url, cli_args["token"])
+    return _get_dataset(
+        cli_args, "projects", request_url, caller="get_all_projects"
+    )
 
 
 def get_project(cli_args: dict, project_id: int) -> dict:
@@ -22,17 +173,76 @@ def get_project(cli_args: dict, project_id: int) -> dict:
     request_url = (
         f"http://{cli_args['ip_address']}/api/v4/projects/{project_id}"
     )
-    return get_request(request_url, cli_args["token"])
+    return get_request(
+        request_url,
+        cli_args["session"],
+        response_cache=cli_args.get("response_cache"),
+        caller="get_project",
+    )
+
+
+def get_merge_request(
+    cli_args: dict, project_id: int, merge_id: int
+) -> Optional[MergeRequest]:
+    """
+    Queries the GitLab API and returns the specified merge request.
+    """
+    request_url = f"http://{cli_args['ip_address']}/api/v4/projects/{project_id}/merge_requests/{merge_id}"
+    merge_request = get_request(
+        request_url,
+        cli_args["session"],
+        response_cache=cli_args.get("response_cache"),
+        caller="get_merge_request",
+    )
+    return MergeRequest.from_json(merge_request) if merge_request else None
+
+
+def get_issue(
+    cli_args: dict, project_id: int, issue_id: int
+) -> Optional[Issue]:
+    """
+    Queries the GitLab API and returns the specified issue.
+    """
+    request_url = f"http://{cli_args['ip_address']}/api/v4/projects/{project_id}/issues/{issue_id}"
+    issue = get_request(
+        request_url,
+        cli_args["session"],
+        response_cache=cli_args.get("response_cache"),
+        caller="get_issue",
+    )
+    return Issue.from_json(issue) if issue else None
 
 
-def get_all_project_members(cli_args: dict, project_id: int) -> list:
+def get_all_project_members(cli_args: dict, project_id: int) -> List[User]:
     """
-    Queries the GitLab API and returns all members of a project.
+    Queries the GitLab API and returns all members of a project, unless
+    they are held in the member cache.
     """
     request_url = (
         f"http://{cli_args['ip_address']}/api/v4/projects/{project_id}/members"
     )
-    return get_request(request_url, cli_args["token"])
+
+    # The cache holds members as JSON, so they are only turned into
+    # records as they are handed out
+    member_cache = cli_args.get("member_cache")
+    if member_cache is None:
+        members = _get_dataset(
+            cli_args,
+            "project_members",
+            request_url,
+            caller="get_all_project_members",
+        )
+    else:
+        members = member_cache.get(
+            project_id,
+            lambda: _get_dataset(
+                cli_args,
+                "project_members",
+                request_url,
+                caller="get_all_project_members",
+            ),
+        )
+    return [User.from_json(member) for member in members]
 
 
 def get_user(cli_args: dict, user_id: int) -> dict:
@@ -40,17 +250,31 @@ def get_user(cli_args: dict, user_id: int) -> dict:
     Queries the GitLab API and returns details of the specified user.
     """
     request_url = f"http://{cli_args['ip_address']}/api/v4/users/{user_id}"
-    return get_request(request_url, cli_args["token"])
+    return get_request(
+        request_url,
+        cli_args["session"],
+        response_cache=cli_args.get("response_cache"),
+        caller="get_user",
+    )
 
 
-def get_all_open_merge_requests(cli_args: dict) -> list:
+def get_all_open_merge_requests(
+    cli_args: dict, **criteria
+) -> Iterable[MergeRequest]:
     """
-    Queries the GitLab API and returns all open merge requests.
+    Queries the GitLab API and lazily yields all open merge requests,
+    filtered server side by any build_query criteria given.
     """
     request_url = (
         f"http://{cli_args['ip_address']}/api/v4/merge_requests?state=opened"
     )
-    return get_request(request_url, cli_args["token"])
+    return _get_dataset(
+        cli_args,
+        "merge_requests",
+        request_url,
+        build_query(**criteria),
+        caller="get_all_open_merge_requests",
+    )
 
 
 def assign_user_to_merge_request(
@@ -61,17 +285,51 @@ def assign_user_to_merge_request(
     """
     request_url = f"http://{cli_args['ip_address']}/api/v4/projects/{project_id}/merge_requests/{merge_id}"
     body = {"assignee_id": user_id}
-    return put_request(request_url, cli_args["token"], body)
+    if _planned(
+        cli_args,
+        "PUT",
+        request_url,
+        body,
+        "assignment",
+        f"Assign merge request !{merge_id} of project {project_id} to user {user_id}",
+    ):
+        return None
+    merge_request = put_request(
+        request_url,
+        cli_args["session"],
+        body,
+        caller="assign_user_to_merge_request",
+    )
+    _update_snapshot(cli_args, "merge_requests", merge_request)
+    return merge_request
 
 
 def add_note_to_merge_request(
-    cli_args: dict, project_id: int, merge_id: int, user_id: int, note_body: str
+    cli_args: dict,
+    project_id: int,
+    merge_id: int,
+    user_id: int,
+    note_body: str,
 ) -> dict:
     """
     Adds a note to the given merge request.
     """
     request_url = f"http://{cli_args['ip_address']}/api/v4/projects/{project_id}/merge_requests/{merge_id}/notes"
-    return post_request(request_url, cli_args["token"], note_body)
+    if _planned(
+        cli_args,
+        "POST",
+        request_url,
+        note_body,
+        "note",
+        f"Note on merge request !{merge_id} of project {project_id}: {note_body['body']!r}",
+    ):
+        return None
+    return post_request(
+        request_url,
+        cli_args["session"],
+        note_body,
+        caller="add_note_to_merge_request",
+    )
 
 
 def add_note_to_issue(
@@ -81,7 +339,18 @@ def add_note_to_issue(
     Adds a note to the given issue.
     """
     request_url = f"http://{cli_args['ip_address']}/api/v4/projects/{project_id}/issues/{issue_id}/notes"
-    return post_request(request_url, cli_args["token"], note_body)
+    if _planned(
+        cli_args,
+        "POST",
+        request_url,
+        note_body,
+        "note",
+        f"Note on issue #{issue_id} of project {project_id}: {note_body['body']!r}",
+    ):
+        return None
+    return post_request(
+        request_url, cli_args["session"], note_body, caller="add_note_to_issue"
+    )
 
 
 def delete_merged_branches(cli_args: dict, project_id: int):
@@ -90,16 +359,35 @@ def delete_merged_branches(cli_args: dict, project_id: int):
     """
 
     request_url = f"http://{cli_args['ip_address']}/api/v4/projects/{project_id}/repository/merged_branches"
-    return delete_request(request_url, cli_args["token"])
+    if _planned(
+        cli_args,
+        "DELETE",
+        request_url,
+        None,
+        "branch_removal",
+        f"Delete merged branches of project {project_id}",
+    ):
+        # GitLab accepts the deletion and removes the branches later
+        return {"message": "202 Accepted"}
+    return delete_request(
+        request_url, cli_args["session"], caller="delete_merged_branches"
+    )
 
 
-def get_all_open_issues(cli_args: dict):
+def get_all_open_issues(cli_args: dict, **criteria) -> Iterable[Issue]:
     """
-    Queries the GitLab API and returns all open issues.
+    Queries the GitLab API and lazily yields all open issues, filtered
+    server side by any build_query criteria given.
     """
 
     request_url = f"http://{cli_args['ip_address']}/api/v4/issues?state=opened"
-    return get_request(request_url, cli_args["token"])
+    return _get_dataset(
+        cli_args,
+        "issues",
+        request_url,
+        build_query(**criteria),
+        caller="get_all_open_issues",
+    )
 
 
 def assign_issue(cli_args: dict, project_id: int, issue_id: int, user_id: int):
@@ -112,4 +400,17 @@ def assign_issue(cli_args: dict, project_id: int, issue_id: int, user_id: int):
     )
     request_url = f"http://{cli_args['ip_address']}/api/v4/projects/{project_id}/issues/{issue_id}"
     body = {"assignee_ids": [user_id]}
-    return put_request(request_url, cli_args["token"], body)
+    if _planned(
+        cli_args,
+        "PUT",
+        request_url,
+        body,
+        "assignment",
+        f"Assign issue #{issue_id} of project {project_id} to user {user_id}",
+    ):
+        return None
+    issue = put_request(
+        request_url, cli_args["session"], body, caller="assign_issue"
+    )
+    _update_snapshot(cli_args, "issues", issue)
+    return issue
@@ -0,0 +1,131 @@
+import asyncio
+import contextvars
+import functools
+
+from gitlab_attendant import api_calls
+
+
+async def _run_in_executor(func, *args, **kwargs):
+    """
+    Runs a blocking API call on the event loop's executor, whose worker
+    count bounds the number of requests in flight, in a copy of the
+    current context so its requests are labelled with the task.
+    """
+
+    loop = asyncio.get_event_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        None, functools.partial(context.run, func, *args, **kwargs)
+    )
+
+
+def _fetch_all(func, *args, **kwargs) -> list:
+    """
+    Drains a paginated API call, so every page is fetched off the loop.
+    """
+
+    return list(func(*args, **kwargs))
+
+
+async def get_all_projects(cli_args: dict) -> list:
+    """
+    Queries the GitLab API and returns all projects found.
+    """
+    return await _run_in_executor(
+        _fetch_all, api_calls.get_all_projects, cli_args
+    )
+
+
+async def get_all_project_members(cli_args: dict, project_id: int) -> list:
+    """
+    Queries the GitLab API and returns all members of a project.
+    """
+    return await _run_in_executor(
+        _fetch_all, api_calls.get_all_project_members, cli_args, project_id
+    )
+
+
+async def get_all_open_merge_requests(cli_args: dict, **criteria) -> list:
+    """
+    Queries the GitLab API and returns all open merge requests matching
+    any criteria given.
+    """
+    return await _run_in_executor(
+        _fetch_all, api_calls.get_all_open_merge_requests, cli_args, **criteria
+    )
+
+
+async def get_all_open_issues(cli_args: dict, **criteria) -> list:
+    """
+    Queries the GitLab API and returns all open issues matching any
+    criteria given.
+    """
+    return await _run_in_executor(
+        _fetch_all, api_calls.get_all_open_issues, cli_args, **criteria
+    )
+
+
+async def assign_user_to_merge_request(
+    cli_args: dict, project_id: int, merge_id: int, user_id: int
+) -> dict:
+    """
+    Updates the merge request and assigns the given user id.
+    """
+    return await _run_in_executor(
+        api_calls.assign_user_to_merge_request,
+        cli_args,
+        project_id,
+        merge_id,
+        user_id,
+    )
+
+
+async def add_note_to_merge_request(
+    cli_args: dict,
+    project_id: int,
+    merge_id: int,
+    user_id: int,
+    note_body: str,
+) -> dict:
+    """
+    Adds a note to the given merge request.
+    """
+    return await _run_in_executor(
+        api_calls.add_note_to_merge_request,
+        cli_args,
+        project_id,
+        merge_id,
+        user_id,
+        note_body,
+    )
+
+
+async def add_note_to_issue(
+    cli_args: dict, project_id: int, issue_id: int, note_body: str
+) -> dict:
+    """
+    Adds a note to the given issue.
+    """
+    return await _run_in_executor(
+        api_calls.add_note_to_issue, cli_args, project_id, issue_id, note_body
+    )
+
+
+async def delete_merged_branches(cli_args: dict, project_id: int) -> dict:
+    """
+    Deletes the branches of the given project that have been merged.
+    """
+    return await _run_in_executor(
+        api_calls.delete_merged_branches, cli_args, project_id
+    )
+
+
+async def assign_issue(
+    cli_args: dict, project_id: int, issue_id: int, user_id: int
+) -> dict:
+    """
+    Assigns an issue to a specified user.
+    """
+    return await _run_in_executor(
+        api_calls.assign_issue, cli_args, project_id, issue_id, user_id
+    )
@@ -0,0 +1,320 @@
+import asyncio
+
+from concurrent.futures import ThreadPoolExecutor
+
+from gitlab_attendant.async_api_calls import (
+    add_note_to_issue,
+    add_note_to_merge_request,
+    assign_issue,
+    assign_user_to_merge_request,
+    delete_merged_branches,
+    get_all_open_issues,
+    get_all_open_merge_requests,
+    get_all_project_members,
+    get_all_projects,
+)
+from gitlab_attendant.errors import run_isolated_async
+from gitlab_attendant.profiling import task_profiling
+from gitlab_attendant.scheduling import claim_task
+from gitlab_attendant.tasks import (
+    SCHEDULED_TASKS,
+    branch_removal_message,
+    choose_issue_assignee,
+    choose_merge_request_assignee,
+    due_issue_note,
+    load_streamed_workload,
+    log_branch_removal_summary,
+    overdue_issue_note,
+    select_overdue_and_due_issues,
+    select_stale_merge_requests,
+    select_unassigned_issues,
+    select_unassigned_merge_requests,
+    stale_merge_request_criteria,
+    stale_merge_request_note,
+    unassigned_merge_request_criteria,
+)
+from gitlab_attendant.workload import WorkloadIndex
+
+
+async def _get_members_by_project(cli_args: dict, project_ids: set) -> dict:
+    """
+    Concurrently fetch the members of each of the given projects.
+    """
+
+    project_ids = list(project_ids)
+    members = await asyncio.gather(
+        *[
+            get_all_project_members(cli_args, project_id)
+            for project_id in project_ids
+        ]
+    )
+    return dict(zip(project_ids, members))
+
+
+async def _workload_index(cli_args: dict) -> WorkloadIndex:
+    """
+    Asynchronous version of tasks.workload_index.
+    """
+
+    workload = cli_args.get("workload")
+    if workload is None:
+        return WorkloadIndex()
+    if not workload.loaded and cli_args.get("stream_json"):
+        open_issues, open_merge_requests = await asyncio.gather(
+            get_all_open_issues(cli_args),
+            get_all_open_merge_requests(cli_args),
+        )
+        load_streamed_workload(workload, open_issues, open_merge_requests)
+    elif not workload.loaded:
+        assigned_issues, assigned_merge_requests = await asyncio.gather(
+            get_all_open_issues(cli_args, assigned=True),
+            get_all_open_merge_requests(cli_args, assigned=True),
+        )
+        workload.load(assigned_issues)
+        workload.load(assigned_merge_requests)
+    return workload
+
+
+async def _unassigned_open_merge_requests(cli_args: dict) -> list:
+    """
+    Asynchronous version of tasks.unassigned_open_merge_requests.
+    """
+
+    if cli_args.get("stream_json") and "workload" in cli_args:
+        workload = await _workload_index(cli_args)
+        return select_unassigned_merge_requests(
+            workload.unassigned["merge_requests"]
+        )
+    return select_unassigned_merge_requests(
+        await get_all_open_merge_requests(
+            cli_args, **unassigned_merge_request_criteria()
+        )
+    )
+
+
+async def _unassigned_open_issues(cli_args: dict) -> list:
+    """
+    Asynchronous version of tasks.unassigned_open_issues.
+    """
+
+    if cli_args.get("stream_json") and "workload" in cli_args:
+        workload = await _workload_index(cli_args)
+        return select_unassigned_issues(workload.unassigned["issues"])
+    return select_unassigned_issues(
+        await get_all_open_issues(cli_args, assigned=False)
+    )
+
+
+async def assign_open_merge_requests(cli_args: dict):
+    """
+    Asynchronous version of tasks.assign_open_merge_requests.
+    """
+
+    open_merge_requests = await _unassigned_open_merge_requests(cli_args)
+
+    all_project_members = await _get_members_by_project(
+        cli_args,
+        {merge_request.project_id for merge_request in open_merge_requests},
+    )
+
+    workload = await _workload_index(cli_args) if open_merge_requests else None
+
+    assignments = []
+    for merge_request in open_merge_requests:
+        chosen_project_member = choose_merge_request_assignee(
+            merge_request,
+            all_project_members[merge_request.project_id],
+            workload,
+        )
+        if chosen_project_member is not None:
+            assignments.append(
+                assign_user_to_merge_request(
+                    cli_args,
+                    merge_request.project_id,
+                    merge_request.iid,
+                    chosen_project_member,
+                )
+            )
+
+    await asyncio.gather(*assignments)
+
+
+async def notify_stale_merge_request_assignees(cli_args: dict, days: int):
+    """
+    Asynchronous version of tasks.notify_stale_merge_request_assignees.
+    """
+
+    open_merge_requests = select_stale_merge_requests(
+        await get_all_open_merge_requests(
+            cli_args, **stale_merge_request_criteria(days)
+        ),
+        days,
+    )
+
+    await asyncio.gather(
+        *[
+            add_note_to_merge_request(
+                cli_args,
+                merge_request.project_id,
+                merge_request.iid,
+                merge_request.assignee.id,
+                stale_merge_request_note(merge_request),
+            )
+            for merge_request in open_merge_requests
+        ]
+    )
+
+
+async def remove_merged_branches(cli_args: dict) -> dict:
+    """
+    Asynchronous version of tasks.remove_merged_branches.
+    """
+
+    projects = await get_all_projects(cli_args)
+
+    # Collect exceptions so one failing project doesn't cancel the rest
+    response_list = await asyncio.gather(
+        *[
+            delete_merged_branches(cli_args, project.id)
+            for project in projects
+        ],
+        return_exceptions=True,
+    )
+
+    summary = {
+        project.id: (
+            f"{type(response).__name__}: {response}"
+            if isinstance(response, Exception)
+            else branch_removal_message(response)
+        )
+        for project, response in zip(projects, response_list)
+    }
+
+    log_branch_removal_summary(summary)
+    return summary
+
+
+async def assign_project_members_to_issues(cli_args: dict):
+    """
+    Asynchronous version of tasks.assign_project_members_to_issues.
+    """
+
+    unassigned_open_issues = await _unassigned_open_issues(cli_args)
+
+    all_project_members = await _get_members_by_project(
+        cli_args,
+        {
+            unassigned_open_issue.project_id
+            for unassigned_open_issue in unassigned_open_issues
+        },
+    )
+
+    workload = (
+        await _workload_index(cli_args) if unassigned_open_issues else None
+    )
+
+    assignments = []
+    for unassigned_open_issue in unassigned_open_issues:
+        chosen_project_member = choose_issue_assignee(
+            unassigned_open_issue,
+            all_project_members[unassigned_open_issue.project_id],
+            workload,
+        )
+        if chosen_project_member is not None:
+            assignments.append(
+                assign_issue(
+                    cli_args,
+                    unassigned_open_issue.project_id,
+                    unassigned_open_issue.iid,
+                    chosen_project_member,
+                )
+            )
+
+    await asyncio.gather(*assignments)
+
+
+async def notify_issue_assignees(cli_args: dict, days: int):
+    """
+    Asynchronous version of tasks.notify_issue_assignees.
+    """
+
+    overdue_issues, due_issues = select_overdue_and_due_issues(
+        await get_all_open_issues(cli_args, assigned=True), days
+    )
+
+    await asyncio.gather(
+        *[
+            add_note_to_issue(
+                cli_args,
+                overdue_issue.project_id,
+                overdue_issue.iid,
+                overdue_issue_note(overdue_issue),
+            )
+            for overdue_issue in overdue_issues
+        ],
+        *[
+            add_note_to_issue(
+                cli_args,
+                due_issue.project_id,
+                due_issue.iid,
+                due_issue_note(due_issue),
+            )
+            for due_issue in due_issues
+        ],
+    )
+
+
+# The coroutine standing in for each scheduled task, by name
+ASYNC_TASKS = {
+    task.__name__: task
+    for task in (
+        assign_project_members_to_issues,
+        assign_open_merge_requests,
+        notify_issue_assignees,
+        notify_stale_merge_request_assignees,
+        remove_merged_branches,
+    )
+}
+
+
+async def _run_all_tasks(cli_args: dict):
+    """
+    Run each scheduled task in turn, so later tasks see the assignments
+    made by earlier ones, while each task fans its own requests out
+    concurrently. A failing task is recorded so the remaining tasks
+    still run.
+    """
+
+    task_names = cli_args.get("task_names")
+    for task, task_args in SCHEDULED_TASKS:
+        if task_names is not None and task.__name__ not in task_names:
+            continue
+
+        with claim_task(cli_args, task.__name__) as claimed:
+            if not claimed:
+                continue
+            with task_profiling(cli_args, task.__name__):
+                await run_isolated_async(
+                    cli_args["error_report"],
+                    ASYNC_TASKS[task.__name__],
+                    cli_args,
+                    *task_args,
+                    metrics=cli_args.get("metrics"),
+                )
+
+
+def run_tasks(cli_args: dict, concurrency: int):
+    """
+    Run all tasks on a new event loop, with at most `concurrency`
+    requests to the GitLab API in flight at once.
+    """
+
+    loop = asyncio.new_event_loop()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    loop.set_default_executor(executor)
+
+    try:
+        loop.run_until_complete(_run_all_tasks(cli_args))
+    finally:
+        executor.shutdown(wait=True)
+        loop.close()
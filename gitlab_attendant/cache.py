@@ -0,0 +1,218 @@
+import collections
+import hashlib
+import json
+import os
+import threading
+import time
+
+from typing import Callable, Optional
+
+from requests import Response
+
+from gitlab_attendant.log_handlers import logger
+
+
+class MemberCache:
+    """
+    Size-bounded LRU cache of project members that outlives a single run,
+    with each entry expiring after `ttl` seconds. Optionally persisted to
+    a JSON file so that it also survives restarts.
+    """
+
+    def __init__(
+        self, ttl: float, max_entries: int = 1000, path: Optional[str] = None
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            self._load()
+
+    def get(
+        self,
+        project_id: int,
+        loader: Callable[[], list],
+        refresh: bool = False,
+    ) -> list:
+        """
+        Returns the cached members of a project, calling the loader when
+        there is no fresh entry or a refresh is forced.
+        """
+
+        with self._lock:
+            entry = self._entries.get(project_id)
+            if entry and not refresh and not self._expired(entry):
+                self._entries.move_to_end(project_id)
+                self.hits += 1
+                return list(entry["members"])
+            self.misses += 1
+
+        members = list(loader())
+
+        # An empty list may be the result of a failed request, so it is
+        # fetched again next time rather than cached
+        if not members:
+            return members
+
+        with self._lock:
+            self._entries[project_id] = {
+                "stored_at": time.time(),
+                "members": members,
+            }
+            self._entries.move_to_end(project_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return list(members)
+
+    def invalidate(self, project_id: Optional[int] = None):
+        """
+        Discards the entry for a project, or every entry if none is given,
+        so the next lookup is fetched from the GitLab API.
+        """
+
+        with self._lock:
+            if project_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(project_id, None)
+
+    def stats(self) -> dict:
+        """
+        Returns the cache's hit and miss counts and its current size.
+        """
+
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+    def save(self):
+        """
+        Writes the unexpired entries to the cache file, if one is set.
+        """
+
+        if not self.path:
+            return
+
+        with self._lock:
+            entries = {
+                str(project_id): entry
+                for project_id, entry in self._entries.items()
+                if not self._expired(entry)
+            }
+
+            # Written under the lock, as runs on other threads share the
+            # temporary file
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, "w") as cache_file:
+                json.dump(entries, cache_file)
+            os.replace(temporary_path, self.path)
+
+    def _expired(self, entry: dict) -> bool:
+        return time.time() - entry["stored_at"] >= self.ttl
+
+    def _load(self):
+        try:
+            with open(self.path) as cache_file:
+                entries = json.load(cache_file)
+        except (OSError, ValueError) as ex:
+            logger.error(
+                f"Unable to load member cache from {self.path}, starting empty: {ex}"
+            )
+            return
+
+        for project_id, entry in sorted(
+            entries.items(), key=lambda item: item[1]["stored_at"]
+        ):
+            if not self._expired(entry):
+                self._entries[int(project_id)] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class ResponseCache:
+    """
+    On-disk cache of GET responses keyed by URL, holding each response's
+    ETag so that unchanged responses can be revalidated with GitLab and
+    served locally. The most recently used bodies are also kept decoded
+    in memory so they needn't be parsed again.
+    """
+
+    # Headers needed to follow pagination from a cached response
+    HEADERS = ("Link", "X-Next-Page")
+
+    def __init__(self, directory: str, max_decoded: int = 256):
+        self.directory = directory
+        self.max_decoded = max_decoded
+        self._decoded = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+    def lookup(self, request_url: str) -> Optional[dict]:
+        """
+        Returns the cached entry for a URL, or None if there isn't one.
+        """
+
+        try:
+            with open(self._path(request_url)) as entry_file:
+                return json.load(entry_file)
+        except (OSError, ValueError):
+            return None
+
+    def body(self, request_url: str, entry: dict):
+        """
+        Returns the decoded body of a cached entry.
+        """
+
+        key = (request_url, entry["etag"])
+        with self._lock:
+            if key in self._decoded:
+                self._decoded.move_to_end(key)
+                return self._decoded[key]
+
+        body = json.loads(entry["body"])
+        self._remember(key, body)
+        return body
+
+    def store(self, request_url: str, response: Response, body):
+        """
+        Stores a response that carries an ETag, along with its decoded body.
+        """
+
+        entry = {
+            "etag": response.headers["ETag"],
+            "headers": {
+                header: response.headers[header]
+                for header in self.HEADERS
+                if header in response.headers
+            },
+            "body": response.text,
+        }
+
+        path = self._path(request_url)
+        temporary_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "w") as entry_file:
+            json.dump(entry, entry_file)
+        os.replace(temporary_path, path)
+
+        self._remember((request_url, entry["etag"]), body)
+
+    def _path(self, request_url: str) -> str:
+        digest = hashlib.sha256(request_url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def _remember(self, key: tuple, body):
+        with self._lock:
+            self._decoded[key] = body
+            self._decoded.move_to_end(key)
+            while len(self._decoded) > self.max_decoded:
+                self._decoded.popitem(last=False)
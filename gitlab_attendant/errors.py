@@ -0,0 +1,160 @@
+import collections
+import threading
+import time
+
+from typing import Optional
+
+from gitlab_attendant.log_handlers import logger
+from gitlab_attendant.metrics import MetricsRegistry, task_label
+
+
+class ErrorReport:
+    """
+    Failures collected over a single run, so that a failed request or task
+    is reported at the end of the run rather than stopping it.
+    """
+
+    def __init__(self):
+        self.failures = []
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        caller: str,
+        message: str,
+        method: Optional[str] = None,
+        request_url: Optional[str] = None,
+        status_code: Optional[int] = None,
+    ):
+        """
+        Adds a failure to the report.
+        """
+
+        with self._lock:
+            self.failures.append(
+                {
+                    "caller": caller,
+                    "message": message,
+                    "method": method,
+                    "request_url": request_url,
+                    "status_code": status_code,
+                }
+            )
+
+    def has_failures(self, method: Optional[str] = None) -> bool:
+        """
+        Returns whether anything failed, or only requests of the given
+        HTTP method if one is given.
+        """
+
+        with self._lock:
+            return any(
+                method is None or failure["method"] == method
+                for failure in self.failures
+            )
+
+    def log_summary(self):
+        """
+        Logs the number of failures in the run, grouped by caller.
+        """
+
+        with self._lock:
+            failures = list(self.failures)
+
+        if not failures:
+            logger.info("GitLab Attendant run completed without errors...")
+            return
+
+        counts = collections.Counter(failure["caller"] for failure in failures)
+        logger.error(
+            f"GitLab Attendant run completed with {len(failures)} failures: "
+            + ", ".join(
+                f"{caller} ({count})" for caller, count in counts.items()
+            )
+        )
+
+
+def run_isolated(
+    error_report: ErrorReport,
+    task,
+    *args,
+    metrics: Optional[MetricsRegistry] = None,
+):
+    """
+    Runs a task, recording any exception it raises in the error report
+    instead of letting it stop the tasks that follow.
+    """
+
+    start = time.perf_counter()
+    try:
+        with task_label(task.__name__):
+            result = task(*args)
+    except Exception as ex:
+        _record_task_failure(error_report, task.__name__, start, metrics, ex)
+        return None
+
+    record_task_duration(task.__name__, start, metrics)
+    return result
+
+
+async def run_isolated_async(
+    error_report: ErrorReport,
+    task,
+    *args,
+    metrics: Optional[MetricsRegistry] = None,
+):
+    """
+    Asynchronous version of run_isolated, for coroutine tasks.
+    """
+
+    start = time.perf_counter()
+    try:
+        with task_label(task.__name__):
+            result = await task(*args)
+    except Exception as ex:
+        _record_task_failure(error_report, task.__name__, start, metrics, ex)
+        return None
+
+    record_task_duration(task.__name__, start, metrics)
+    return result
+
+
+def _record_task_failure(
+    error_report: ErrorReport,
+    task_name: str,
+    start: float,
+    metrics: Optional[MetricsRegistry],
+    ex: Exception,
+):
+    logger.error(
+        f"Task {task_name} failed, continuing with the remaining tasks: {ex}"
+    )
+    error_report.record(task_name, f"{type(ex).__name__}: {ex}")
+    record_task_duration(task_name, start, metrics, failed=True)
+
+
+def record_task_duration(
+    task_name: str,
+    start: float,
+    metrics: Optional[MetricsRegistry] = None,
+    failed: bool = False,
+):
+    """
+    Records how long a task took in the metrics registry, if there is
+    one, and logs a task that finished with its name and duration as
+    structured fields of the log entry.
+    """
+
+    seconds = time.perf_counter() - start
+    if metrics is not None:
+        metrics.observe_task(task_name, seconds, failed)
+    if failed:
+        return
+
+    duration_ms = round(seconds * 1000, 1)
+    logger.info(
+        "Task %s completed in %sms",
+        task_name,
+        duration_ms,
+        extra={"task": task_name, "duration_ms": duration_ms},
+    )
@@ -0,0 +1,70 @@
+import pytz
+
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Iterator, Union
+
+from gitlab_attendant.records import Issue, MergeRequest
+
+Record = Union[Issue, MergeRequest]
+Predicate = Callable[[Record], bool]
+
+
+def apply_filters(
+    records: Iterable[Record], *predicates: Predicate
+) -> Iterator[Record]:
+    """
+    Lazily yields the records that satisfy every predicate, in a single
+    pass over a list or a stream. Predicates are checked in order and stop
+    at the first that fails, so cheap checks should come first.
+    """
+
+    return (
+        record
+        for record in records
+        if all(predicate(record) for predicate in predicates)
+    )
+
+
+def is_not_work_in_progress(record: MergeRequest) -> bool:
+    """
+    Keeps merge requests that aren't marked as work in progress.
+    """
+
+    return not record.work_in_progress
+
+
+def older_than(days: int) -> Predicate:
+    """
+    Keeps records created at least X days ago.
+    """
+
+    current_timestamp = pytz.utc.localize(datetime.utcnow())
+
+    def predicate(record: MergeRequest) -> bool:
+        return current_timestamp - record.created_at >= timedelta(days)
+
+    return predicate
+
+
+def has_assignee(record: Record) -> bool:
+    """
+    Keeps records with an assignee or at least one of multiple assignees.
+    """
+
+    return bool(record.assignee or record.assignees)
+
+
+def lacks_assignee(record: Record) -> bool:
+    """
+    Keeps records with no assignees.
+    """
+
+    return not has_assignee(record)
+
+
+def has_due_date(record: Issue) -> bool:
+    """
+    Keeps records with a due date.
+    """
+
+    return record.due_date is not None
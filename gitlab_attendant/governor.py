@@ -0,0 +1,132 @@
+import threading
+import time
+
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from requests import Response
+
+
+class RateLimitGovernor:
+    """
+    Token bucket that every request to the GitLab API passes through.
+    Tokens refill at the configured rate, which is lowered to spread
+    GitLab's remaining RateLimit-* allowance over the time left until it
+    resets, and requests are held back entirely while Retry-After or an
+    exhausted allowance is in effect.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, burst: int = 10):
+        self.requests_per_second = requests_per_minute / 60
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._header_rate = None
+        self._header_rate_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until a request may be sent.
+        """
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                rate = self._rate(now)
+                if rate is not None:
+                    self._tokens = min(
+                        self.burst,
+                        self._tokens + (now - self._updated_at) * rate,
+                    )
+                self._updated_at = now
+
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if rate is None:
+                        return
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / rate
+
+            time.sleep(wait)
+
+    def observe(self, response: Response) -> Optional[float]:
+        """
+        Adjusts the pacing of later requests from a response's headers.
+        Returns the number of seconds to wait before retrying if GitLab
+        rejected the request for exceeding its rate limit.
+        """
+
+        headers = response.headers
+        now = time.monotonic()
+        reset_in = self._seconds_until_reset(headers.get("RateLimit-Reset"))
+
+        with self._lock:
+            remaining = _parse_int(headers.get("RateLimit-Remaining"))
+            if remaining is not None and reset_in is not None:
+                if remaining <= 0:
+                    self._paused_until = max(
+                        self._paused_until, now + reset_in
+                    )
+                else:
+                    self._header_rate = remaining / max(reset_in, 1)
+                    self._header_rate_until = now + reset_in
+
+            if response.status_code != 429:
+                return None
+
+            delay = self._seconds_until_retry(headers.get("Retry-After"))
+            if delay is None:
+                delay = reset_in if reset_in is not None else 1.0
+            self._paused_until = max(self._paused_until, now + delay)
+            return delay
+
+    def _rate(self, now: float) -> Optional[float]:
+        rates = [
+            rate
+            for rate in (
+                self.requests_per_second or None,
+                self._header_rate if now < self._header_rate_until else None,
+            )
+            if rate is not None
+        ]
+        return min(rates) if rates else None
+
+    @staticmethod
+    def _seconds_until_reset(reset: Optional[str]) -> Optional[float]:
+        reset_at = _parse_int(reset)
+        if reset_at is None:
+            return None
+        return max(0.0, reset_at - time.time())
+
+    @staticmethod
+    def _seconds_until_retry(retry_after: Optional[str]) -> Optional[float]:
+        if not retry_after:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(retry_after).timestamp()
+        except (TypeError, ValueError, AttributeError):
+            # Unparsable dates are treated as if the header were absent
+            return None
+        return max(0.0, retry_at - time.time())
+
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    """
+    Parses an integer header, treating a missing or malformed one as
+    absent rather than failing the request it came with.
+    """
+
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
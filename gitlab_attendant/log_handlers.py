@@ -1,27 +1,69 @@
-import collections
+import atexit
+import copy
 import json
 import logging
+import queue
+import random
+import reprlib
 import traceback
 
+from logging.handlers import QueueHandler, QueueListener
+
+# Use a faster JSON serializer when one is installed
+try:
+    import orjson
+
+    def _dumps(log_entry: dict) -> str:
+        return orjson.dumps(log_entry, default=str).decode("utf-8")
+
+except ImportError:
+    try:
+        import ujson
+
+        _dumps = ujson.dumps
+    except ImportError:
+        _dumps = json.dumps
+
+# Structured fields passed through `extra` that are added to log entries
+EXTRA_FIELDS = ("task", "project_id", "duration_ms", "instance")
+
 
 class loggingJsonFormatter(logging.Formatter):
     def format(self, record):
-        exc = (
-            traceback.format_exception(*record.exc_info)
-            if record.exc_info
-            else None
-        )
+        if record.exc_info:
+            exc = traceback.format_exception(*record.exc_info)
+        else:
+            exc = getattr(record, "exception_lines", None)
+
+        log_entry = {
+            "timestamp": self.formatTime(record),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "exception": exc,
+        }
+        for field in EXTRA_FIELDS:
+            if hasattr(record, field):
+                log_entry[field] = getattr(record, field)
+
+        return _dumps(log_entry)
+
 
-        log_entry = collections.OrderedDict(
-            [
-                ("timestamp", self.formatTime(record)),
-                ("level", record.levelname),
-                ("message", record.msg),
-                ("exception", exc),
-            ]
-        )
+class _JsonQueueHandler(QueueHandler):
+    """
+    Queues records for the listener thread to format and write, resolving
+    the message and traceback first since the record leaves this thread.
+    """
 
-        return json.dumps(log_entry)
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exception_lines = traceback.format_exception(
+                *record.exc_info
+            )
+            record.exc_info = None
+        return record
 
 
 jsonFormatter = loggingJsonFormatter()
@@ -32,6 +74,117 @@ _logger = logging.StreamHandler()
 _logger.setFormatter(jsonFormatter)
 
 logger.addHandler(_logger)
-logger.setLevel(logging.DEBUG)
+logger.setLevel(logging.INFO)
+
+# Limits applied to request and response bodies written to the log
+_body_logging = {"limit": 1000, "sample_rate": 1.0}
+
+_body_repr = reprlib.Repr()
+_body_repr.maxlevel = 3
+_body_repr.maxdict = 10
+_body_repr.maxlist = 10
+_body_repr.maxstring = 100
+_body_repr.maxother = 100
+
+
+_listener = None
+
+
+def configure_logging(
+    level: str = "INFO",
+    body_limit: int = 1000,
+    body_sample_rate: float = 1.0,
+    use_queue: bool = False,
+):
+    """
+    Sets the log level, the number of characters of each request or
+    response body that is logged, and the fraction of bodies logged.
+    With `use_queue` records are handed to a background thread to be
+    formatted and written, so logging never blocks the caller.
+    """
+
+    global _listener
+
+    logger.setLevel(level.upper())
+    _body_logging["limit"] = body_limit
+    _body_logging["sample_rate"] = body_sample_rate
+
+    if use_queue and _listener is None:
+        log_queue = queue.Queue(-1)
+        _listener = QueueListener(log_queue, _logger)
+        _listener.start()
+        atexit.register(_listener.stop)
+        logger.removeHandler(_logger)
+        logger.addHandler(_JsonQueueHandler(log_queue))
+
+    logger.debug("Logging initialised...")
+
+
+class _InstanceFilter(logging.Filter):
+    """
+    Tags each record with the GitLab instance it came from.
+    """
+
+    def __init__(self, instance: str):
+        super().__init__()
+        self.instance = instance
+
+    def filter(self, record):
+        if not hasattr(record, "instance"):
+            record.instance = self.instance
+        return True
+
+
+def log_to_queue(log_queue, instance: str):
+    """
+    Sends records to a queue shared with a supervising process, tagged
+    with the instance they came from, instead of writing them.
+    """
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handler = _JsonQueueHandler(log_queue)
+    handler.addFilter(_InstanceFilter(instance))
+    logger.addHandler(handler)
+
+
+def listen_to_queue(log_queue) -> QueueListener:
+    """
+    Writes the records that worker processes send to a queue as one
+    combined log, from a background thread.
+    """
+
+    listener = QueueListener(log_queue, _logger)
+    listener.start()
+    return listener
+
+
+class _TruncatedBody:
+    """
+    Defers formatting a body until its log record is emitted, then
+    renders a size-limited representation instead of the whole payload.
+    """
+
+    __slots__ = ("body",)
+
+    def __init__(self, body):
+        self.body = body
+
+    def __str__(self):
+        text = _body_repr.repr(self.body)
+        if len(text) > _body_logging["limit"]:
+            return f"{text[:_body_logging['limit']]}..."
+        return text
+
+
+def log_body(message: str, request_url: str, body):
+    """
+    Logs a request or response body at debug level, doing no work at all
+    unless debug logging is enabled and the body is sampled.
+    """
 
-logger.debug("Logging initialised...")
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    if random.random() >= _body_logging["sample_rate"]:
+        return
+    logger.debug(message, request_url, _TruncatedBody(body))
@@ -1,26 +1,50 @@
-import schedule
+import signal
 import sys
+import threading
 import time
 
 from argparse import ArgumentParser
+from datetime import timedelta
+from typing import Callable, List, Optional
 
-from gitlab_attendant.log_handlers import logger
-from gitlab_attendant.tasks import (
-    assign_project_members_to_issues,
-    assign_open_merge_requests,
-    notify_issue_assignees,
-    notify_stale_merge_request_assignees,
-    remove_merged_branches,
+from gitlab_attendant.async_tasks import run_tasks as run_async_tasks
+from gitlab_attendant.cache import MemberCache, ResponseCache
+from gitlab_attendant.errors import ErrorReport, run_isolated
+from gitlab_attendant.governor import RateLimitGovernor
+from gitlab_attendant.log_handlers import (
+    configure_logging,
+    log_to_queue,
+    logger,
 )
+from gitlab_attendant.metrics import MetricsRegistry, serve_metrics
+from gitlab_attendant.planner import RunPlan
+from gitlab_attendant.profiling import profiling, task_profiling
+from gitlab_attendant.scheduling import (
+    claim_task,
+    group_tasks,
+    parse_task_interval,
+    run_scheduler,
+    schedule_tasks,
+)
+from gitlab_attendant.sharding import ShardClaim, StaticShard
+from gitlab_attendant.snapshot import RunSnapshot
+from gitlab_attendant.supervisor import load_config, run_result, supervise
+from gitlab_attendant.sync import IncrementalSync
+from gitlab_attendant.tasks import SCHEDULED_TASKS
+from gitlab_attendant.utils import GitLabSession, ijson
+from gitlab_attendant.webhooks import WebhookReceiver
+from gitlab_attendant.workload import WorkloadIndex
+
+TASK_NAMES = tuple(task.__name__ for task, _ in SCHEDULED_TASKS)
 
 
-def process_arguments() -> dict:
+def process_arguments(argv: Optional[List[str]] = None) -> dict:
     parser = ArgumentParser(prog="gitlab-attendant")
     parser.add_argument(
         "--ip",
         dest="ip",
         help="specify IP address of the GitLab repository",
-        required=True,
+        required=False,
     )
     parser.add_argument(
         "--interval",
@@ -29,37 +53,628 @@ def process_arguments() -> dict:
         default="24",
         required=False,
     )
+    parser.add_argument(
+        "--task-interval",
+        dest="task_intervals",
+        help="interval for a single task in minutes, with optional jitter "
+        "in minutes randomly added to each interval (ex. "
+        "assign_open_merge_requests=5, remove_merged_branches=1440+60), "
+        "may be repeated",
+        action="append",
+        default=[],
+        required=False,
+    )
+    parser.add_argument(
+        "--jitter",
+        dest="jitter",
+        help="most minutes randomly added to each --interval",
+        default="0",
+        required=False,
+    )
     parser.add_argument(
         "--token",
         dest="token",
         help="GitLab API personal access token",
-        required=True,
+        required=False,
+    )
+    parser.add_argument(
+        "--config",
+        dest="config",
+        help="JSON file listing several GitLab instances to attend to, "
+        "each from its own worker process, instead of --ip and --token",
+        required=False,
+    )
+    parser.add_argument(
+        "--results-file",
+        dest="results_file",
+        help="file to write the latest run result of each instance in "
+        "--config to",
+        required=False,
+    )
+    parser.add_argument(
+        "--tasks",
+        dest="enabled_tasks",
+        help="comma separated tasks to run, may be repeated [default: all]",
+        action="append",
+        default=[],
+        required=False,
+    )
+    parser.add_argument(
+        "--shard-count",
+        dest="shard_count",
+        help="number of replicas splitting the projects between them",
+        default="1",
+        required=False,
+    )
+    parser.add_argument(
+        "--shard-index",
+        dest="shard_index",
+        help="shard of the projects this replica attends to, from 0 to "
+        "--shard-count - 1",
+        required=False,
+    )
+    parser.add_argument(
+        "--shard-claim-dir",
+        dest="shard_claim_dir",
+        help="directory shared by every replica, in which each claims a "
+        "free shard, or the one given by --shard-index, with a lock file",
+        required=False,
+    )
+    parser.add_argument(
+        "--shard-claim-ttl",
+        dest="shard_claim_ttl",
+        help="seconds after which the claim of a replica that stopped "
+        "renewing it may be taken over",
+        default="300",
+        required=False,
+    )
+    parser.add_argument(
+        "--pool-size",
+        dest="pool_size",
+        help="number of keep-alive connections to the GitLab API (ex. 10)",
+        default="10",
+        required=False,
+    )
+    parser.add_argument(
+        "--concurrency",
+        dest="concurrency",
+        help="maximum number of concurrent GitLab API requests (ex. 1, 20)",
+        default="1",
+        required=False,
+    )
+    parser.add_argument(
+        "--branch-workers",
+        dest="branch_workers",
+        help="number of projects to remove merged branches from at once",
+        default="1",
+        required=False,
+    )
+    parser.add_argument(
+        "--member-cache-ttl",
+        dest="member_cache_ttl",
+        help="seconds to cache project members across runs, 0 to disable",
+        default="0",
+        required=False,
+    )
+    parser.add_argument(
+        "--member-cache-size",
+        dest="member_cache_size",
+        help="maximum number of projects held in the member cache",
+        default="1000",
+        required=False,
+    )
+    parser.add_argument(
+        "--member-cache-file",
+        dest="member_cache_file",
+        help="file to persist the member cache to between restarts",
+        default=None,
+        required=False,
+    )
+    parser.add_argument(
+        "--http-cache-dir",
+        dest="http_cache_dir",
+        help="directory to cache GET responses in for ETag revalidation",
+        default=None,
+        required=False,
+    )
+    parser.add_argument(
+        "--stream-json",
+        dest="stream_json",
+        help="decode list responses item by item as they arrive, keeping "
+        "memory flat on large instances (requires ijson)",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "--sync-state-file",
+        dest="sync_state_file",
+        help="file to keep open issues and merge requests in between runs, "
+        "enabling incremental sync",
+        default=None,
+        required=False,
+    )
+    parser.add_argument(
+        "--full-sync-interval",
+        dest="full_sync_interval",
+        help="hours between full syncs when syncing incrementally",
+        default="24",
+        required=False,
+    )
+    parser.add_argument(
+        "--rate-limit",
+        dest="rate_limit",
+        help="maximum GitLab API requests per minute, 0 to only follow "
+        "GitLab's rate limit headers",
+        default="0",
+        required=False,
+    )
+    parser.add_argument(
+        "--metrics-port",
+        dest="metrics_port",
+        help="port on which to serve Prometheus metrics on localhost, "
+        "0 to disable",
+        default="0",
+        required=False,
+    )
+    parser.add_argument(
+        "--metrics-file",
+        dest="metrics_file",
+        help="file to write Prometheus metrics to after each run, for the "
+        "node exporter's textfile collector",
+        required=False,
+    )
+    parser.add_argument(
+        "--webhook-port",
+        dest="webhook_port",
+        help="port on which to receive GitLab issue, merge request and push "
+        "webhooks, 0 to disable",
+        default="0",
+        required=False,
+    )
+    parser.add_argument(
+        "--webhook-host",
+        dest="webhook_host",
+        help="address on which to receive GitLab webhooks",
+        default="127.0.0.1",
+        required=False,
+    )
+    parser.add_argument(
+        "--webhook-secret",
+        dest="webhook_secret",
+        help="secret token GitLab sends with each webhook",
+        required=False,
     )
+    parser.add_argument(
+        "--dry-run",
+        dest="dry_run",
+        help="run the tasks once without making changes, then print the "
+        "requests made per endpoint and the actions that would be taken",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "--profile",
+        dest="profile_dir",
+        help="directory to write a pstats profile of each run to, with a "
+        "summary of the slowest functions logged",
+        required=False,
+    )
+    parser.add_argument(
+        "--profile-top",
+        dest="profile_top",
+        help="number of functions in the logged profile summary",
+        default="20",
+        required=False,
+    )
+    parser.add_argument(
+        "--profile-task",
+        dest="profile_task",
+        help="profile only the named task (ex. assign_open_merge_requests)",
+        required=False,
+    )
+    parser.add_argument(
+        "--log-level",
+        dest="log_level",
+        help="log level (ex. DEBUG, INFO, ERROR)",
+        default="INFO",
+        required=False,
+    )
+    parser.add_argument(
+        "--log-body-limit",
+        dest="log_body_limit",
+        help="maximum characters of each request or response body logged "
+        "at DEBUG level",
+        default="1000",
+        required=False,
+    )
+    parser.add_argument(
+        "--log-body-sample-rate",
+        dest="log_body_sample_rate",
+        help="fraction of request and response bodies logged at DEBUG "
+        "level (ex. 0.1, 1)",
+        default="1",
+        required=False,
+    )
+    parser.add_argument(
+        "--log-queue",
+        dest="log_queue",
+        help="write logs from a background thread so that logging never "
+        "blocks requests to GitLab",
+        action="store_true",
+        required=False,
+    )
+
+    args = parser.parse_args(argv)
 
-    args = parser.parse_args()
+    if args.config and (args.ip or args.token):
+        parser.error("--config can't be combined with --ip or --token")
+    if not args.config and not (args.ip and args.token):
+        parser.error("--ip and --token are required without --config")
+    if args.stream_json and args.http_cache_dir:
+        parser.error("--stream-json can't be combined with --http-cache-dir")
+    if args.profile_task and not args.profile_dir:
+        parser.error("--profile-task requires --profile")
+    # The profiler only sees the thread that runs the tasks, so work on
+    # worker threads would be missing from the profile
+    if args.profile_dir and (
+        int(args.concurrency) > 1 or int(args.branch_workers) > 1
+    ):
+        parser.error(
+            "--profile requires --concurrency and --branch-workers of 1"
+        )
+    if int(args.shard_count) > 1 and not (
+        args.shard_index is not None or args.shard_claim_dir
+    ):
+        parser.error(
+            "--shard-count requires --shard-index or --shard-claim-dir"
+        )
+    if args.shard_index is not None and not (
+        0 <= int(args.shard_index) < int(args.shard_count)
+    ):
+        parser.error("--shard-index must be less than --shard-count")
+
+    enabled_tasks = [
+        task_name.strip()
+        for tasks_value in args.enabled_tasks
+        for task_name in tasks_value.split(",")
+        if task_name.strip()
+    ]
+    for task_name in enabled_tasks:
+        if task_name not in TASK_NAMES:
+            parser.error(
+                f"unknown task in --tasks: {task_name} (choose from "
+                + ", ".join(TASK_NAMES)
+                + ")"
+            )
+
+    task_intervals = {}
+    for task_interval in args.task_intervals:
+        try:
+            task_name, minutes, jitter = parse_task_interval(task_interval)
+        except ValueError:
+            parser.error(f"invalid --task-interval: {task_interval}")
+        if task_name not in TASK_NAMES:
+            parser.error(
+                f"unknown task in --task-interval: {task_name} (choose from "
+                + ", ".join(TASK_NAMES)
+                + ")"
+            )
+        task_intervals[task_name] = (minutes, jitter)
 
     return {
         "ip_address": args.ip,
         "interval": args.interval,
+        "task_intervals": task_intervals,
+        "enabled_tasks": [
+            task_name
+            for task_name in TASK_NAMES
+            if not enabled_tasks or task_name in enabled_tasks
+        ],
+        "config": args.config,
+        "results_file": args.results_file,
+        "jitter": args.jitter,
         "token": args.token,
+        "shard_count": args.shard_count,
+        "shard_index": args.shard_index,
+        "shard_claim_dir": args.shard_claim_dir,
+        "shard_claim_ttl": args.shard_claim_ttl,
+        "pool_size": args.pool_size,
+        "concurrency": args.concurrency,
+        "branch_workers": args.branch_workers,
+        "member_cache_ttl": args.member_cache_ttl,
+        "member_cache_size": args.member_cache_size,
+        "member_cache_file": args.member_cache_file,
+        "http_cache_dir": args.http_cache_dir,
+        "stream_json": args.stream_json,
+        "sync_state_file": args.sync_state_file,
+        "full_sync_interval": args.full_sync_interval,
+        "rate_limit": args.rate_limit,
+        "metrics_port": args.metrics_port,
+        "metrics_file": args.metrics_file,
+        "webhook_port": args.webhook_port,
+        "webhook_host": args.webhook_host,
+        "webhook_secret": args.webhook_secret,
+        "dry_run": args.dry_run,
+        "profile_dir": args.profile_dir,
+        "profile_top": args.profile_top,
+        "profile_task": args.profile_task,
+        "log_level": args.log_level,
+        "log_body_limit": args.log_body_limit,
+        "log_body_sample_rate": args.log_body_sample_rate,
+        "log_queue": args.log_queue,
     }
 
 
-def tasks(args):
+def tasks(args, task_names: Optional[List[str]] = None):
     """
     Function calls to the tasks that the GitLab Attendant
-    is capable of running.
+    is capable of running, or just the named ones.
     """
     logger.info("GitLab Attendant has woken up...")
+
+    # A replica without a shard has no projects to attend to, so it tries
+    # to claim one again on each run
+    shard = args.get("shard")
+    if shard is not None and not shard.claim():
+        logger.warning("GitLab Attendant holds no shard, skipping run...")
+        return ErrorReport()
+
     logger.info(
         f"GitLab Attendant will begin attending to GitLab instance at {args['ip_address']}..."
     )
 
-    assign_project_members_to_issues(args)
-    assign_open_merge_requests(args)
-    notify_issue_assignees(args, 7)
-    notify_stale_merge_request_assignees(args, 7)
-    remove_merged_branches(args)
+    concurrency = int(args["concurrency"])
+
+    # A single pooled session and data snapshot are shared by every task
+    # in this run, with enough connections for each concurrent request
+    pool_size = max(
+        int(args["pool_size"]), concurrency, int(args["branch_workers"])
+    )
+    # Failed requests and tasks are collected over the run, rather than
+    # stopping it, and reported once it has finished
+    error_report = ErrorReport()
+    metrics = args.get("metrics")
+
+    with GitLabSession(
+        args["token"],
+        pool_size,
+        governor=args.get("governor"),
+        error_report=error_report,
+        metrics=metrics,
+        plan=args.get("plan"),
+    ) as session:
+        run_args = {
+            **args,
+            "session": session,
+            "snapshot": RunSnapshot(),
+            "workload": WorkloadIndex(),
+            "sync_pending": {},
+            "error_report": error_report,
+            "task_names": task_names,
+        }
+
+        if concurrency > 1:
+            run_async_tasks(run_args, concurrency)
+        else:
+            for task, task_args in SCHEDULED_TASKS:
+                if task_names is not None and task.__name__ not in task_names:
+                    continue
+                with claim_task(run_args, task.__name__) as claimed:
+                    if not claimed:
+                        continue
+                    with task_profiling(run_args, task.__name__):
+                        run_isolated(
+                            error_report,
+                            task,
+                            run_args,
+                            *task_args,
+                            metrics=metrics,
+                        )
+
+    error_report.log_summary()
+
+    if metrics is not None:
+        metrics.set("last_run_timestamp_seconds", {}, time.time())
+        metrics.set("last_run_failures", {}, len(error_report.failures))
+        if args["metrics_file"]:
+            metrics.write(args["metrics_file"])
+
+    # Only advance the sync watermarks of the lists this run fetched, once
+    # every one was read in full, and never on a dry run
+    incremental_sync = args.get("incremental_sync")
+    if (
+        incremental_sync is not None
+        and "plan" not in args
+        and not error_report.has_failures("GET")
+    ):
+        incremental_sync.commit(run_args["sync_pending"])
+
+    member_cache = args.get("member_cache")
+    if member_cache is not None:
+        stats = member_cache.stats()
+        logger.info(
+            f"Member cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} projects cached..."
+        )
+        member_cache.save()
+
+    return error_report
+
+
+def profiled_tasks(
+    args, task_names: Optional[List[str]] = None
+) -> ErrorReport:
+    """
+    Runs the tasks, profiling the whole run unless a single task has
+    been chosen for profiling. The profile is named after the tasks run,
+    as task groups on different intervals are profiled separately.
+    """
+
+    with profiling(
+        args["profile_dir"] if not args["profile_task"] else None,
+        "-".join(["tasks"] + list(task_names or ())),
+        int(args["profile_top"]),
+    ):
+        return tasks(args, task_names)
+
+
+def add_long_lived_state(args: dict) -> dict:
+    """
+    Adds the objects that are kept across scheduled runs to the
+    arguments, according to the options enabled.
+    """
+
+    # Project members are cached across scheduled runs when enabled
+    if int(args["member_cache_ttl"]) > 0:
+        args["member_cache"] = MemberCache(
+            int(args["member_cache_ttl"]),
+            int(args["member_cache_size"]),
+            args["member_cache_file"],
+        )
+
+    # Requests are paced by one governor for the life of the process, so
+    # GitLab's rate limits carry over from one run to the next
+    args["governor"] = RateLimitGovernor(float(args["rate_limit"]))
+
+    # GET responses are revalidated against their cached ETags when enabled
+    if args["http_cache_dir"]:
+        args["response_cache"] = ResponseCache(args["http_cache_dir"])
+
+    # Without ijson, list responses are decoded whole as before
+    if args.get("stream_json") and ijson is None:
+        logger.warning(
+            "--stream-json requires ijson, which isn't installed, so "
+            "responses will be decoded whole..."
+        )
+
+    # Open issues and merge requests are synced incrementally when enabled
+    if args["sync_state_file"]:
+        args["incremental_sync"] = IncrementalSync(
+            args["sync_state_file"],
+            timedelta(hours=int(args["full_sync_interval"])),
+        )
+
+    # Metrics are kept for the life of the process when enabled
+    if int(args["metrics_port"]) > 0 or args["metrics_file"]:
+        args["metrics"] = MetricsRegistry()
+
+    # Projects are split between replicas when sharding is enabled
+    if int(args["shard_count"]) > 1:
+        shard_index = (
+            int(args["shard_index"])
+            if args["shard_index"] is not None
+            else None
+        )
+        if args["shard_claim_dir"]:
+            args["shard"] = ShardClaim(
+                args["shard_claim_dir"],
+                int(args["shard_count"]),
+                float(args["shard_claim_ttl"]),
+                shard_index,
+            )
+        else:
+            args["shard"] = StaticShard(shard_index, int(args["shard_count"]))
+
+    # Held while a task runs, so a run of it that is still in progress
+    # is never started again, and webhooks wait for it to finish
+    args["task_locks"] = {
+        task_name: threading.Lock() for task_name in TASK_NAMES
+    }
+
+    return args
+
+
+def attend(
+    args: dict,
+    run: Callable[[dict, Optional[List[str]]], ErrorReport] = profiled_tasks,
+):
+    """
+    Attends to a GitLab instance, calling `run` with the arguments and
+    the tasks that are due whenever tasks are due.
+    """
+    add_long_lived_state(args)
+
+    # A shard is claimed up front, so webhooks for it are acted on before
+    # the first scheduled run
+    if args.get("shard") is not None:
+        args["shard"].claim()
+
+    # SIGUSR1 forces every project's members to be fetched again
+    member_cache = args.get("member_cache")
+    if member_cache is not None and hasattr(signal, "SIGUSR1"):
+        signal.signal(
+            signal.SIGUSR1, lambda signum, frame: member_cache.invalidate()
+        )
+
+    # A dry run runs the tasks once, sending only GET requests
+    if args["dry_run"]:
+        args["plan"] = RunPlan()
+        run(args, args["enabled_tasks"])
+        print(args["plan"].render())
+        return
+
+    if int(args["metrics_port"]) > 0:
+        serve_metrics(args["metrics"], int(args["metrics_port"]))
+
+    # Webhooks are acted on as they arrive, with the scheduled runs kept
+    # as a sweep for anything they miss
+    if int(args["webhook_port"]) > 0:
+        WebhookReceiver(
+            args,
+            args["webhook_host"],
+            int(args["webhook_port"]),
+            args["webhook_secret"],
+        ).start()
+
+    # Tasks without an interval of their own run every --interval hours
+    schedule_tasks(
+        run,
+        args,
+        group_tasks(
+            args["enabled_tasks"],
+            args["task_intervals"],
+            (float(args["interval"]) * 60, float(args["jitter"])),
+        ),
+    )
+
+    # SIGHUP runs every task straight away
+    wake = threading.Event()
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda signum, frame: wake.set())
+
+    run_scheduler(wake)
+
+
+def run_instance(name: str, argv: List[str], log_queue, results):
+    """
+    Attends to one of the instances in a config file from a worker
+    process, sending its logs and the result of each run to the
+    supervisor.
+    """
+    # The supervisor stops its workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    args = process_arguments(argv)
+    configure_logging(
+        args["log_level"],
+        int(args["log_body_limit"]),
+        float(args["log_body_sample_rate"]),
+    )
+    log_to_queue(log_queue, name)
+
+    def run(args: dict, task_names: Optional[List[str]] = None):
+        started = time.time()
+        error_report = profiled_tasks(args, task_names)
+        results.put(
+            run_result(
+                name,
+                task_names or args["enabled_tasks"],
+                started,
+                error_report,
+            )
+        )
+        return error_report
+
+    attend(args, run)
 
 
 def main():
@@ -67,11 +682,26 @@ def main():
 	Entrypoint to the application.
 	"""
     args = process_arguments()
-    schedule.every(int(args["interval"])).hours.do(tasks, args)
+    configure_logging(
+        args["log_level"],
+        int(args["log_body_limit"]),
+        float(args["log_body_sample_rate"]),
+        args["log_queue"],
+    )
+
+    # Several instances are attended to from one worker process each
+    if args["config"]:
+        instances = load_config(args["config"])
+        for name, argv in instances:
+            try:
+                process_arguments(argv)
+            except SystemExit:
+                logger.error(f"Invalid options for instance {name}...")
+                raise
+        supervise(instances, run_instance, args["results_file"])
+        return
 
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    attend(args)
 
 
 if __name__ == "__main__":
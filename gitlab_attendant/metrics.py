@@ -0,0 +1,300 @@
+import bisect
+import contextlib
+import contextvars
+import os
+import re
+import threading
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import Optional, Tuple
+from urllib.parse import urlsplit
+
+# Upper bounds of the latency histogram buckets, in seconds
+REQUEST_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+TASK_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 600, 1800, 3600)
+
+_ID_SEGMENT = re.compile(r"/(\d+)(?=/|$)")
+
+# The task making requests in the current context, which request metrics
+# are labelled with. Worker threads see it when run in a copy of the
+# context that submitted them, with contextvars.copy_context().run
+_current_task = contextvars.ContextVar("task", default=None)
+
+
+@contextlib.contextmanager
+def task_label(task_name: str):
+    """
+    Labels the request metrics recorded within the block with the task.
+    """
+
+    token = _current_task.set(task_name)
+    try:
+        yield
+    finally:
+        _current_task.reset(token)
+
+
+def endpoint_template(request_url: str) -> str:
+    """
+    Returns the path of a request URL with its numeric IDs replaced, so
+    that requests to the same endpoint share a label.
+    """
+
+    return _ID_SEGMENT.sub("/:id", urlsplit(request_url).path)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Counters, gauges and latency histograms for the requests made and
+    tasks run by the GitLab Attendant, kept for the life of the process
+    and rendered in the Prometheus text exposition format.
+    """
+
+    PREFIX = "gitlab_attendant"
+    HELP = {
+        "requests_total": "Requests made to the GitLab API.",
+        "request_errors_total": "Requests to the GitLab API that failed.",
+        "request_duration_seconds": "Latency of requests to the GitLab API.",
+        "task_runs_total": "Task runs.",
+        "task_failures_total": "Task runs that raised an exception.",
+        "task_duration_seconds": "Duration of task runs.",
+        "last_run_timestamp_seconds": "Time the last run finished.",
+        "last_run_failures": "Failures recorded in the last run.",
+        "webhook_events_total": "Webhooks received from GitLab.",
+    }
+
+    def __init__(self):
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def inc(self, name: str, labels: dict, value: float = 1):
+        """
+        Increments a counter.
+        """
+
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name: str, labels: dict, value: float):
+        """
+        Sets a gauge.
+        """
+
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(
+        self,
+        name: str,
+        labels: dict,
+        value: float,
+        buckets: Tuple[float, ...] = REQUEST_BUCKETS,
+    ):
+        """
+        Adds an observation to a histogram.
+        """
+
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def observe_request(
+        self,
+        method: str,
+        request_url: str,
+        seconds: float,
+        status_code: Optional[int],
+    ):
+        """
+        Records a request to the GitLab API, where a status code of None
+        means no response was received. Requests made by a task are
+        labelled with it.
+        """
+
+        labels = {
+            "endpoint": endpoint_template(request_url),
+            "method": method.upper(),
+        }
+        task = _current_task.get()
+        if task is not None:
+            labels["task"] = task
+        status = str(status_code) if status_code is not None else "error"
+        self.inc("requests_total", {**labels, "status": status})
+        self.observe("request_duration_seconds", labels, seconds)
+        if status_code is None or status_code >= 400:
+            self.inc("request_errors_total", labels)
+
+    def observe_task(self, task: str, seconds: float, failed: bool = False):
+        """
+        Records a task run.
+        """
+
+        labels = {"task": task}
+        self.inc("task_runs_total", labels)
+        self.observe("task_duration_seconds", labels, seconds, TASK_BUCKETS)
+        if failed:
+            self.inc("task_failures_total", labels)
+
+    def render(self) -> str:
+        """
+        Returns every metric in the Prometheus text exposition format.
+        """
+
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {
+                key: (
+                    histogram.buckets,
+                    list(histogram.counts),
+                    histogram.total,
+                    histogram.count,
+                )
+                for key, histogram in self._histograms.items()
+            }
+
+        lines = []
+        for metric_type, samples in (
+            ("counter", counters),
+            ("gauge", gauges),
+        ):
+            for name in sorted({name for name, _ in samples}):
+                self._render_header(lines, name, metric_type)
+                for (sample_name, labels), value in sorted(samples.items()):
+                    if sample_name == name:
+                        lines.append(
+                            f"{self.PREFIX}_{name}{_labels(labels)} "
+                            f"{_number(value)}"
+                        )
+
+        for name in sorted({name for name, _ in histograms}):
+            self._render_header(lines, name, "histogram")
+            for (sample_name, labels), histogram in sorted(histograms.items()):
+                if sample_name != name:
+                    continue
+                buckets, counts, total, count = histogram
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(
+                        f"{self.PREFIX}_{name}_bucket"
+                        f"{_labels(labels + (('le', _number(bound)),))} "
+                        f"{cumulative}"
+                    )
+                lines.append(
+                    f"{self.PREFIX}_{name}_bucket"
+                    f"{_labels(labels + (('le', '+Inf'),))} {count}"
+                )
+                lines.append(
+                    f"{self.PREFIX}_{name}_sum{_labels(labels)} "
+                    f"{_number(total)}"
+                )
+                lines.append(
+                    f"{self.PREFIX}_{name}_count{_labels(labels)} {count}"
+                )
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """
+        Writes the metrics to a file for the node exporter's textfile
+        collector, replacing it in one step so it's never read half
+        written.
+        """
+
+        temporary_path = f"{path}.tmp"
+        with self._write_lock:
+            with open(temporary_path, "w") as metrics_file:
+                metrics_file.write(self.render())
+            os.replace(temporary_path, path)
+
+    def _render_header(self, lines: list, name: str, metric_type: str):
+        help_text = self.HELP.get(name)
+        if help_text:
+            lines.append(f"# HELP {self.PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {self.PREFIX}_{name} {metric_type}")
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return (
+        "{"
+        + ",".join(
+            '{}="{}"'.format(
+                name,
+                str(value)
+                .replace("\\", "\\\\")
+                .replace("\n", "\\n")
+                .replace('"', '\\"'),
+            )
+            for name, value in labels
+        )
+        + "}"
+    )
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def serve_metrics(
+    registry: MetricsRegistry, port: int, host: str = "127.0.0.1"
+) -> HTTPServer:
+    """
+    Serves the metrics on /metrics from a background thread and returns
+    the server.
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header(
+                "Content-Type", "text/plain; version=0.0.4; charset=utf-8"
+            )
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = _ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
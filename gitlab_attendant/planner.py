@@ -0,0 +1,114 @@
+import collections
+import threading
+
+from urllib.parse import urlencode
+
+from gitlab_attendant.metrics import endpoint_template
+
+
+class RunPlan:
+    """
+    Requests a dry run made or would have made, with the actions that
+    GitLab Attendant would have taken. Reads are sent and counted as
+    made, while writes are only recorded.
+    """
+
+    METHODS = ("GET", "PUT", "POST", "DELETE")
+    CATEGORIES = (
+        ("assignment", "Assignments"),
+        ("note", "Notes"),
+        ("branch_removal", "Merged branch removals"),
+    )
+
+    def __init__(self):
+        self._requests = collections.OrderedDict()
+        self.actions = []
+        self._lock = threading.Lock()
+
+    def record_request(
+        self,
+        method: str,
+        request_url: str,
+        bytes_sent: int,
+        bytes_received: int,
+    ):
+        """
+        Counts a request that was sent to the GitLab API.
+        """
+
+        key = (method.upper(), endpoint_template(request_url))
+        with self._lock:
+            count, total_bytes = self._requests.get(key, (0, 0))
+            self._requests[key] = (
+                count + 1,
+                total_bytes + bytes_sent + bytes_received,
+            )
+
+    def record_write(
+        self,
+        method: str,
+        request_url: str,
+        body: dict,
+        category: str,
+        description: str,
+    ):
+        """
+        Records a write that wasn't sent, estimating its size from its
+        payload, along with the action it would have taken.
+        """
+
+        self.record_request(
+            method, request_url, len(urlencode(body or {}, doseq=True)), 0
+        )
+        with self._lock:
+            self.actions.append((category, description))
+
+    def render(self) -> str:
+        """
+        Returns the plan as text, with the requests made per endpoint and
+        the actions that would have been taken.
+        """
+
+        with self._lock:
+            requests = sorted(
+                self._requests.items(),
+                key=lambda item: (
+                    (
+                        self.METHODS.index(item[0][0])
+                        if item[0][0] in self.METHODS
+                        else len(self.METHODS)
+                    ),
+                    item[0],
+                ),
+            )
+            actions = list(self.actions)
+
+        lines = ["Dry run plan", "", "Requests by endpoint:"]
+        totals = collections.OrderedDict()
+        total_bytes = 0
+        for (method, endpoint), (count, request_bytes) in requests:
+            lines.append(
+                f"  {method:<7} {endpoint:<60} {count:>6}  "
+                f"{request_bytes / 1024:>9.1f} KiB"
+            )
+            totals[method] = totals.get(method, 0) + count
+            total_bytes += request_bytes
+        lines.append(
+            "  Total: "
+            + ", ".join(
+                f"{method} {count}" for method, count in totals.items()
+            )
+            + f" ({sum(totals.values())} requests, "
+            f"{total_bytes / 1024:.1f} KiB estimated)"
+        )
+
+        for category, title in self.CATEGORIES:
+            described = [
+                description
+                for action_category, description in actions
+                if action_category == category
+            ]
+            lines.extend(["", f"{title} ({len(described)}):"])
+            lines.extend(f"  {description}" for description in described)
+
+        return "\n".join(lines)
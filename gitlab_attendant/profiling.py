@@ -0,0 +1,70 @@
+import contextlib
+import cProfile
+import io
+import itertools
+import os
+import pstats
+
+from datetime import datetime
+from typing import Optional
+
+from gitlab_attendant.log_handlers import logger
+
+# Numbers the profiles written by this process, so runs that finish in
+# the same instant on different threads never share a file
+_profile_numbers = itertools.count(1)
+
+
+@contextlib.contextmanager
+def profiling(directory: Optional[str], name: str, top: int = 20):
+    """
+    Profiles the code run inside the block, writing the stats to a pstats
+    file in the given directory and logging the functions that took the
+    most time. Does nothing if no directory is given.
+    """
+
+    if not directory:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(directory, exist_ok=True)
+        # Several instances may share the directory, and each runs in a
+        # process of its own
+        path = os.path.join(
+            directory,
+            f"{name}-{datetime.now():%Y%m%d-%H%M%S-%f}-{os.getpid()}-"
+            f"{next(_profile_numbers)}.pstats",
+        )
+        profiler.dump_stats(path)
+
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats(
+            "tottime"
+        ).print_stats(top)
+        logger.info(
+            "Profile of %s written to %s, top %s functions by time:\n%s",
+            name,
+            path,
+            top,
+            summary.getvalue(),
+        )
+
+
+def task_profiling(cli_args: dict, task_name: str):
+    """
+    Profiles the block if the given task is the one selected for
+    profiling.
+    """
+
+    profile_task = cli_args.get("profile_task")
+    return profiling(
+        cli_args.get("profile_dir") if profile_task == task_name else None,
+        task_name,
+        int(cli_args.get("profile_top", 20)),
+    )
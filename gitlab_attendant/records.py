@@ -0,0 +1,134 @@
+import dateutil.parser
+import pytz
+import sys
+
+from datetime import datetime
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parses an ISO 8601 timestamp or date from the GitLab API into a UTC
+    datetime, taking the fast standard library path for the formats
+    GitLab sends and falling back to dateutil for anything else. Times
+    without a timezone are taken to be UTC.
+    """
+
+    if not value:
+        return None
+
+    try:
+        if value.endswith("Z"):
+            value = f"{value[:-1]}+00:00"
+        timestamp = datetime.fromisoformat(value)
+    except (AttributeError, ValueError):
+        # datetime.fromisoformat is missing before Python 3.7
+        timestamp = dateutil.parser.parse(value)
+
+    if timestamp.tzinfo is None:
+        return pytz.utc.localize(timestamp)
+    return timestamp.astimezone(pytz.utc)
+
+
+def format_timestamp(timestamp: datetime) -> str:
+    """
+    Formats a UTC datetime the way the GitLab API sends timestamps, such
+    as 2018-08-10T12:00:00.123Z.
+    """
+
+    return f"{timestamp:%Y-%m-%dT%H:%M:%S}.{timestamp.microsecond // 1000:03}Z"
+
+
+class User(NamedTuple):
+    id: int
+    username: str
+
+    @classmethod
+    def from_json(cls, user: Optional[dict]) -> Optional["User"]:
+        if not user:
+            return None
+        return _user(user["id"], user.get("username", ""))
+
+
+@lru_cache(maxsize=4096)
+def _user(user_id: int, username: str) -> User:
+    # The same few users author and are assigned most records, so each
+    # is held once and shared rather than copied into every record
+    return User(user_id, username)
+
+
+def _status(status: Optional[str]) -> Optional[str]:
+    # Every record carries one of a handful of states, which the JSON
+    # decoder would otherwise hand out as a fresh string each time
+    return sys.intern(status) if isinstance(status, str) else status
+
+
+def _users(users: Optional[list]) -> Tuple[User, ...]:
+    return tuple(User.from_json(user) for user in users or ())
+
+
+class Project(NamedTuple):
+    id: int
+
+    @classmethod
+    def from_json(cls, project: dict) -> "Project":
+        return cls(project["id"])
+
+
+class Issue(NamedTuple):
+    id: int
+    iid: int
+    project_id: int
+    state: str
+    assignee: Optional[User]
+    assignees: Tuple[User, ...]
+    due_date: Optional[datetime]
+
+    @classmethod
+    def from_json(cls, issue: dict) -> "Issue":
+        return cls(
+            issue.get("id"),
+            issue.get("iid"),
+            issue.get("project_id"),
+            _status(issue.get("state", "opened")),
+            User.from_json(issue.get("assignee")),
+            _users(issue.get("assignees")),
+            parse_timestamp(issue.get("due_date")),
+        )
+
+
+class MergeRequest(NamedTuple):
+    id: int
+    iid: int
+    project_id: int
+    state: str
+    work_in_progress: bool
+    created_at: Optional[datetime]
+    author: Optional[User]
+    assignee: Optional[User]
+    assignees: Tuple[User, ...]
+    merge_status: str
+
+    @classmethod
+    def from_json(cls, merge_request: dict) -> "MergeRequest":
+        return cls(
+            merge_request.get("id"),
+            merge_request.get("iid"),
+            merge_request.get("project_id"),
+            _status(merge_request.get("state", "opened")),
+            bool(merge_request.get("work_in_progress")),
+            parse_timestamp(merge_request.get("created_at")),
+            User.from_json(merge_request.get("author")),
+            User.from_json(merge_request.get("assignee")),
+            _users(merge_request.get("assignees")),
+            _status(merge_request.get("merge_status", "")),
+        )
+
+
+# The record type each list dataset's JSON is turned into as it is read
+RECORD_TYPES = {
+    "projects": Project,
+    "issues": Issue,
+    "merge_requests": MergeRequest,
+}
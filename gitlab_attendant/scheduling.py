@@ -0,0 +1,127 @@
+import collections
+import contextlib
+import threading
+
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import schedule
+
+from gitlab_attendant.log_handlers import logger
+
+
+def parse_task_interval(value: str) -> Tuple[str, float, float]:
+    """
+    Parses a task interval given as NAME=MINUTES or NAME=MINUTES+JITTER,
+    where the jitter is the most minutes randomly added to each interval.
+    """
+
+    name, _, schedule_spec = value.partition("=")
+    minutes, _, jitter = schedule_spec.partition("+")
+    return name.strip(), float(minutes), float(jitter or 0)
+
+
+def group_tasks(
+    task_names: Iterable[str],
+    task_intervals: Dict[str, Tuple[float, float]],
+    default_interval: Tuple[float, float],
+) -> Dict[Tuple[int, int], List[str]]:
+    """
+    Groups tasks by their interval and jitter in whole seconds, so tasks
+    on the same schedule share one run and the data it fetches.
+    """
+
+    groups = collections.OrderedDict()
+    for task_name in task_names:
+        minutes, jitter = task_intervals.get(task_name, default_interval)
+        key = (max(int(minutes * 60), 1), int(jitter * 60))
+        groups.setdefault(key, []).append(task_name)
+    return groups
+
+
+@contextlib.contextmanager
+def claim_task(cli_args: dict, task_name: str):
+    """
+    Yields whether the task may run now, which it may not while an
+    earlier run of it is still in progress.
+    """
+
+    lock = cli_args.get("task_locks", {}).get(task_name)
+    if lock is None:
+        yield True
+        return
+
+    if not lock.acquire(blocking=False):
+        logger.warning(
+            f"Task {task_name} is still running from an earlier run, skipping..."
+        )
+        yield False
+        return
+
+    try:
+        yield True
+    finally:
+        lock.release()
+
+
+def start_run(
+    run: Callable[[dict, List[str]], None], args: dict, task_names: List[str]
+) -> threading.Thread:
+    """
+    Runs the tasks on their own thread, so that a slow run doesn't hold
+    up others that are due.
+    """
+
+    thread = threading.Thread(
+        target=run,
+        args=(args, task_names),
+        name=f"tasks-{'-'.join(task_names)}",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def schedule_tasks(
+    run: Callable[[dict, List[str]], None],
+    args: dict,
+    groups: Dict[Tuple[int, int], List[str]],
+    scheduler: schedule.Scheduler = schedule.default_scheduler,
+) -> List[schedule.Job]:
+    """
+    Schedules a run of each group of tasks every interval, randomly
+    lengthened by up to the jitter.
+    """
+
+    jobs = []
+    for (seconds, jitter), task_names in groups.items():
+        job = scheduler.every(seconds)
+        if jitter:
+            job = job.to(seconds + jitter)
+        jobs.append(job.seconds.do(start_run, run, args, task_names))
+        logger.info(
+            f"Scheduled {', '.join(task_names)} every {seconds} seconds"
+            + (
+                f" plus up to {jitter} seconds of jitter..."
+                if jitter
+                else "..."
+            )
+        )
+    return jobs
+
+
+def run_scheduler(
+    wake: threading.Event,
+    scheduler: schedule.Scheduler = schedule.default_scheduler,
+):
+    """
+    Runs jobs as they fall due, sleeping until the next one is due unless
+    woken to run every job at once.
+    """
+
+    while True:
+        if wake.wait(max(scheduler.idle_seconds, 0)):
+            wake.clear()
+            logger.info("Running every task now...")
+            scheduler.run_all()
+        else:
+            scheduler.run_pending()
@@ -0,0 +1,210 @@
+import atexit
+import hashlib
+import os
+import socket
+import threading
+import time
+import uuid
+
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from gitlab_attendant.log_handlers import logger
+
+# Datasets split between replicas, with the field holding the project id
+SHARDED_DATASETS = {
+    "projects": "id",
+    "issues": "project_id",
+    "merge_requests": "project_id",
+}
+
+
+@lru_cache(maxsize=65536)
+def shard_for(project_id: int, shard_count: int) -> int:
+    """
+    Returns the shard that owns a project. Rendezvous hashing gives each
+    project exactly one owner, spreads projects evenly, and moves only
+    the projects of an added or removed shard when the count changes.
+    """
+
+    return max(
+        range(shard_count),
+        key=lambda shard: hashlib.blake2b(
+            f"{project_id}:{shard}".encode("utf-8"), digest_size=8
+        ).digest(),
+    )
+
+
+def owns_project(cli_args: dict, project_id: int) -> bool:
+    """
+    Returns whether this replica attends to the given project, which it
+    does for every project unless sharding is enabled.
+    """
+
+    shard = cli_args.get("shard")
+    if shard is None:
+        return True
+    if shard.index is None:
+        return False
+    return shard_for(project_id, shard.count) == shard.index
+
+
+def owned_records(
+    cli_args: dict, dataset: str, records: Iterable[tuple]
+) -> Iterable[tuple]:
+    """
+    Lazily yields the records of a dataset that belong to this replica's
+    projects. Datasets that aren't split by project are left whole.
+    """
+
+    key = SHARDED_DATASETS.get(dataset)
+    if key is None:
+        return records
+    return (
+        record
+        for record in records
+        if owns_project(cli_args, getattr(record, key))
+    )
+
+
+class StaticShard:
+    """
+    A shard given on the command line, which the replica always holds.
+    """
+
+    def __init__(self, index: int, count: int):
+        self.index = index
+        self.count = count
+
+    def claim(self) -> bool:
+        return True
+
+
+class ShardClaim:
+    """
+    A replica's claim on a shard, held as a lock file in a directory that
+    every replica shares, standing in for an external coordinator. The
+    file is created exclusively, so a shard has at most one holder, and
+    touched while held. A claim not touched within its time to live is
+    taken to be from a replica that died, and may be taken over.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        count: int,
+        ttl: float,
+        index: Optional[int] = None,
+    ):
+        self.directory = directory
+        self.count = count
+        self.ttl = ttl
+        self.requested_index = index
+        self.index = None
+        self.owner = (
+            f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+        self._lock = threading.Lock()
+        self._heartbeat = None
+        os.makedirs(directory, exist_ok=True)
+
+    def claim(self) -> bool:
+        """
+        Claims the requested shard, or else the first one free, returning
+        whether a shard is held.
+        """
+
+        with self._lock:
+            if self.index is not None:
+                return True
+
+            candidates = (
+                [self.requested_index]
+                if self.requested_index is not None
+                else range(self.count)
+            )
+            for index in candidates:
+                if self._create(index):
+                    self.index = index
+                    break
+            else:
+                logger.warning(
+                    f"No free shard of {self.count} to claim in "
+                    f"{self.directory}..."
+                )
+                return False
+
+        logger.info(f"Claimed shard {self.index} of {self.count}...")
+        if self._heartbeat is None:
+            self._heartbeat = threading.Thread(
+                target=self._renew, name="shard-heartbeat", daemon=True
+            )
+            self._heartbeat.start()
+            atexit.register(self.release)
+        return True
+
+    def release(self):
+        """
+        Gives up the shard held, if any, for another replica to claim.
+        """
+
+        with self._lock:
+            if self.index is not None and self._holds(self.index):
+                os.remove(self._path(self.index))
+            self.index = None
+
+    def _path(self, index: int) -> str:
+        return os.path.join(self.directory, f"shard-{index}.lock")
+
+    def _create(self, index: int) -> bool:
+        path = self._path(index)
+        try:
+            if time.time() - os.path.getmtime(path) < self.ttl:
+                return False
+            # Only one replica can move a stale claim aside, the rest then
+            # fail to create the file below
+            stale_path = f"{path}.{self.owner}.stale"
+            os.rename(path, stale_path)
+            if time.time() - os.path.getmtime(stale_path) < self.ttl:
+                # Another replica claimed the shard in the meantime, so its
+                # claim is put back
+                try:
+                    os.link(stale_path, path)
+                except FileExistsError:
+                    pass
+                os.remove(stale_path)
+                return False
+            os.remove(stale_path)
+            logger.warning(f"Taking over stale claim on shard {index}...")
+        except FileNotFoundError:
+            pass
+
+        try:
+            descriptor = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(descriptor, "w") as claim_file:
+            claim_file.write(self.owner)
+        return True
+
+    def _holds(self, index: int) -> bool:
+        try:
+            with open(self._path(index)) as claim_file:
+                return claim_file.read() == self.owner
+        except FileNotFoundError:
+            return False
+
+    def _renew(self):
+        while True:
+            time.sleep(self.ttl / 3)
+            with self._lock:
+                if self.index is None:
+                    continue
+                if self._holds(self.index):
+                    os.utime(self._path(self.index))
+                    continue
+                logger.error(
+                    f"Lost the claim on shard {self.index}, it was taken "
+                    "over by another replica..."
+                )
+                self.index = None
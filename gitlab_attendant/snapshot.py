@@ -0,0 +1,69 @@
+import threading
+
+from typing import Callable, Iterable, Optional
+
+
+class RunSnapshot:
+    """
+    Datasets fetched from the GitLab API during a single run, so that each
+    one is requested at most once and then shared by every task.
+    """
+
+    def __init__(self):
+        self._datasets = {}
+        self._lock = threading.Lock()
+
+    def fetch(
+        self,
+        dataset: str,
+        request_url: str,
+        loader: Callable[[], Iterable[tuple]],
+    ) -> list:
+        """
+        Returns the records found at the given URL, calling the loader
+        only if they haven't been fetched already during this run.
+        """
+
+        key = (dataset, request_url)
+        with self._lock:
+            records = self._datasets.get(key)
+
+        # Load outside of the lock so different datasets can be fetched
+        # concurrently
+        if records is None:
+            records = list(loader())
+            with self._lock:
+                records = self._datasets.setdefault(key, records)
+
+        # Hand out a copy so that tasks filtering in place leave the
+        # snapshot untouched
+        with self._lock:
+            return list(records)
+
+    def update(
+        self,
+        dataset: str,
+        record: tuple,
+        include: Optional[Callable[[str], bool]] = None,
+    ):
+        """
+        Replaces any snapshot record with the same id as the given one,
+        such as the response to a write, so later tasks see its new state.
+        Lists fetched from a URL that `include` accepts gain the record if
+        they don't hold it yet.
+        """
+
+        if not record:
+            return
+
+        with self._lock:
+            for (name, request_url), records in self._datasets.items():
+                if name != dataset:
+                    continue
+                for index, existing in enumerate(records):
+                    if existing.id == record.id:
+                        records[index] = record
+                        break
+                else:
+                    if include is not None and include(request_url):
+                        records.append(record)
@@ -0,0 +1,206 @@
+import collections
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Tuple
+
+from gitlab_attendant.errors import ErrorReport
+from gitlab_attendant.log_handlers import listen_to_queue, logger
+
+# Seconds to wait before restarting the worker for an instance that exited
+RESTART_DELAY_SECONDS = 30
+
+
+def config_arguments(options: dict) -> List[str]:
+    """
+    Turns an instance's options from a config file into the command line
+    arguments they stand for, so `"branch_workers": 4` becomes
+    `--branch-workers 4`, `true` a bare flag and a list a repeated one.
+    """
+
+    argv = []
+    for key, value in options.items():
+        flag = f"--{key.replace('_', '-')}"
+        if value is True:
+            argv.append(flag)
+        elif value is False or value is None:
+            continue
+        elif isinstance(value, list):
+            for item in value:
+                argv.extend([flag, str(item)])
+        else:
+            argv.extend([flag, str(value)])
+    return argv
+
+
+def load_config(path: str) -> List[Tuple[str, List[str]]]:
+    """
+    Reads the GitLab instances to attend to from a JSON config file,
+    returning the name and command line arguments of each. Options under
+    "defaults" apply to every instance unless it sets them itself.
+    """
+
+    with open(path) as config_file:
+        config = json.load(config_file)
+
+    defaults = config.get("defaults", {})
+    instances = []
+    for instance_options in config.get("instances", []):
+        options = {**defaults, **instance_options}
+        name = str(options.pop("name", None) or options.get("ip"))
+        if name in (instance_name for instance_name, _ in instances):
+            raise ValueError(f"Instance {name} is configured twice in {path}")
+        instances.append((name, config_arguments(options)))
+
+    if not instances:
+        raise ValueError(f"No instances are configured in {path}")
+    return instances
+
+
+def run_result(
+    instance: str,
+    task_names: List[str],
+    started: float,
+    error_report: ErrorReport,
+) -> dict:
+    """
+    Summarises a run of an instance's tasks for the supervisor.
+    """
+
+    return {
+        "instance": instance,
+        "started_at": datetime.fromtimestamp(
+            started, timezone.utc
+        ).isoformat(),
+        "duration_seconds": round(time.time() - started, 3),
+        "tasks": list(task_names),
+        "failures": len(error_report.failures),
+        "failed_callers": sorted(
+            {failure["caller"] for failure in error_report.failures}
+        ),
+    }
+
+
+def write_results(path: str, results: dict):
+    """
+    Writes the latest result of each instance to a JSON file, replacing
+    it in one step so it's never read half written.
+    """
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w") as results_file:
+        json.dump(results, results_file, indent=2)
+    os.replace(temporary_path, path)
+
+
+def supervise(
+    instances: List[Tuple[str, List[str]]],
+    worker: Callable,
+    results_path: Optional[str] = None,
+):
+    """
+    Attends to each instance from its own worker process, running
+    `worker(name, argv, log_queue, results)`. Workers' logs are written
+    as one combined log, tagged with their instance, and each run's
+    result is logged and kept per instance. A worker that fails is
+    restarted, and SIGHUP and SIGUSR1 are passed on to every worker.
+    """
+
+    context = multiprocessing.get_context("spawn")
+    log_queue = context.Queue()
+    results = context.Queue()
+    listener = listen_to_queue(log_queue)
+
+    workers = {}
+    restart_at = {name: 0.0 for name, _ in instances}
+    latest = collections.OrderedDict((name, None) for name, _ in instances)
+
+    stopping = threading.Event()
+
+    def forward(signum, frame):
+        for process in list(workers.values()):
+            os.kill(process.pid, signum)
+
+    previous_handlers = {}
+    for name, handler in (
+        ("SIGINT", lambda signum, frame: stopping.set()),
+        ("SIGTERM", lambda signum, frame: stopping.set()),
+        ("SIGHUP", forward),
+        ("SIGUSR1", forward),
+    ):
+        if hasattr(signal, name):
+            signum = getattr(signal, name)
+            previous_handlers[signum] = signal.signal(signum, handler)
+
+    try:
+        while not stopping.is_set():
+            now = time.monotonic()
+            for name, argv in instances:
+                process = workers.get(name)
+                if process is not None and not process.is_alive():
+                    del workers[name]
+                    # Only workers that failed are restarted, one that
+                    # finished, such as after a dry run, is done
+                    if process.exitcode == 0:
+                        restart_at[name] = None
+                        continue
+                    logger.error(
+                        f"Worker for instance {name} exited with code "
+                        f"{process.exitcode}, restarting in "
+                        f"{RESTART_DELAY_SECONDS} seconds...",
+                        extra={"instance": name},
+                    )
+                    restart_at[name] = now + RESTART_DELAY_SECONDS
+                if (
+                    name not in workers
+                    and restart_at[name] is not None
+                    and now >= restart_at[name]
+                ):
+                    process = context.Process(
+                        target=worker,
+                        args=(name, argv, log_queue, results),
+                        name=f"gitlab-attendant-{name}",
+                        daemon=True,
+                    )
+                    process.start()
+                    workers[name] = process
+                    logger.info(
+                        f"Started worker {process.pid} for instance {name}...",
+                        extra={"instance": name},
+                    )
+
+            try:
+                result = results.get(timeout=1)
+            except queue.Empty:
+                if not workers and all(
+                    restart_time is None
+                    for restart_time in restart_at.values()
+                ):
+                    break
+                continue
+
+            latest[result["instance"]] = result
+            logger.info(
+                f"Instance {result['instance']} ran "
+                f"{', '.join(result['tasks'])} in "
+                f"{result['duration_seconds']} seconds with "
+                f"{result['failures']} failures...",
+                extra={"instance": result["instance"]},
+            )
+            if results_path:
+                write_results(results_path, latest)
+    finally:
+        logger.info("Stopping GitLab Attendant workers...")
+        for process in workers.values():
+            process.terminate()
+        for process in workers.values():
+            process.join(10)
+        listener.stop()
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Optional
+
+from gitlab_attendant.log_handlers import logger
+from gitlab_attendant.utils import with_query_params
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+class IncrementalSync:
+    """
+    Locally kept working set of open issues and merge requests. After the
+    first full fetch, each run only requests records updated since the
+    watermark saved by the previous successful run and merges them in.
+    What each run fetched is kept in a pending dict of its own, so runs
+    on other threads never commit one another's working sets.
+    """
+
+    DATASETS = ("issues", "merge_requests")
+
+    def __init__(self, path: str, full_sync_interval: timedelta):
+        self.path = path
+        self.full_sync_interval = full_sync_interval
+        self._state = {dataset: {} for dataset in self.DATASETS}
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            self._load()
+
+    def fetch(
+        self,
+        dataset: str,
+        request_url: str,
+        loader: Callable[[str], Iterable[dict]],
+        pending: Optional[dict] = None,
+    ) -> list:
+        """
+        Returns the open records of a dataset, requesting only those that
+        changed since the last watermark when a recent one exists. The
+        new working set and watermark are added to the run's pending
+        dict, if given, for it to commit.
+        """
+
+        started_at = datetime.utcnow()
+        timestamp = started_at.strftime(TIMESTAMP_FORMAT)
+
+        with self._lock:
+            state = dict(self._state[dataset])
+
+        if self._needs_full_sync(state, started_at):
+            logger.info(f"Running full sync of {dataset}...")
+            records = {record["id"]: record for record in loader(request_url)}
+            last_full_sync = timestamp
+        else:
+            records = {
+                int(key): value for key, value in state["records"].items()
+            }
+            changed_url = with_query_params(
+                request_url,
+                {"state": "all", "updated_after": state["watermark"]},
+            )
+            changed = 0
+            for record in loader(changed_url):
+                changed += 1
+                if record["state"] == "opened":
+                    records[record["id"]] = record
+                else:
+                    records.pop(record["id"], None)
+            logger.info(
+                f"Merged {changed} {dataset} updated since {state['watermark']}..."
+            )
+            last_full_sync = state["last_full_sync"]
+
+        if pending is not None:
+            pending[dataset] = {
+                "watermark": f"{timestamp}Z",
+                "last_full_sync": last_full_sync,
+                "records": records,
+            }
+
+        return list(records.values())
+
+    def commit(self, pending: dict):
+        """
+        Saves the working sets and watermarks a successful run fetched,
+        given by its pending dict, so the next run continues from them.
+        """
+
+        if not pending:
+            return
+
+        with self._lock:
+            self._state.update(pending)
+            state = {
+                dataset: {
+                    **dataset_state,
+                    "records": {
+                        str(record_id): record
+                        for record_id, record in dataset_state.get(
+                            "records", {}
+                        ).items()
+                    },
+                }
+                for dataset, dataset_state in self._state.items()
+            }
+
+            # Written under the lock, as runs on other threads share the
+            # temporary file
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, "w") as state_file:
+                json.dump(state, state_file)
+            os.replace(temporary_path, self.path)
+
+    def _needs_full_sync(self, state: dict, now: datetime) -> bool:
+        if not state.get("watermark"):
+            return True
+        last_full_sync = datetime.strptime(
+            state["last_full_sync"], TIMESTAMP_FORMAT
+        )
+        return now - last_full_sync >= self.full_sync_interval
+
+    def _load(self):
+        try:
+            with open(self.path) as state_file:
+                state = json.load(state_file)
+        except (OSError, ValueError) as ex:
+            logger.error(
+                f"Unable to load sync state from {self.path}, running a full sync: {ex}"
+            )
+            return
+
+        for dataset in self.DATASETS:
+            self._state[dataset] = state.get(dataset, {})
@@ -1,8 +1,9 @@
-import dateutil.parser
+import contextvars
 import pytz
-import random
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from typing import Iterator, Optional, Tuple
 
 from gitlab_attendant.api_calls import (
     add_note_to_issue,
@@ -15,75 +16,274 @@ from gitlab_attendant.api_calls import (
     get_all_projects,
     get_all_open_issues,
 )
+from gitlab_attendant.filters import (
+    apply_filters,
+    has_assignee,
+    has_due_date,
+    is_not_work_in_progress,
+    lacks_assignee,
+    older_than,
+)
 from gitlab_attendant.log_handlers import logger
+from gitlab_attendant.records import Issue, MergeRequest, format_timestamp
+from gitlab_attendant.workload import WorkloadIndex
 
 
-def assign_open_merge_requests(cli_args: dict):
+def created_before_cutoff(days: int) -> datetime:
     """
-    Find merge requests that have been open for longer than 24 hours with
-    no assigned project member. Find possible project members for each
-    merge request and assign them accordingly.
+    Returns the time X days ago rounded up to midnight UTC, for the
+    server side created_before filter. List URLs built from it stay the
+    same all day, so they can be revalidated from the response cache
+    and shared through the run snapshot. Rounding up only lets through
+    records that the exact client side older_than filter then drops.
     """
-    open_merge_requests = get_all_open_merge_requests(cli_args)
 
-    # Discard open merge requests that are marked as work in progress
-    [
-        open_merge_requests.remove(merge_request)
-        for merge_request in open_merge_requests
-        if merge_request["work_in_progress"]
-    ]
+    cutoff = pytz.utc.localize(datetime.utcnow()) - timedelta(days)
+    return cutoff.replace(
+        hour=0, minute=0, second=0, microsecond=0
+    ) + timedelta(1)
 
-    current_timestamp = pytz.utc.localize(datetime.utcnow())
 
-    # Discard open merge requests that aren't over 24 hours old
-    [
-        open_merge_requests.remove(merge_request)
-        for merge_request in open_merge_requests
-        if (
-            current_timestamp
-            - dateutil.parser.parse(merge_request["created_at"])
-            < timedelta(1)
+def unassigned_merge_request_criteria() -> dict:
+    """
+    Criteria for GitLab to filter open merge requests down to those that
+    select_unassigned_merge_requests would keep.
+    """
+
+    return {
+        "work_in_progress": False,
+        "assigned": False,
+        "created_before": created_before_cutoff(1),
+    }
+
+
+def select_unassigned_merge_requests(open_merge_requests) -> list:
+    """
+    Discard merge requests that are a work in progress, under 24 hours
+    old or already assigned, returning those that need an assignee.
+    """
+
+    return list(
+        apply_filters(
+            open_merge_requests,
+            is_not_work_in_progress,
+            older_than(1),
+            lacks_assignee,
         )
-    ]
-
-    # Discard open merge requests that have an assignee
-    [
-        open_merge_requests.remove(merge_request)
-        for merge_request in open_merge_requests
-        if merge_request["assignee"]
-    ]
-
-    # If we have no applicable merge requests then exit the function
-    if not open_merge_requests:
-        pass
-
-    # Get all project members
-    all_project_members = {
-        merge_request["project_id"]: get_all_project_members(
-            cli_args, merge_request["project_id"]
+    )
+
+
+def unassigned_open_merge_requests(cli_args: dict) -> list:
+    """
+    Returns the open merge requests that need an assignee. A streamed run
+    takes them from the full listing its workload index is counted from,
+    rather than listing them again.
+    """
+
+    if cli_args.get("stream_json") and "workload" in cli_args:
+        return select_unassigned_merge_requests(
+            workload_index(cli_args).unassigned["merge_requests"]
         )
-        for merge_request in open_merge_requests
-    }
+    return select_unassigned_merge_requests(
+        get_all_open_merge_requests(
+            cli_args, **unassigned_merge_request_criteria()
+        )
+    )
+
+
+def workload_index(cli_args: dict) -> WorkloadIndex:
+    """
+    Returns the run's workload index, counting the open issues and merge
+    requests assigned to each user the first time it's needed. Outside
+    of a scheduled run there's no index to share, and an empty one is
+    returned, so members are chosen at random.
+    """
+
+    workload = cli_args.get("workload")
+    if workload is None:
+        return WorkloadIndex()
+    if not workload.loaded:
+        if cli_args.get("stream_json"):
+            load_streamed_workload(
+                workload,
+                get_all_open_issues(cli_args),
+                get_all_open_merge_requests(cli_args),
+            )
+        else:
+            # The notification tasks read the same assigned listings,
+            # so they're shared through the run snapshot
+            workload.load(get_all_open_issues(cli_args, assigned=True))
+            workload.load(get_all_open_merge_requests(cli_args, assigned=True))
+    return workload
+
+
+def load_streamed_workload(
+    workload: WorkloadIndex, open_issues, open_merge_requests
+):
+    """
+    Counts a streamed run's workload from every open issue and merge
+    request, keeping the ones due an assignee for the assignment tasks.
+    The run snapshot isn't used for streamed listings, so this is the one
+    listing of each that the assignment tasks read.
+    """
+
+    workload.unassigned["issues"] = workload.load(open_issues)
+    workload.unassigned["merge_requests"] = select_unassigned_merge_requests(
+        workload.load(open_merge_requests)
+    )
+
+
+def choose_merge_request_assignee(
+    merge_request: MergeRequest, project_members: list, workload
+) -> Optional[int]:
+    """
+    Select the least loaded project member, other than the merge
+    request's author, returning their id or None if nobody is eligible.
+    """
+
+    return workload.choose(
+        merge_request.project_id,
+        project_members,
+        exclude=merge_request.author.id if merge_request.author else None,
+    )
+
 
-    secure_random = random.SystemRandom()
+def assign_open_merge_requests(cli_args: dict):
+    """
+    Find merge requests that have been open for longer than 24 hours with
+    no assigned project member. Find possible project members for each
+    merge request and assign them accordingly.
+    """
+    all_project_members = {}
+    workload = None
 
-    # Differentiate clean project members, select one at random
+    # Differentiate clean project members, select the least loaded
     # and then assign them to the merge request
-    for merge_request in open_merge_requests:
-        clean_project_members = []
-        for project_member in all_project_members[merge_request["project_id"]]:
-            if project_member["id"] != merge_request["author"]["id"]:
-                clean_project_members.append(project_member["id"])
-        if clean_project_members:
-            chosen_project_member = secure_random.choice(clean_project_members)
+    for merge_request in unassigned_open_merge_requests(cli_args):
+        if merge_request.project_id not in all_project_members:
+            all_project_members[merge_request.project_id] = list(
+                get_all_project_members(cli_args, merge_request.project_id)
+            )
+        if workload is None:
+            workload = workload_index(cli_args)
+
+        chosen_project_member = choose_merge_request_assignee(
+            merge_request,
+            all_project_members[merge_request.project_id],
+            workload,
+        )
+        if chosen_project_member is not None:
             assign_user_to_merge_request(
                 cli_args,
-                merge_request["project_id"],
-                merge_request["iid"],
+                merge_request.project_id,
+                merge_request.iid,
                 chosen_project_member,
             )
 
 
+def merge_request_assignment_delay(
+    merge_request: MergeRequest,
+) -> Optional[timedelta]:
+    """
+    Return how long until an open merge request is due an assignee, no
+    time at all if it is due one now, or None if, as it stands, it never
+    will be.
+    """
+
+    if (
+        merge_request.state != "opened"
+        or merge_request.work_in_progress
+        or has_assignee(merge_request)
+    ):
+        return None
+
+    eligible_at = merge_request.created_at + timedelta(1)
+    return max(
+        eligible_at - pytz.utc.localize(datetime.utcnow()), timedelta(0)
+    )
+
+
+def assign_merge_request(cli_args: dict, merge_request: MergeRequest) -> bool:
+    """
+    Assign a single open merge request to a project member if it needs an
+    assignee, returning whether it was assigned. The member is the least
+    loaded in the run's workload index, or chosen at random without one,
+    as for webhooks.
+    """
+
+    if not select_unassigned_merge_requests([merge_request]):
+        return False
+
+    chosen_project_member = choose_merge_request_assignee(
+        merge_request,
+        list(get_all_project_members(cli_args, merge_request.project_id)),
+        workload_index(cli_args),
+    )
+    if chosen_project_member is None:
+        return False
+
+    assign_user_to_merge_request(
+        cli_args,
+        merge_request.project_id,
+        merge_request.iid,
+        chosen_project_member,
+    )
+    return True
+
+
+def stale_merge_request_criteria(days: int) -> dict:
+    """
+    Criteria for GitLab to filter open merge requests down to those that
+    select_stale_merge_requests could keep. Work in progress and age are
+    checked client side, so the listing is the same one the workload
+    index counts assignees from.
+    """
+
+    return {"assigned": True}
+
+
+def stale_merge_requests(
+    open_merge_requests, days: int
+) -> Iterator[MergeRequest]:
+    """
+    Lazily discard merge requests that are a work in progress, under X
+    days old or unassigned, yielding those whose assignee should be
+    nudged.
+    """
+
+    return apply_filters(
+        open_merge_requests,
+        is_not_work_in_progress,
+        older_than(days),
+        has_assignee,
+    )
+
+
+def select_stale_merge_requests(open_merge_requests, days: int) -> list:
+    """
+    Discard merge requests that are a work in progress, under X days old
+    or unassigned, returning those whose assignee should be nudged.
+    """
+
+    return list(stale_merge_requests(open_merge_requests, days))
+
+
+def stale_merge_request_note(merge_request: MergeRequest) -> dict:
+    """
+    Build the note nudging the assignee of a stale merge request.
+    """
+
+    return (
+        {
+            "body": f"Nudging user @{merge_request.assignee.username} - this merge request has been open since {format_timestamp(merge_request.created_at)}. \n\n This could be merged without conflict."
+        }
+        if merge_request.merge_status == "can_be_merged"
+        else {
+            "body": f"Nudging user @{merge_request.assignee.username} - this merge request has been open since {format_timestamp(merge_request.created_at)}. \n\n Merge conflicts exist."
+        }
+    )
+
+
 def notify_stale_merge_request_assignees(cli_args: dict, days: int):
     """
     Find merge requests that have been open for longer than X days with
@@ -91,204 +291,304 @@ def notify_stale_merge_request_assignees(cli_args: dict, days: int):
     referencing the assigned project member to notify them.
     """
 
-    open_merge_requests = get_all_open_merge_requests(cli_args)
+    # Notes leave the listing unchanged, so each merge request is nudged
+    # as it is read rather than after the whole listing is held
+    for merge_request in stale_merge_requests(
+        get_all_open_merge_requests(
+            cli_args, **stale_merge_request_criteria(days)
+        ),
+        days,
+    ):
+        add_note_to_merge_request(
+            cli_args,
+            merge_request.project_id,
+            merge_request.iid,
+            merge_request.assignee.id,
+            stale_merge_request_note(merge_request),
+        )
 
-    # Discard open merge requests that are marked as work in progress
-    [
-        open_merge_requests.remove(merge_request)
-        for merge_request in open_merge_requests
-        if merge_request["work_in_progress"]
-    ]
 
-    current_timestamp = pytz.utc.localize(datetime.utcnow())
+def log_branch_removal_summary(summary: dict):
+    """
+    Log an error for each project whose merged branches GitLab didn't
+    delete, followed by a summary of the results across all projects.
+    """
 
-    # Discard open merge requests that aren't over X days old
-    [
-        open_merge_requests.remove(merge_request)
-        for merge_request in open_merge_requests
-        if (
-            current_timestamp
-            - dateutil.parser.parse(merge_request["created_at"])
-            < timedelta(days)
-        )
-    ]
+    for project_id, message in summary.items():
+        if message != "202 Accepted":
+            logger.error(
+                f"Failed to delete branch for project {project_id}, error: {message}",
+                extra={"project_id": project_id},
+            )
 
-    # Discard open merge requests that don't have an assignee
-    [
-        open_merge_requests.remove(merge_request)
-        for merge_request in open_merge_requests
-        if not merge_request["assignee"]
-    ]
+    accepted = sum(message == "202 Accepted" for message in summary.values())
+    logger.info(
+        f"Merged branch removal accepted for {accepted} of {len(summary)} projects..."
+    )
 
-    # If we have no applicable merge requests then exit the function
-    if not open_merge_requests:
-        pass
 
-    [
-        add_note_to_merge_request(
-            cli_args,
-            merge_request["project_id"],
-            merge_request["iid"],
-            merge_request["assignee"]["id"],
-            {
-                "body": f"Nudging user @{merge_request['assignee']['username']} - this merge request has been open since {merge_request['created_at']}. \n\n This could be merged without conflict."
-            }
-            if merge_request["merge_status"] == "can_be_merged"
-            else {
-                "body": f"Nudging user @{merge_request['assignee']['username']} - this merge request has been open since {merge_request['created_at']}. \n\n Merge conflicts exist."
-            },
+def branch_removal_message(response: Optional[dict]) -> str:
+    """
+    Return GitLab's message from a merged branch deletion response.
+    """
+
+    if response is None:
+        return "Request to GitLab API failed"
+    return response["message"]
+
+
+def _delete_project_merged_branches(cli_args: dict, project_id: int) -> str:
+    """
+    Delete a single project's merged branches, returning GitLab's message
+    or a description of the error raised.
+    """
+
+    try:
+        return branch_removal_message(
+            delete_merged_branches(cli_args, project_id)
         )
-        for merge_request in open_merge_requests
-    ]
+    except Exception as ex:
+        return f"{type(ex).__name__}: {ex}"
 
 
-def remove_merged_branches(cli_args: dict):
+def remove_merged_branches(cli_args: dict) -> dict:
     """
-    Find and delete branches that have been merged.
+    Find and delete branches that have been merged, working on several
+    projects at once when more than one branch worker is configured.
+    Returns the result message for each project id.
     """
 
     projects = get_all_projects(cli_args)
+    workers = int(cli_args.get("branch_workers", 1))
+
+    # A single worker removes branches on this thread, where the profiler
+    # can see it
+    if workers <= 1:
+        summary = {
+            project.id: _delete_project_merged_branches(cli_args, project.id)
+            for project in projects
+        }
+        log_branch_removal_summary(summary)
+        return summary
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                contextvars.copy_context().run,
+                _delete_project_merged_branches,
+                cli_args,
+                project.id,
+            ): project.id
+            for project in projects
+        }
+        summary = {
+            futures[future]: future.result()
+            for future in as_completed(futures)
+        }
 
-    response_list = [
-        delete_merged_branches(cli_args, project["id"]) for project in projects
-    ]
-
-    for response in response_list:
-        if response["message"] != "202 Accepted":
-            logger.error(
-                f"Failed to delete branch, error: {response['message']}"
-            )
+    log_branch_removal_summary(summary)
+    return summary
 
 
-def assign_project_members_to_issues(cli_args: dict):
+def select_unassigned_issues(all_open_issues) -> list:
     """
-    Find issues that have not been assigned and then assign them to
-    a project member selected at random.
+    Return the open issues that have no assignees.
     """
 
-    all_open_issues = get_all_open_issues(cli_args)
+    return list(apply_filters(all_open_issues, lacks_assignee))
 
-    unassigned_open_issues = [
-        unassigned_open_issue
-        for unassigned_open_issue in all_open_issues
-        if not unassigned_open_issue["assignees"]
-        and not unassigned_open_issue["assignee"]
-    ]
 
-    if not unassigned_open_issues:
-        pass
+def unassigned_open_issues(cli_args: dict) -> list:
+    """
+    Returns the open issues that have no assignees. A streamed run takes
+    them from the full listing its workload index is counted from, rather
+    than listing them again.
+    """
 
-    # Get all project members
-    all_project_members = {
-        unassigned_open_issue["project_id"]: get_all_project_members(
-            cli_args, unassigned_open_issue["project_id"]
+    if cli_args.get("stream_json") and "workload" in cli_args:
+        return select_unassigned_issues(
+            workload_index(cli_args).unassigned["issues"]
         )
-        for unassigned_open_issue in unassigned_open_issues
-    }
+    return select_unassigned_issues(
+        get_all_open_issues(cli_args, assigned=False)
+    )
+
+
+def choose_issue_assignee(
+    issue: Issue, project_members: list, workload
+) -> Optional[int]:
+    """
+    Select the least loaded project member, returning their id or None if
+    the project has no members.
+    """
+
+    return workload.choose(issue.project_id, project_members)
+
+
+def assign_project_members_to_issues(cli_args: dict):
+    """
+    Find issues that have not been assigned and then assign them to
+    the least loaded project member.
+    """
 
-    secure_random = random.SystemRandom()
+    all_project_members = {}
+    workload = None
 
-    # Select a project member at random
+    # Select the least loaded project member
     # and then assign them to the open issue
-    for unassigned_open_issue in unassigned_open_issues:
-        if all_project_members:
-            chosen_project_member = secure_random.choice(
-                all_project_members[unassigned_open_issue["project_id"]]
+    for unassigned_open_issue in unassigned_open_issues(cli_args):
+        project_id = unassigned_open_issue.project_id
+        if project_id not in all_project_members:
+            all_project_members[project_id] = list(
+                get_all_project_members(cli_args, project_id)
             )
+        if workload is None:
+            workload = workload_index(cli_args)
+
+        chosen_project_member = choose_issue_assignee(
+            unassigned_open_issue, all_project_members[project_id], workload
+        )
+        if chosen_project_member is not None:
             assign_issue(
                 cli_args,
-                unassigned_open_issue["project_id"],
-                unassigned_open_issue["iid"],
-                chosen_project_member["id"],
+                project_id,
+                unassigned_open_issue.iid,
+                chosen_project_member,
             )
 
 
-def notify_issue_assignees(cli_args: dict, days: int):
+def assign_project_member_to_issue(cli_args: dict, issue: Issue) -> bool:
     """
-    Find assigned issues that are overdue and due within X days,
-    then notify the issue assignees accordingly.
+    Assign a single open issue to a project member if it has no
+    assignees, returning whether it was assigned. The member is the least
+    loaded in the run's workload index, or chosen at random without one,
+    as for webhooks.
     """
 
-    all_open_issues = get_all_open_issues(cli_args)
+    if issue.state != "opened" or not select_unassigned_issues([issue]):
+        return False
+
+    chosen_project_member = choose_issue_assignee(
+        issue,
+        list(get_all_project_members(cli_args, issue.project_id)),
+        workload_index(cli_args),
+    )
+    if chosen_project_member is None:
+        return False
 
-    # Filter out unassigned issues
-    assigned_open_issues = [
-        assigned_open_issue
-        for assigned_open_issue in all_open_issues
-        if assigned_open_issue["assignees"] or assigned_open_issue["assignee"]
-    ]
+    assign_issue(cli_args, issue.project_id, issue.iid, chosen_project_member)
+    return True
 
-    if not assigned_open_issues:
-        pass
 
-    # Filter out assigned issues without due dates
-    [
-        assigned_open_issues.remove(open_issue)
-        for open_issue in assigned_open_issues
-        if not open_issue["due_date"]
-    ]
+def overdue_and_due_issues(
+    all_open_issues, days: int
+) -> Iterator[Tuple[Issue, bool]]:
+    """
+    Lazily yield each assigned open issue that is overdue or due within
+    X days, along with whether it is overdue.
+    """
 
     current_timestamp = pytz.utc.localize(datetime.utcnow())
 
-    # Filter issues that are overdue into a new list
-    overdue_issues = [
-        open_issue
-        for open_issue in assigned_open_issues
-        if (
-            (
-                current_timestamp
-                - pytz.utc.localize(
-                    dateutil.parser.parse(open_issue["due_date"])
-                )
-            ).days
-            > 0
-        )
-    ]
-
-    # Filter issues that are due in under X days into a new list
-    due_issues = [
-        open_issue
-        for open_issue in assigned_open_issues
-        if (
-            pytz.utc.localize(dateutil.parser.parse(open_issue["due_date"]))
-            - current_timestamp
-            < timedelta(days)
-            and (
-                pytz.utc.localize(dateutil.parser.parse(open_issue["due_date"]))
-                - current_timestamp
-            ).days
-            > 0
-        )
-    ]
+    for open_issue in apply_filters(
+        all_open_issues, has_assignee, has_due_date
+    ):
+        due_date = open_issue.due_date
+        if (current_timestamp - due_date).days > 0:
+            yield open_issue, True
+        elif (
+            due_date - current_timestamp < timedelta(days)
+            and (due_date - current_timestamp).days > 0
+        ):
+            yield open_issue, False
+
+
+def select_overdue_and_due_issues(
+    all_open_issues, days: int
+) -> Tuple[list, list]:
+    """
+    Split assigned open issues with due dates into those that are overdue
+    and those that are due within X days.
+    """
+
+    overdue_issues = []
+    due_issues = []
+    for open_issue, overdue in overdue_and_due_issues(all_open_issues, days):
+        if overdue:
+            overdue_issues.append(open_issue)
+        else:
+            due_issues.append(open_issue)
+
+    return overdue_issues, due_issues
 
-    [
+
+def overdue_issue_note(overdue_issue: Issue) -> dict:
+    """
+    Build the note nudging the assignees of an overdue issue.
+    """
+
+    return (
+        {
+            "body": f"Nudging user @{overdue_issue.assignee.username} - this issue was due on {overdue_issue.due_date:%Y-%m-%d}."
+        }
+        if overdue_issue.assignee
+        else {
+            "body": f"Nudging users {', '.join(str('@{}'.format(user.username)) for user in overdue_issue.assignees)} - this issue was due on {overdue_issue.due_date:%Y-%m-%d}."
+        }
+    )
+
+
+def due_issue_note(due_issue: Issue) -> dict:
+    """
+    Build the note nudging the assignees of an issue that is due soon.
+    """
+
+    return (
+        {
+            "body": f"Nudging user @{due_issue.assignee.username} - this issue is due on {due_issue.due_date:%Y-%m-%d}."
+        }
+        if due_issue.assignee
+        else {
+            "body": f"Nudging users {', '.join(str('@{}'.format(user.username)) for user in due_issue.assignees)} - this issue is due on {due_issue.due_date:%Y-%m-%d}."
+        }
+    )
+
+
+def notify_issue_assignees(cli_args: dict, days: int):
+    """
+    Find assigned issues that are overdue and due within X days,
+    then notify the issue assignees accordingly.
+    """
+
+    # Notes leave the listing unchanged, so overdue issues are nudged as
+    # they are read and only the few due within X days are held until the
+    # listing ends, keeping the overdue notes first
+    due_issues = []
+    for issue, overdue in overdue_and_due_issues(
+        get_all_open_issues(cli_args, assigned=True), days
+    ):
+        if not overdue:
+            due_issues.append(issue)
+            continue
         add_note_to_issue(
-            cli_args,
-            overdue_issue["project_id"],
-            overdue_issue["iid"],
-            {
-                "body": f"Nudging user @{overdue_issue['assignee']['username']} - this issue was due on {overdue_issue['due_date']}."
-            }
-            if overdue_issue["assignee"]
-            else {
-                "body": f"Nudging users {', '.join(str('@{}'.format(user['username'])) for user in overdue_issue['assignees'])} - this issue was due on {overdue_issue['due_date']}."
-            },
+            cli_args, issue.project_id, issue.iid, overdue_issue_note(issue)
         )
-        for overdue_issue in overdue_issues
-    ]
 
-    [
+    for due_issue in due_issues:
         add_note_to_issue(
             cli_args,
-            due_issue["project_id"],
-            due_issue["iid"],
-            {
-                "body": f"Nudging user @{due_issue['assignee']['username']} - this issue is due on {due_issue['due_date']}."
-            }
-            if due_issue["assignee"]
-            else {
-                "body": f"Nudging users {', '.join(str('@{}'.format(user['username'])) for user in due_issue['assignees'])} - this issue is due on {due_issue['due_date']}."
-            },
+            due_issue.project_id,
+            due_issue.iid,
+            due_issue_note(due_issue),
         )
-        for due_issue in due_issues
-    ]
+
+
+# Each task the GitLab Attendant runs, with its arguments, in run order,
+# shared by the synchronous and asynchronous runners
+SCHEDULED_TASKS = (
+    (assign_project_members_to_issues, ()),
+    (assign_open_merge_requests, ()),
+    (notify_issue_assignees, (7,)),
+    (notify_stale_merge_request_assignees, (7,)),
+    (remove_merged_branches, ()),
+)
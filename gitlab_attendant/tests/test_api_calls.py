@@ -0,0 +1,67 @@
+import mock
+import pytz
+import unittest
+
+from datetime import datetime
+
+from gitlab_attendant.api_calls import (
+    build_query,
+    get_all_open_issues,
+    get_all_open_merge_requests,
+)
+
+
+class TestApiCalls(unittest.TestCase):
+    def test_build_query(self):
+        created_before = pytz.utc.localize(datetime(2018, 8, 1, 12))
+
+        self.assertEqual(
+            build_query(
+                work_in_progress=False,
+                assigned=True,
+                created_before=created_before,
+                due_date="overdue",
+            ),
+            {
+                "wip": "no",
+                "assignee_id": "Any",
+                "created_before": "2018-08-01T12:00:00+00:00",
+                "due_date": "overdue",
+            },
+        )
+        self.assertEqual(build_query(assigned=False), {"assignee_id": "None"})
+        self.assertEqual(build_query(), {})
+
+    @mock.patch("gitlab_attendant.api_calls.get_paginated_request")
+    def test_get_all_open_merge_requests_filters_server_side(
+        self, mock_get_paginated_request
+    ):
+        cli_args = {"ip_address": "localhost", "session": mock.Mock()}
+
+        get_all_open_merge_requests(
+            cli_args, work_in_progress=False, assigned=False
+        )
+
+        self.assertEqual(
+            mock_get_paginated_request.call_args[0][0],
+            "http://localhost/api/v4/merge_requests?state=opened&wip=no&assignee_id=None",
+        )
+
+    @mock.patch("gitlab_attendant.api_calls.get_paginated_request")
+    def test_get_all_open_issues_ignores_criteria_when_syncing(
+        self, mock_get_paginated_request
+    ):
+        incremental_sync = mock.Mock(DATASETS=("issues", "merge_requests"))
+        incremental_sync.fetch.return_value = []
+        cli_args = {
+            "ip_address": "localhost",
+            "session": mock.Mock(),
+            "incremental_sync": incremental_sync,
+        }
+
+        get_all_open_issues(cli_args, assigned=True)
+
+        self.assertEqual(
+            incremental_sync.fetch.call_args[0][:2],
+            ("issues", "http://localhost/api/v4/issues?state=opened"),
+        )
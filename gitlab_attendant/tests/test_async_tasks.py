@@ -0,0 +1,209 @@
+import asyncio
+import mock
+import pytz
+import unittest
+
+from datetime import datetime, timedelta
+
+from gitlab_attendant.async_tasks import (
+    ASYNC_TASKS,
+    assign_open_merge_requests,
+    assign_project_members_to_issues,
+    notify_stale_merge_request_assignees,
+    remove_merged_branches,
+    run_tasks,
+)
+from gitlab_attendant.records import Issue, MergeRequest, Project, User
+from gitlab_attendant.tasks import SCHEDULED_TASKS
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class TestAsyncTasks(unittest.TestCase):
+    @mock.patch(
+        "gitlab_attendant.async_tasks.assign_user_to_merge_request",
+        new_callable=mock.AsyncMock,
+    )
+    @mock.patch(
+        "gitlab_attendant.async_tasks.get_all_project_members",
+        new_callable=mock.AsyncMock,
+    )
+    @mock.patch(
+        "gitlab_attendant.async_tasks.get_all_open_merge_requests",
+        new_callable=mock.AsyncMock,
+    )
+    def test_assign_open_merge_requests(
+        self,
+        mock_open_merge_requests,
+        mock_get_project_members,
+        mock_assign_user_to_merge,
+    ):
+        cli_args = {"ip_address": "localhost", "interval": 1, "token": "test"}
+
+        # Set the created_at date to be over 24 hours old
+        created_at = pytz.utc.localize(datetime.utcnow()) - timedelta(2)
+
+        mock_open_merge_requests.return_value = [
+            MergeRequest.from_json(
+                {
+                    "work_in_progress": False,
+                    "created_at": created_at.isoformat(),
+                    "assignee": None,
+                    "project_id": project_id,
+                    "author": {"id": 1},
+                    "iid": 1,
+                }
+            )
+            for project_id in (1, 2)
+        ]
+
+        mock_get_project_members.return_value = [User.from_json({"id": 5})]
+
+        run(assign_open_merge_requests(cli_args))
+
+        self.assertEqual(mock_get_project_members.call_count, 2)
+        self.assertEqual(mock_assign_user_to_merge.call_count, 2)
+        mock_assign_user_to_merge.assert_has_calls(
+            [
+                mock.call(cli_args, 1, 1, 5),
+                mock.call(cli_args, 2, 1, 5),
+            ]
+        )
+
+    @mock.patch(
+        "gitlab_attendant.async_tasks.add_note_to_merge_request",
+        new_callable=mock.AsyncMock,
+    )
+    @mock.patch(
+        "gitlab_attendant.async_tasks.get_all_open_merge_requests",
+        new_callable=mock.AsyncMock,
+    )
+    def test_notify_stale_merge_request_assignees(
+        self, mock_open_merge_requests, mock_add_note_to_merge_request
+    ):
+        cli_args = {"ip_address": "localhost", "interval": 1, "token": "test"}
+
+        # Set the created_at date to be over 6 days old, as GitLab sends it
+        created_at = (
+            f"{datetime.utcnow() - timedelta(7):%Y-%m-%dT%H:%M:%S}.123Z"
+        )
+
+        mock_open_merge_requests.return_value = [
+            MergeRequest.from_json(
+                {
+                    "work_in_progress": False,
+                    "created_at": created_at,
+                    "project_id": 1,
+                    "author": {"id": 1},
+                    "iid": 1,
+                    "assignee": {"id": 1, "username": "test-user"},
+                    "merge_status": "cannot_be_merged",
+                }
+            )
+        ]
+
+        run(notify_stale_merge_request_assignees(cli_args, 5))
+
+        mock_add_note_to_merge_request.assert_called_once_with(
+            cli_args,
+            1,
+            1,
+            1,
+            {
+                "body": f"Nudging user @test-user - this merge request has been open since {created_at}. \n\n Merge conflicts exist."
+            },
+        )
+
+    @mock.patch("gitlab_attendant.async_tasks.log_branch_removal_summary")
+    @mock.patch(
+        "gitlab_attendant.async_tasks.delete_merged_branches",
+        new_callable=mock.AsyncMock,
+    )
+    @mock.patch(
+        "gitlab_attendant.async_tasks.get_all_projects",
+        new_callable=mock.AsyncMock,
+    )
+    def test_remove_merged_branches(
+        self,
+        mock_get_all_projects,
+        mock_delete_merged_branches,
+        mock_log_branch_removal_summary,
+    ):
+        cli_args = {"ip_address": "localhost", "interval": 1, "token": "test"}
+
+        mock_get_all_projects.return_value = [
+            Project.from_json({"id": 1}),
+            Project.from_json({"id": 2}),
+        ]
+        mock_delete_merged_branches.side_effect = [
+            {"message": "202 Accepted"},
+            {"message": "Something went wrong..."},
+        ]
+
+        summary = run(remove_merged_branches(cli_args))
+
+        self.assertEqual(mock_delete_merged_branches.call_count, 2)
+        self.assertEqual(
+            summary, {1: "202 Accepted", 2: "Something went wrong..."}
+        )
+        mock_log_branch_removal_summary.assert_called_once_with(summary)
+
+    @mock.patch("gitlab_attendant.async_api_calls.api_calls.assign_issue")
+    @mock.patch(
+        "gitlab_attendant.async_api_calls.api_calls.get_all_project_members"
+    )
+    @mock.patch(
+        "gitlab_attendant.async_api_calls.api_calls.get_all_open_issues"
+    )
+    def test_assign_project_members_to_issues(
+        self, mock_all_open_issues, mock_all_project_members, mock_assign_issue
+    ):
+        cli_args = {"ip_address": "localhost", "interval": 1, "token": "test"}
+
+        mock_all_open_issues.return_value = iter(
+            [
+                Issue.from_json(
+                    {
+                        "iid": iid,
+                        "project_id": 1,
+                        "assignee": None,
+                        "assignees": [],
+                    }
+                )
+                for iid in (1, 2, 3)
+            ]
+        )
+        mock_all_project_members.return_value = iter(
+            [User.from_json({"id": 7})]
+        )
+
+        run(assign_project_members_to_issues(cli_args))
+
+        self.assertEqual(mock_all_project_members.call_count, 1)
+        mock_assign_issue.assert_has_calls(
+            [
+                mock.call(cli_args, 1, 1, 7),
+                mock.call(cli_args, 1, 2, 7),
+                mock.call(cli_args, 1, 3, 7),
+            ],
+            any_order=True,
+        )
+
+    @mock.patch("gitlab_attendant.async_tasks._run_all_tasks")
+    def test_run_tasks(self, mock_run_all_tasks):
+        cli_args = {"ip_address": "localhost", "interval": 1, "token": "test"}
+
+        run_tasks(cli_args, 4)
+
+        mock_run_all_tasks.assert_called_once_with(cli_args)
+
+    def test_every_scheduled_task_has_a_coroutine(self):
+        self.assertEqual(
+            set(ASYNC_TASKS), {task.__name__ for task, _ in SCHEDULED_TASKS}
+        )
@@ -0,0 +1,82 @@
+import mock
+import os
+import tempfile
+import unittest
+
+from gitlab_attendant.cache import MemberCache
+
+
+class TestMemberCache(unittest.TestCase):
+    def test_get_counts_hits_and_misses(self):
+        cache = MemberCache(ttl=60)
+        loader = mock.Mock(return_value=[{"id": 1}])
+
+        self.assertEqual(cache.get(1, loader), [{"id": 1}])
+        self.assertEqual(cache.get(1, loader), [{"id": 1}])
+
+        self.assertEqual(loader.call_count, 1)
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "entries": 1})
+
+    @mock.patch("gitlab_attendant.cache.time.time")
+    def test_get_reloads_expired_entries(self, mock_time):
+        cache = MemberCache(ttl=60)
+        loader = mock.Mock(return_value=[{"id": 1}])
+
+        mock_time.return_value = 1000
+        cache.get(1, loader)
+        mock_time.return_value = 1059
+        cache.get(1, loader)
+        mock_time.return_value = 1060
+        cache.get(1, loader)
+
+        self.assertEqual(loader.call_count, 2)
+
+    def test_get_evicts_least_recently_used(self):
+        cache = MemberCache(ttl=60, max_entries=2)
+        loader = mock.Mock(return_value=[{"id": 1}])
+
+        cache.get(1, loader)
+        cache.get(2, loader)
+        cache.get(1, loader)
+        cache.get(3, loader)
+        cache.get(1, loader)
+        cache.get(2, loader)
+
+        # Project 2 was evicted when project 3 was added
+        self.assertEqual(loader.call_count, 4)
+
+    def test_refresh_and_invalidate(self):
+        cache = MemberCache(ttl=60)
+        loader = mock.Mock(return_value=[{"id": 1}])
+
+        cache.get(1, loader)
+        cache.get(1, loader, refresh=True)
+        cache.invalidate(1)
+        cache.get(1, loader)
+        cache.invalidate()
+        cache.get(1, loader)
+
+        self.assertEqual(loader.call_count, 4)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "members.json")
+
+            cache = MemberCache(ttl=60, path=path)
+            cache.get(1, lambda: [{"id": 5}])
+            cache.save()
+
+            loader = mock.Mock()
+            restored = MemberCache(ttl=60, path=path)
+
+            self.assertEqual(restored.get(1, loader), [{"id": 5}])
+            self.assertEqual(loader.called, False)
+
+    def test_get_does_not_cache_empty_members(self):
+        cache = MemberCache(ttl=60)
+        loader = mock.Mock(return_value=[])
+
+        cache.get(1, loader)
+        cache.get(1, loader)
+
+        self.assertEqual(loader.call_count, 2)
@@ -0,0 +1,143 @@
+import asyncio
+import mock
+import requests
+import unittest
+
+from gitlab_attendant.api_calls import get_all_open_issues
+from gitlab_attendant.errors import (
+    ErrorReport,
+    run_isolated,
+    run_isolated_async,
+)
+from gitlab_attendant.utils import (
+    get_paginated_request,
+    get_request,
+    post_request,
+)
+
+
+class TestErrorReport(unittest.TestCase):
+    def test_failed_get_request_is_recorded(self):
+        response = mock.Mock(status_code=404)
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError(
+            "404 Not Found", response=response
+        )
+        session = mock.Mock(error_report=ErrorReport())
+        session.get.return_value = response
+
+        self.assertIsNone(
+            get_request(
+                "http://localhost/api/v4/projects/1",
+                session,
+                caller="get_project",
+            )
+        )
+        self.assertEqual(
+            session.error_report.failures,
+            [
+                {
+                    "caller": "get_project",
+                    "message": "404 Not Found",
+                    "method": "GET",
+                    "request_url": "http://localhost/api/v4/projects/1",
+                    "status_code": 404,
+                }
+            ],
+        )
+        self.assertEqual(session.error_report.has_failures("GET"), True)
+        self.assertEqual(session.error_report.has_failures("POST"), False)
+
+    def test_failed_page_ends_pagination(self):
+        session = mock.Mock(error_report=ErrorReport())
+        session.get.side_effect = requests.exceptions.ConnectionError(
+            "Connection refused"
+        )
+
+        self.assertEqual(
+            list(
+                get_paginated_request(
+                    "http://localhost/api/v4/projects", session
+                )
+            ),
+            [],
+        )
+        self.assertEqual(
+            session.error_report.failures[0]["caller"],
+            "GET /api/v4/projects",
+        )
+
+    def test_failed_listing_is_recorded_by_name(self):
+        session = mock.Mock(error_report=ErrorReport())
+        session.get.side_effect = requests.exceptions.ConnectionError(
+            "Connection refused"
+        )
+        cli_args = {"ip_address": "localhost", "session": session}
+
+        self.assertEqual(
+            [issue.id for issue in get_all_open_issues(cli_args)], []
+        )
+        self.assertEqual(
+            session.error_report.failures[0]["caller"], "get_all_open_issues"
+        )
+
+    def test_broken_stream_ends_pagination(self):
+        page = mock.MagicMock(ok=True, headers={"X-Next-Page": "2"})
+        page.iter_content.return_value = [b'[{"id": 1}, {"id": 2']
+
+        session = mock.Mock(error_report=ErrorReport())
+        session.get.return_value = page
+
+        self.assertEqual(
+            list(
+                get_paginated_request(
+                    "http://localhost/api/v4/projects", session, stream=True
+                )
+            ),
+            [{"id": 1}],
+        )
+        self.assertEqual(session.get.call_count, 1)
+        self.assertEqual(len(session.error_report.failures), 1)
+
+    def test_failed_post_request_is_recorded(self):
+        session = mock.Mock(error_report=ErrorReport())
+        session.post.side_effect = requests.exceptions.ConnectionError(
+            "Connection refused"
+        )
+
+        self.assertIsNone(
+            post_request("http://localhost/api/v4/notes", session, {})
+        )
+        self.assertEqual(session.error_report.failures[0]["method"], "POST")
+        self.assertIsNone(session.error_report.failures[0]["status_code"])
+
+    def test_run_isolated_records_task_failures(self):
+        error_report = ErrorReport()
+
+        def failing_task(cli_args):
+            raise KeyError("assignee")
+
+        run_isolated(error_report, failing_task, {})
+
+        self.assertEqual(error_report.failures[0]["caller"], "failing_task")
+        self.assertEqual(
+            error_report.failures[0]["message"], "KeyError: 'assignee'"
+        )
+
+    def test_run_isolated_async_records_task_failures(self):
+        error_report = ErrorReport()
+
+        async def failing_task(cli_args):
+            raise KeyError("assignee")
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(
+                run_isolated_async(error_report, failing_task, {})
+            )
+        finally:
+            loop.close()
+
+        self.assertEqual(error_report.failures[0]["caller"], "failing_task")
+        self.assertEqual(
+            error_report.failures[0]["message"], "KeyError: 'assignee'"
+        )
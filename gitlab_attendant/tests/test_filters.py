@@ -0,0 +1,82 @@
+import pytz
+import unittest
+
+from datetime import datetime, timedelta
+
+from gitlab_attendant.filters import (
+    apply_filters,
+    has_assignee,
+    has_due_date,
+    is_not_work_in_progress,
+    lacks_assignee,
+    older_than,
+)
+from gitlab_attendant.records import Issue, MergeRequest
+
+
+class TestFilters(unittest.TestCase):
+    def test_apply_filters_single_pass(self):
+        records = [
+            MergeRequest.from_json(merge_request)
+            for merge_request in (
+                {"id": 1, "work_in_progress": True, "assignee": None},
+                {"id": 2, "work_in_progress": True, "assignee": None},
+                {"id": 3, "work_in_progress": False, "assignee": None},
+                {"id": 4, "work_in_progress": False, "assignee": {"id": 1}},
+            )
+        ]
+
+        # Consecutive matches must not be skipped
+        self.assertEqual(
+            [
+                record.id
+                for record in apply_filters(
+                    records, is_not_work_in_progress, lacks_assignee
+                )
+            ],
+            [3],
+        )
+
+    def test_apply_filters_is_lazy(self):
+        def stream():
+            yield Issue.from_json({"id": 1, "due_date": "2018-08-01"})
+            raise AssertionError("Stream consumed too eagerly")
+
+        self.assertEqual(next(apply_filters(stream(), has_due_date)).id, 1)
+
+    def test_older_than(self):
+        now = pytz.utc.localize(datetime.utcnow())
+        predicate = older_than(1)
+
+        self.assertEqual(
+            predicate(
+                MergeRequest.from_json(
+                    {"created_at": (now - timedelta(2)).isoformat()}
+                )
+            ),
+            True,
+        )
+        self.assertEqual(
+            predicate(MergeRequest.from_json({"created_at": now.isoformat()})),
+            False,
+        )
+
+    def test_has_assignee(self):
+        self.assertEqual(
+            has_assignee(Issue.from_json({"assignee": {"id": 1}})), True
+        )
+        self.assertEqual(
+            has_assignee(
+                Issue.from_json({"assignee": None, "assignees": [{"id": 1}]})
+            ),
+            True,
+        )
+        self.assertEqual(
+            has_assignee(Issue.from_json({"assignee": None})), False
+        )
+        self.assertEqual(
+            lacks_assignee(
+                Issue.from_json({"assignee": None, "assignees": []})
+            ),
+            True,
+        )
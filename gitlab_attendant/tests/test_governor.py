@@ -0,0 +1,156 @@
+import mock
+import threading
+import unittest
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from gitlab_attendant.governor import RateLimitGovernor
+from gitlab_attendant.utils import GitLabSession
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestRateLimitGovernor(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("gitlab_attendant.governor.time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_acquire_paces_to_configured_rate(self):
+        governor = RateLimitGovernor(requests_per_minute=60, burst=2)
+
+        for _ in range(4):
+            governor.acquire()
+
+        # Two requests use the burst, the next two wait a second each
+        self.assertEqual(self.clock.now, 1002.0)
+
+    def test_acquire_unlimited_without_rate(self):
+        governor = RateLimitGovernor()
+
+        for _ in range(100):
+            governor.acquire()
+
+        self.assertEqual(self.clock.now, 1000.0)
+
+    def test_observe_spreads_remaining_allowance(self):
+        governor = RateLimitGovernor(burst=1)
+        response = mock.Mock(
+            status_code=200,
+            headers={"RateLimit-Remaining": "10", "RateLimit-Reset": "1020"},
+        )
+
+        self.assertIsNone(governor.observe(response))
+        governor.acquire()
+        governor.acquire()
+
+        # 10 requests remain over 20 seconds, so one every 2 seconds
+        self.assertEqual(self.clock.now, 1002.0)
+
+    def test_observe_pauses_when_allowance_exhausted(self):
+        governor = RateLimitGovernor()
+        response = mock.Mock(
+            status_code=200,
+            headers={"RateLimit-Remaining": "0", "RateLimit-Reset": "1030"},
+        )
+
+        governor.observe(response)
+        governor.acquire()
+
+        self.assertEqual(self.clock.now, 1030.0)
+
+    def test_observe_honours_retry_after(self):
+        governor = RateLimitGovernor()
+        response = mock.Mock(status_code=429, headers={"Retry-After": "5"})
+
+        self.assertEqual(governor.observe(response), 5.0)
+        governor.acquire()
+
+        self.assertEqual(self.clock.now, 1005.0)
+
+    def test_observe_ignores_malformed_headers(self):
+        governor = RateLimitGovernor()
+        response = mock.Mock(
+            status_code=429,
+            headers={
+                "RateLimit-Remaining": "many",
+                "RateLimit-Reset": "soon",
+                "Retry-After": "later",
+            },
+        )
+
+        # Without usable headers a rate limited request waits a second
+        self.assertEqual(governor.observe(response), 1.0)
+
+
+class RateLimitedHandler(BaseHTTPRequestHandler):
+    """
+    Answers the first few requests as rate limited, then accepts them.
+    """
+
+    def do_GET(self):
+        self.server.hits += 1
+        if self.server.hits <= self.server.rate_limited:
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"[]")
+
+    def log_message(self, *args):
+        pass
+
+
+class TestGitLabSessionGovernor(unittest.TestCase):
+    @mock.patch("gitlab_attendant.utils.requests.Session.request")
+    def test_request_retries_rate_limited_requests(self, mock_request):
+        rate_limited = mock.Mock(status_code=429, headers={"Retry-After": "0"})
+        accepted = mock.Mock(status_code=200, headers={})
+        mock_request.side_effect = [rate_limited, accepted]
+
+        session = GitLabSession("test", governor=RateLimitGovernor())
+
+        self.assertIs(
+            session.get("http://localhost/api/v4/projects"), accepted
+        )
+        self.assertEqual(mock_request.call_count, 2)
+
+    def test_rate_limited_requests_reach_governor(self):
+        server = HTTPServer(("127.0.0.1", 0), RateLimitedHandler)
+        server.hits = 0
+        server.rate_limited = 3
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        governor = RateLimitGovernor()
+        session = GitLabSession("test", governor=governor)
+        statuses = []
+        observe = governor.observe
+        governor.observe = lambda response: (
+            statuses.append(response.status_code) or observe(response)
+        )
+
+        response = session.get(f"http://127.0.0.1:{server.server_port}/")
+
+        # Each 429 goes back through the governor rather than being
+        # retried by urllib3 behind its back
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(server.hits, 4)
+        self.assertEqual(statuses, [429, 429, 429, 200])
@@ -0,0 +1,134 @@
+import json
+import logging
+import mock
+import queue
+import sys
+import unittest
+
+from gitlab_attendant.log_handlers import (
+    _JsonQueueHandler,
+    configure_logging,
+    jsonFormatter,
+    log_body,
+    log_to_queue,
+    logger,
+)
+
+
+class TestLogHandlers(unittest.TestCase):
+    def tearDown(self):
+        configure_logging()
+
+    def test_configure_logging_sets_level(self):
+        configure_logging("error")
+
+        self.assertEqual(logger.level, logging.ERROR)
+
+    @mock.patch("gitlab_attendant.log_handlers.logger.debug")
+    def test_log_body_skipped_above_debug_level(self, mock_debug):
+        configure_logging("INFO")
+        mock_debug.reset_mock()
+
+        log_body("Response body from GET request to %s: %s", "url", [])
+
+        self.assertEqual(mock_debug.called, False)
+
+    @mock.patch("gitlab_attendant.log_handlers.random.random")
+    @mock.patch("gitlab_attendant.log_handlers.logger.debug")
+    def test_log_body_sampled(self, mock_debug, mock_random):
+        configure_logging("DEBUG", body_sample_rate=0.5)
+        mock_debug.reset_mock()
+
+        mock_random.return_value = 0.7
+        log_body("Response body from GET request to %s: %s", "url", [])
+        mock_random.return_value = 0.2
+        log_body("Response body from GET request to %s: %s", "url", [])
+
+        self.assertEqual(mock_debug.call_count, 1)
+
+    def test_log_body_truncated(self):
+        configure_logging("DEBUG", body_limit=20)
+        records = []
+
+        with mock.patch.object(logger, "handle", records.append):
+            log_body(
+                "Response body from GET request to %s: %s",
+                "url",
+                [
+                    {"id": index, "description": "x" * 500}
+                    for index in range(100)
+                ],
+            )
+
+        message = records[0].getMessage()
+        self.assertEqual(
+            message, f"Response body from GET request to url: {message[39:]}"
+        )
+        self.assertEqual(len(message[39:]), 23)
+        self.assertEqual(message.endswith("..."), True)
+
+    def test_formatter_formats_arguments(self):
+        record = logging.LogRecord(
+            "test", logging.INFO, __file__, 1, "Assigned %s issues", (3,), None
+        )
+
+        self.assertEqual(
+            json.loads(jsonFormatter.format(record))["message"],
+            "Assigned 3 issues",
+        )
+
+    def test_formatter_adds_extra_fields(self):
+        record = logging.LogRecord(
+            "test", logging.INFO, __file__, 1, "Task completed", (), None
+        )
+        record.task = "assign_open_merge_requests"
+        record.duration_ms = 12.5
+
+        log_entry = json.loads(jsonFormatter.format(record))
+
+        self.assertEqual(log_entry["task"], "assign_open_merge_requests")
+        self.assertEqual(log_entry["duration_ms"], 12.5)
+        self.assertNotIn("project_id", log_entry)
+
+    def test_queue_handler_prepares_record(self):
+        log_queue = queue.Queue()
+        handler = _JsonQueueHandler(log_queue)
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = logger.makeRecord(
+                "test",
+                logging.ERROR,
+                __file__,
+                1,
+                "Failed for project %s",
+                (5,),
+                sys.exc_info(),
+                extra={"project_id": 5},
+            )
+
+        handler.handle(record)
+        queued = log_queue.get_nowait()
+        log_entry = json.loads(jsonFormatter.format(queued))
+
+        self.assertEqual(log_entry["message"], "Failed for project 5")
+        self.assertEqual(log_entry["project_id"], 5)
+        self.assertIn("ValueError: boom\n", log_entry["exception"])
+        self.assertEqual(record.args, (5,))
+
+    def test_records_sent_to_queue_tagged_with_instance(self):
+        log_queue = queue.Queue()
+        handlers = list(logger.handlers)
+        try:
+            log_to_queue(log_queue, "internal")
+            logger.info("Assigned %s issues", 3)
+        finally:
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+            for handler in handlers:
+                logger.addHandler(handler)
+
+        log_entry = json.loads(jsonFormatter.format(log_queue.get_nowait()))
+
+        self.assertEqual(log_entry["message"], "Assigned 3 issues")
+        self.assertEqual(log_entry["instance"], "internal")
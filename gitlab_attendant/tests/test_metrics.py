@@ -0,0 +1,161 @@
+import contextvars
+import mock
+import os
+import requests
+import tempfile
+import unittest
+import urllib.request
+
+from concurrent.futures import ThreadPoolExecutor
+
+from gitlab_attendant.errors import ErrorReport, run_isolated
+from gitlab_attendant.metrics import (
+    MetricsRegistry,
+    endpoint_template,
+    serve_metrics,
+)
+from gitlab_attendant.utils import GitLabSession
+
+
+class TestMetrics(unittest.TestCase):
+    def test_endpoint_template_replaces_ids(self):
+        self.assertEqual(
+            endpoint_template(
+                "http://localhost/api/v4/projects/12/merge_requests/3?page=2"
+            ),
+            "/api/v4/projects/:id/merge_requests/:id",
+        )
+
+    def test_render_request_metrics(self):
+        metrics = MetricsRegistry()
+
+        metrics.observe_request(
+            "get", "http://localhost/api/v4/projects/1/issues", 0.03, 200
+        )
+        metrics.observe_request(
+            "GET", "http://localhost/api/v4/projects/2/issues", 0.2, 500
+        )
+        metrics.observe_request(
+            "PUT", "http://localhost/api/v4/projects/2/issues/4", 0.01, None
+        )
+        text = metrics.render()
+
+        self.assertIn(
+            'gitlab_attendant_requests_total{endpoint="/api/v4/projects/:id/issues",method="GET",status="200"} 1',
+            text,
+        )
+        self.assertIn(
+            'gitlab_attendant_request_errors_total{endpoint="/api/v4/projects/:id/issues",method="GET"} 1',
+            text,
+        )
+        self.assertIn(
+            'gitlab_attendant_requests_total{endpoint="/api/v4/projects/:id/issues/:id",method="PUT",status="error"} 1',
+            text,
+        )
+        self.assertIn(
+            'gitlab_attendant_request_duration_seconds_bucket{endpoint="/api/v4/projects/:id/issues",method="GET",le="0.05"} 1',
+            text,
+        )
+        self.assertIn(
+            'gitlab_attendant_request_duration_seconds_bucket{endpoint="/api/v4/projects/:id/issues",method="GET",le="+Inf"} 2',
+            text,
+        )
+        self.assertIn(
+            'gitlab_attendant_request_duration_seconds_count{endpoint="/api/v4/projects/:id/issues",method="GET"} 2',
+            text,
+        )
+        self.assertIn(
+            "# TYPE gitlab_attendant_request_duration_seconds histogram", text
+        )
+
+    def test_run_isolated_records_task_metrics(self):
+        metrics = MetricsRegistry()
+
+        def failing_task(cli_args):
+            raise KeyError("assignee")
+
+        run_isolated(ErrorReport(), failing_task, {}, metrics=metrics)
+        run_isolated(ErrorReport(), len, {}, metrics=metrics)
+        text = metrics.render()
+
+        self.assertIn(
+            'gitlab_attendant_task_failures_total{task="failing_task"} 1', text
+        )
+        self.assertIn('gitlab_attendant_task_runs_total{task="len"} 1', text)
+        self.assertNotIn('task_failures_total{task="len"}', text)
+
+    def test_requests_are_labelled_with_their_task(self):
+        metrics = MetricsRegistry()
+
+        def observe():
+            metrics.observe_request(
+                "GET", "http://localhost/api/v4/projects", 0.01, 200
+            )
+
+        def labelled_task(cli_args):
+            observe()
+            # Worker threads are given a copy of the task's context
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                executor.submit(contextvars.copy_context().run, observe)
+
+        run_isolated(ErrorReport(), labelled_task, {}, metrics=metrics)
+        observe()
+        text = metrics.render()
+
+        self.assertIn(
+            'gitlab_attendant_requests_total{endpoint="/api/v4/projects",method="GET",status="200",task="labelled_task"} 2',
+            text,
+        )
+        self.assertIn(
+            'gitlab_attendant_requests_total{endpoint="/api/v4/projects",method="GET",status="200"} 1',
+            text,
+        )
+
+    def test_session_records_failed_requests(self):
+        metrics = MetricsRegistry()
+        session = GitLabSession("token", metrics=metrics)
+
+        with mock.patch(
+            "requests.Session.request",
+            side_effect=requests.exceptions.ConnectionError(),
+        ):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                session.get("http://localhost/api/v4/projects")
+
+        self.assertIn(
+            'gitlab_attendant_request_errors_total{endpoint="/api/v4/projects",method="GET"} 1',
+            metrics.render(),
+        )
+
+    def test_write_metrics_file(self):
+        metrics = MetricsRegistry()
+        metrics.set("last_run_failures", {}, 2)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "gitlab_attendant.prom")
+            metrics.write(path)
+
+            with open(path) as metrics_file:
+                self.assertIn(
+                    "gitlab_attendant_last_run_failures 2", metrics_file.read()
+                )
+            self.assertEqual(os.listdir(directory), ["gitlab_attendant.prom"])
+
+    def test_serve_metrics(self):
+        metrics = MetricsRegistry()
+        metrics.inc("task_runs_total", {"task": "remove_merged_branches"})
+        server = serve_metrics(metrics, 0)
+
+        try:
+            with urllib.request.urlopen(
+                f"http://127.0.0.1:{server.server_port}/metrics"
+            ) as response:
+                body = response.read().decode("utf-8")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertIn(
+            'gitlab_attendant_task_runs_total{task="remove_merged_branches"} 1',
+            body,
+        )
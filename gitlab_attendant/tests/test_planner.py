@@ -0,0 +1,81 @@
+import mock
+import unittest
+
+from gitlab_attendant.api_calls import (
+    add_note_to_issue,
+    assign_user_to_merge_request,
+    delete_merged_branches,
+)
+from gitlab_attendant.planner import RunPlan
+from gitlab_attendant.utils import GitLabSession
+
+
+class TestPlanner(unittest.TestCase):
+    @mock.patch("gitlab_attendant.api_calls.put_request")
+    def test_dry_run_records_assignment(self, mock_put_request):
+        plan = RunPlan()
+        cli_args = {"ip_address": "localhost", "plan": plan}
+
+        self.assertIsNone(assign_user_to_merge_request(cli_args, 1, 2, 3))
+        self.assertEqual(mock_put_request.called, False)
+        self.assertEqual(
+            plan.actions,
+            [("assignment", "Assign merge request !2 of project 1 to user 3")],
+        )
+
+    @mock.patch("gitlab_attendant.api_calls.post_request")
+    @mock.patch("gitlab_attendant.api_calls.delete_request")
+    def test_dry_run_records_notes_and_branch_removals(
+        self, mock_delete_request, mock_post_request
+    ):
+        plan = RunPlan()
+        cli_args = {"ip_address": "localhost", "plan": plan}
+
+        add_note_to_issue(cli_args, 1, 4, {"body": "Nudging user @dev"})
+        response = delete_merged_branches(cli_args, 1)
+
+        self.assertEqual(mock_post_request.called, False)
+        self.assertEqual(mock_delete_request.called, False)
+        self.assertEqual(response, {"message": "202 Accepted"})
+        rendered = plan.render()
+        self.assertIn(
+            "Note on issue #4 of project 1: 'Nudging user @dev'", rendered
+        )
+        self.assertIn("Delete merged branches of project 1", rendered)
+        self.assertIn("Total: POST 1, DELETE 1 (2 requests", rendered)
+
+    def test_render_counts_requests_per_endpoint(self):
+        plan = RunPlan()
+
+        plan.record_request(
+            "GET", "http://localhost/api/v4/projects/1/members", 0, 1024
+        )
+        plan.record_request(
+            "GET", "http://localhost/api/v4/projects/2/members", 0, 1024
+        )
+        plan.record_write(
+            "PUT",
+            "http://localhost/api/v4/projects/1/issues/2",
+            {"assignee_ids": [3]},
+            "assignment",
+            "Assign issue #2 of project 1 to user 3",
+        )
+        lines = plan.render().splitlines()
+
+        self.assertEqual(
+            lines[3].split()[:3], ["GET", "/api/v4/projects/:id/members", "2"]
+        )
+        self.assertEqual(
+            lines[4].split()[:3],
+            ["PUT", "/api/v4/projects/:id/issues/:id", "1"],
+        )
+        self.assertIn("Assignments (1):", lines)
+
+    def test_session_refuses_writes_during_dry_run(self):
+        session = GitLabSession("token", plan=RunPlan())
+
+        with mock.patch("requests.Session.request") as mock_request:
+            with self.assertRaises(RuntimeError):
+                session.put("http://localhost/api/v4/projects/1/issues/2")
+
+        self.assertEqual(mock_request.called, False)
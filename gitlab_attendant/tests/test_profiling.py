@@ -0,0 +1,143 @@
+import contextlib
+import mock
+import os
+import pstats
+import tempfile
+import unittest
+
+from io import StringIO
+
+from gitlab_attendant.main import process_arguments, profiled_tasks
+from gitlab_attendant.profiling import profiling, task_profiling
+from gitlab_attendant.records import Project
+from gitlab_attendant.tasks import remove_merged_branches
+
+
+class TestProfiling(unittest.TestCase):
+    @mock.patch("gitlab_attendant.profiling.logger.info")
+    def test_profiling_writes_stats_and_logs_summary(self, mock_info):
+        with tempfile.TemporaryDirectory() as directory:
+            with profiling(directory, "tasks", top=5):
+                sorted(range(1000), key=str)
+
+            files = os.listdir(directory)
+            self.assertEqual(len(files), 1)
+            self.assertEqual(files[0].startswith("tasks-"), True)
+            stats = pstats.Stats(os.path.join(directory, files[0]))
+            self.assertGreater(stats.total_calls, 0)
+
+        self.assertEqual(mock_info.call_count, 1)
+        self.assertEqual(mock_info.call_args[0][1], "tasks")
+        self.assertEqual(mock_info.call_args[0][3], 5)
+
+    @mock.patch("gitlab_attendant.profiling.logger.info")
+    def test_profiles_written_together_are_kept_apart(self, mock_info):
+        with tempfile.TemporaryDirectory() as directory:
+            for _ in range(2):
+                with profiling(directory, "tasks"):
+                    pass
+
+            self.assertEqual(len(os.listdir(directory)), 2)
+
+    @mock.patch("gitlab_attendant.main.tasks")
+    def test_whole_run_profile_is_named_after_its_tasks(self, mock_tasks):
+        with tempfile.TemporaryDirectory() as directory:
+            args = {
+                "profile_dir": directory,
+                "profile_task": None,
+                "profile_top": "3",
+            }
+
+            with mock.patch("gitlab_attendant.profiling.logger.info"):
+                profiled_tasks(args, ["notify_issue_assignees"])
+
+            self.assertEqual(
+                os.listdir(directory)[0].startswith(
+                    "tasks-notify_issue_assignees-"
+                ),
+                True,
+            )
+
+    @mock.patch("gitlab_attendant.profiling.cProfile.Profile")
+    def test_profiling_without_directory_does_nothing(self, mock_profile):
+        with profiling(None, "tasks"):
+            pass
+
+        self.assertEqual(mock_profile.called, False)
+
+    @mock.patch("gitlab_attendant.profiling.cProfile.Profile")
+    def test_task_profiling_only_profiles_selected_task(self, mock_profile):
+        cli_args = {
+            "profile_dir": "/tmp/profiles",
+            "profile_task": "assign_open_merge_requests",
+        }
+
+        with task_profiling(cli_args, "remove_merged_branches"):
+            pass
+
+        self.assertEqual(mock_profile.called, False)
+
+    def test_task_profiling_profiles_selected_task(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cli_args = {
+                "profile_dir": directory,
+                "profile_task": "assign_open_merge_requests",
+                "profile_top": "3",
+            }
+
+            with mock.patch("gitlab_attendant.profiling.logger.info"):
+                with task_profiling(cli_args, "assign_open_merge_requests"):
+                    pass
+
+            self.assertEqual(
+                os.listdir(directory)[0].startswith(
+                    "assign_open_merge_requests-"
+                ),
+                True,
+            )
+
+    @mock.patch("gitlab_attendant.tasks.delete_merged_branches")
+    @mock.patch("gitlab_attendant.tasks.get_all_projects")
+    def test_profile_includes_single_worker_branch_removal(
+        self, mock_get_all_projects, mock_delete_merged_branches
+    ):
+        mock_get_all_projects.return_value = [Project(1), Project(2)]
+        mock_delete_merged_branches.return_value = {"message": "202 Accepted"}
+
+        with tempfile.TemporaryDirectory() as directory:
+            cli_args = {
+                "profile_dir": directory,
+                "profile_task": "remove_merged_branches",
+                "profile_top": "3",
+                "branch_workers": "1",
+            }
+
+            with mock.patch("gitlab_attendant.profiling.logger.info"):
+                with task_profiling(cli_args, "remove_merged_branches"):
+                    remove_merged_branches(cli_args)
+
+            stats = pstats.Stats(
+                os.path.join(directory, os.listdir(directory)[0])
+            )
+
+        self.assertIn(
+            "_delete_project_merged_branches",
+            {function for _, _, function in stats.stats},
+        )
+
+    def test_profiling_refuses_worker_threads(self):
+        for option in ("--concurrency", "--branch-workers"):
+            with self.assertRaises(SystemExit):
+                with contextlib.redirect_stderr(StringIO()):
+                    process_arguments(
+                        [
+                            "--ip",
+                            "localhost",
+                            "--token",
+                            "test",
+                            "--profile",
+                            "/tmp/profiles",
+                            option,
+                            "4",
+                        ]
+                    )
@@ -0,0 +1,100 @@
+import mock
+import pytz
+import unittest
+
+from datetime import datetime
+
+from gitlab_attendant.records import (
+    Issue,
+    MergeRequest,
+    User,
+    format_timestamp,
+    parse_timestamp,
+)
+
+
+class TestRecords(unittest.TestCase):
+    def test_format_timestamp_matches_gitlab(self):
+        for value in ("2018-08-10T12:00:00.123Z", "2018-08-10T12:00:00.000Z"):
+            self.assertEqual(format_timestamp(parse_timestamp(value)), value)
+
+    def test_parse_timestamp_normalizes_to_utc(self):
+        expected = pytz.utc.localize(datetime(2018, 8, 1, 12, 30, 0, 123000))
+
+        self.assertEqual(parse_timestamp("2018-08-01T12:30:00.123Z"), expected)
+        self.assertEqual(
+            parse_timestamp("2018-08-01T14:30:00.123+02:00"), expected
+        )
+        self.assertEqual(parse_timestamp("2018-08-01T12:30:00.123"), expected)
+        self.assertEqual(
+            parse_timestamp("2018-08-01"),
+            pytz.utc.localize(datetime(2018, 8, 1)),
+        )
+        self.assertEqual(parse_timestamp(None), None)
+        self.assertEqual(
+            parse_timestamp("2018-08-01T14:30:00.123Z").tzinfo, pytz.utc
+        )
+
+    @mock.patch("gitlab_attendant.records.dateutil.parser.parse")
+    def test_parse_timestamp_falls_back_to_dateutil(self, mock_parse):
+        mock_parse.return_value = datetime(2018, 8, 1, 12)
+
+        self.assertEqual(
+            parse_timestamp("1 August 2018 12:00"),
+            pytz.utc.localize(datetime(2018, 8, 1, 12)),
+        )
+        self.assertEqual(mock_parse.call_count, 1)
+
+    def test_merge_request_keeps_fields_used_by_tasks(self):
+        merge_request = MergeRequest.from_json(
+            {
+                "id": 10,
+                "iid": 2,
+                "project_id": 3,
+                "title": "Unused",
+                "description": "Unused " * 100,
+                "state": "opened",
+                "work_in_progress": False,
+                "created_at": "2018-08-01T12:00:00.000Z",
+                "author": {"id": 4, "username": "author", "web_url": "x"},
+                "assignee": None,
+                "assignees": [{"id": 5, "username": "dev"}],
+                "merge_status": "can_be_merged",
+            }
+        )
+
+        self.assertEqual(merge_request.author, User(4, "author"))
+        self.assertEqual(merge_request.assignees, (User(5, "dev"),))
+        self.assertEqual(
+            merge_request.created_at,
+            pytz.utc.localize(datetime(2018, 8, 1, 12)),
+        )
+        self.assertEqual(len(merge_request), 10)
+
+    def test_issue_due_date_parsed(self):
+        issue = Issue.from_json(
+            {"id": 1, "iid": 2, "project_id": 3, "due_date": "2018-08-01"}
+        )
+
+        self.assertEqual(
+            issue.due_date, pytz.utc.localize(datetime(2018, 8, 1))
+        )
+        self.assertEqual(issue.assignee, None)
+        self.assertEqual(issue.assignees, ())
+
+    def test_repeated_users_are_shared(self):
+        user = {"id": 1, "username": "test", "web_url": "http://localhost"}
+        merge_request = MergeRequest.from_json(
+            {"id": 1, "author": user, "assignee": dict(user)}
+        )
+
+        self.assertIs(merge_request.author, merge_request.assignee)
+        self.assertEqual(merge_request.author, User(1, "test"))
+
+    def test_states_are_shared(self):
+        first, second = (
+            Issue.from_json({"id": issue_id, "state": "".join("opened")})
+            for issue_id in (1, 2)
+        )
+
+        self.assertIs(first.state, second.state)
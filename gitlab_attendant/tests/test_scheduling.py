@@ -0,0 +1,96 @@
+import mock
+import schedule
+import threading
+import unittest
+
+from gitlab_attendant.scheduling import (
+    claim_task,
+    group_tasks,
+    parse_task_interval,
+    run_scheduler,
+    schedule_tasks,
+)
+
+
+class TestScheduling(unittest.TestCase):
+    def test_parse_task_interval(self):
+        self.assertEqual(
+            parse_task_interval("assign_open_merge_requests=5"),
+            ("assign_open_merge_requests", 5.0, 0.0),
+        )
+        self.assertEqual(
+            parse_task_interval("remove_merged_branches=1440+60"),
+            ("remove_merged_branches", 1440.0, 60.0),
+        )
+        with self.assertRaises(ValueError):
+            parse_task_interval("remove_merged_branches")
+
+    def test_tasks_on_the_same_schedule_are_grouped(self):
+        groups = group_tasks(
+            ("first", "second", "third"),
+            {"second": (5, 0)},
+            (60, 10),
+        )
+
+        self.assertEqual(
+            list(groups.items()),
+            [((3600, 600), ["first", "third"]), ((300, 0), ["second"])],
+        )
+
+    def test_running_task_is_skipped(self):
+        cli_args = {"task_locks": {"task": threading.Lock()}}
+
+        with claim_task(cli_args, "task") as claimed:
+            with claim_task(cli_args, "task") as claimed_again:
+                self.assertEqual((claimed, claimed_again), (True, False))
+        with claim_task(cli_args, "task") as claimed:
+            self.assertEqual(claimed, True)
+
+    def test_tasks_without_a_lock_always_run(self):
+        with claim_task({}, "task") as claimed:
+            self.assertEqual(claimed, True)
+
+    @mock.patch("gitlab_attendant.scheduling.start_run")
+    def test_schedule_tasks_adds_jitter(self, mock_start_run):
+        scheduler = schedule.Scheduler()
+
+        jobs = schedule_tasks(
+            mock.Mock(),
+            {},
+            {(300, 0): ["first"], (3600, 600): ["second"]},
+            scheduler,
+        )
+
+        self.assertEqual(
+            [(job.interval, job.latest) for job in jobs],
+            [(300, None), (3600, 4200)],
+        )
+        self.assertEqual(len(scheduler.jobs), 2)
+
+    def test_scheduler_runs_every_job_when_woken(self):
+        scheduler = mock.Mock(idle_seconds=3600)
+        wake = threading.Event()
+        wake.set()
+
+        def run_all():
+            # Woken again during the first run, the second ends the loop
+            if scheduler.run_all.call_count > 1:
+                raise StopIteration
+            wake.set()
+
+        scheduler.run_all.side_effect = run_all
+
+        with self.assertRaises(StopIteration):
+            run_scheduler(wake, scheduler)
+
+        self.assertEqual(scheduler.run_all.call_count, 2)
+        self.assertEqual(scheduler.run_pending.called, False)
+
+    def test_scheduler_runs_pending_jobs_once_due(self):
+        scheduler = mock.Mock(idle_seconds=-1)
+        scheduler.run_pending.side_effect = StopIteration
+
+        with self.assertRaises(StopIteration):
+            run_scheduler(threading.Event(), scheduler)
+
+        self.assertEqual(scheduler.run_all.called, False)
@@ -0,0 +1,115 @@
+import collections
+import mock
+import os
+import tempfile
+import time
+import unittest
+
+from gitlab_attendant.api_calls import (
+    get_all_open_issues,
+    get_all_project_members,
+)
+from gitlab_attendant.sharding import (
+    ShardClaim,
+    StaticShard,
+    owns_project,
+    shard_for,
+)
+
+
+class TestSharding(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_projects_are_spread_evenly(self):
+        counts = collections.Counter(
+            shard_for(project_id, 4) for project_id in range(4000)
+        )
+
+        self.assertEqual(sorted(counts), [0, 1, 2, 3])
+        for count in counts.values():
+            self.assertAlmostEqual(count, 1000, delta=100)
+
+    def test_adding_a_shard_only_moves_projects_to_it(self):
+        for project_id in range(1000):
+            before = shard_for(project_id, 3)
+            after = shard_for(project_id, 4)
+            self.assertIn(after, (before, 3))
+
+    def test_each_project_has_one_owner(self):
+        replicas = [{"shard": StaticShard(index, 3)} for index in range(3)]
+
+        for project_id in range(100):
+            self.assertEqual(
+                sum(
+                    owns_project(cli_args, project_id) for cli_args in replicas
+                ),
+                1,
+            )
+
+    def test_every_project_owned_without_sharding(self):
+        self.assertEqual(owns_project({}, 5), True)
+        self.assertEqual(
+            owns_project({"shard": StaticShard(None, 2)}, 5), False
+        )
+
+    @mock.patch("gitlab_attendant.api_calls.get_paginated_request")
+    def test_datasets_only_hold_owned_projects(
+        self, mock_get_paginated_request
+    ):
+        mock_get_paginated_request.return_value = [
+            {"id": project_id, "project_id": project_id}
+            for project_id in range(20)
+        ]
+        shard = StaticShard(1, 2)
+        cli_args = {
+            "ip_address": "localhost",
+            "session": mock.Mock(),
+            "shard": shard,
+        }
+
+        issues = list(get_all_open_issues(cli_args))
+        members = list(get_all_project_members(cli_args, 3))
+
+        self.assertEqual(
+            [issue.project_id for issue in issues],
+            [
+                project_id
+                for project_id in range(20)
+                if shard_for(project_id, 2) == 1
+            ],
+        )
+        self.assertEqual(len(members), 20)
+
+    @mock.patch("gitlab_attendant.sharding.threading.Thread")
+    def test_replicas_claim_different_shards(self, mock_thread):
+        first = ShardClaim(self.directory.name, 2, 300)
+        second = ShardClaim(self.directory.name, 2, 300)
+        third = ShardClaim(self.directory.name, 2, 300)
+
+        self.assertEqual((first.claim(), second.claim()), (True, True))
+        self.assertEqual((first.index, second.index), (0, 1))
+        self.assertEqual(third.claim(), False)
+
+        second.release()
+        self.assertEqual(third.claim(), True)
+        self.assertEqual(third.index, 1)
+
+    @mock.patch("gitlab_attendant.sharding.threading.Thread")
+    def test_stale_claim_taken_over(self, mock_thread):
+        first = ShardClaim(self.directory.name, 2, 300, index=1)
+        second = ShardClaim(self.directory.name, 2, 300, index=1)
+        first.claim()
+
+        self.assertEqual(second.claim(), False)
+
+        stale = time.time() - 600
+        os.utime(
+            os.path.join(self.directory.name, "shard-1.lock"), (stale, stale)
+        )
+        self.assertEqual(second.claim(), True)
+        self.assertEqual(second.index, 1)
+        self.assertEqual(first._holds(1), False)
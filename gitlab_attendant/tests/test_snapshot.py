@@ -0,0 +1,135 @@
+import mock
+import unittest
+
+from gitlab_attendant.api_calls import assign_issue, get_all_open_issues
+from gitlab_attendant.records import Issue, MergeRequest, User
+from gitlab_attendant.snapshot import RunSnapshot
+
+
+class TestRunSnapshot(unittest.TestCase):
+    def test_fetch_loads_dataset_once(self):
+        snapshot = RunSnapshot()
+        loader = mock.Mock(return_value=iter([{"id": 1}]))
+
+        first = snapshot.fetch("issues", "http://localhost/issues", loader)
+        second = snapshot.fetch("issues", "http://localhost/issues", loader)
+
+        self.assertEqual(first, [{"id": 1}])
+        self.assertEqual(second, [{"id": 1}])
+        self.assertEqual(loader.call_count, 1)
+
+    def test_fetch_returns_copies(self):
+        snapshot = RunSnapshot()
+        loader = mock.Mock(return_value=[{"id": 1}, {"id": 2}])
+
+        records = snapshot.fetch("issues", "http://localhost/issues", loader)
+        records.remove({"id": 1})
+
+        self.assertEqual(
+            snapshot.fetch("issues", "http://localhost/issues", loader),
+            [{"id": 1}, {"id": 2}],
+        )
+
+    def test_update_replaces_matching_record(self):
+        snapshot = RunSnapshot()
+        first, second = Issue.from_json({"id": 1}), Issue.from_json({"id": 2})
+        assigned = Issue.from_json({"id": 2, "assignee": {"id": 5}})
+        snapshot.fetch(
+            "issues", "http://localhost/issues", lambda: [first, second]
+        )
+
+        snapshot.update("issues", assigned)
+        snapshot.update(
+            "merge_requests",
+            MergeRequest.from_json({"id": 1, "assignee": {"id": 5}}),
+        )
+
+        self.assertEqual(
+            snapshot.fetch("issues", "http://localhost/issues", mock.Mock()),
+            [first, assigned],
+        )
+
+    @mock.patch("gitlab_attendant.api_calls.put_request")
+    @mock.patch("gitlab_attendant.api_calls.get_paginated_request")
+    def test_api_calls_share_snapshot(
+        self, mock_get_paginated_request, mock_put_request
+    ):
+        cli_args = {
+            "ip_address": "localhost",
+            "session": mock.Mock(),
+            "snapshot": RunSnapshot(),
+        }
+
+        mock_get_paginated_request.return_value = iter(
+            [{"id": 10, "iid": 1, "project_id": 1, "assignees": []}]
+        )
+        mock_put_request.return_value = {
+            "id": 10,
+            "iid": 1,
+            "project_id": 1,
+            "assignees": [{"id": 5}],
+        }
+
+        self.assertEqual(list(get_all_open_issues(cli_args))[0].assignees, ())
+        assign_issue(cli_args, 1, 1, 5)
+
+        self.assertEqual(
+            list(get_all_open_issues(cli_args))[0].assignees, (User(5, ""),)
+        )
+        self.assertEqual(mock_get_paginated_request.call_count, 1)
+
+    @mock.patch("gitlab_attendant.api_calls.put_request")
+    @mock.patch("gitlab_attendant.api_calls.get_paginated_request")
+    def test_assigned_record_joins_assigned_listing(
+        self, mock_get_paginated_request, mock_put_request
+    ):
+        cli_args = {
+            "ip_address": "localhost",
+            "session": mock.Mock(),
+            "snapshot": RunSnapshot(),
+        }
+
+        mock_get_paginated_request.side_effect = [
+            iter([{"id": 10, "iid": 1, "project_id": 1}]),
+            iter([{"id": 11, "iid": 2, "project_id": 1}]),
+        ]
+        mock_put_request.return_value = {
+            "id": 10,
+            "iid": 1,
+            "project_id": 1,
+            "assignees": [{"id": 5}],
+        }
+
+        list(get_all_open_issues(cli_args, assigned=False))
+        list(get_all_open_issues(cli_args, assigned=True))
+        assign_issue(cli_args, 1, 1, 5)
+
+        self.assertEqual(
+            [
+                issue.id
+                for issue in get_all_open_issues(cli_args, assigned=True)
+            ],
+            [11, 10],
+        )
+        self.assertEqual(mock_get_paginated_request.call_count, 2)
+
+    @mock.patch("gitlab_attendant.api_calls.get_paginated_request")
+    def test_streamed_issues_skip_snapshot(self, mock_get_paginated_request):
+        cli_args = {
+            "ip_address": "localhost",
+            "session": mock.Mock(),
+            "snapshot": RunSnapshot(),
+            "stream_json": True,
+        }
+
+        mock_get_paginated_request.side_effect = lambda *args, **kwargs: iter(
+            [{"id": 10, "iid": 1, "project_id": 1}]
+        )
+
+        issues = get_all_open_issues(cli_args)
+        self.assertNotIsInstance(issues, list)
+        self.assertEqual([issue.id for issue in issues], [10])
+        list(get_all_open_issues(cli_args))
+
+        self.assertEqual(mock_get_paginated_request.call_count, 2)
+        self.assertEqual(cli_args["snapshot"]._datasets, {})
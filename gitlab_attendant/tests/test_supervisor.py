@@ -0,0 +1,132 @@
+import json
+import os
+import tempfile
+import unittest
+
+from gitlab_attendant.errors import ErrorReport
+from gitlab_attendant.supervisor import (
+    config_arguments,
+    load_config,
+    run_result,
+    supervise,
+)
+
+
+def finished_worker(name, argv, log_queue, results):
+    results.put(
+        {
+            "instance": name,
+            "tasks": argv,
+            "duration_seconds": 0.1,
+            "failures": 0,
+        }
+    )
+
+
+class TestSupervisor(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "config.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_config(self, config: dict):
+        with open(self.path, "w") as config_file:
+            json.dump(config, config_file)
+
+    def test_config_arguments(self):
+        self.assertEqual(
+            config_arguments(
+                {
+                    "ip": "gitlab.example.com",
+                    "branch_workers": 4,
+                    "dry_run": True,
+                    "log_queue": False,
+                    "tasks": [
+                        "assign_open_merge_requests",
+                        "remove_merged_branches",
+                    ],
+                }
+            ),
+            [
+                "--ip",
+                "gitlab.example.com",
+                "--branch-workers",
+                "4",
+                "--dry-run",
+                "--tasks",
+                "assign_open_merge_requests",
+                "--tasks",
+                "remove_merged_branches",
+            ],
+        )
+
+    def test_load_config_applies_defaults(self):
+        self.write_config(
+            {
+                "defaults": {"interval": 24, "token": "shared"},
+                "instances": [
+                    {"name": "internal", "ip": "10.0.0.1", "interval": 1},
+                    {"ip": "10.0.0.2", "token": "own"},
+                ],
+            }
+        )
+
+        self.assertEqual(
+            load_config(self.path),
+            [
+                (
+                    "internal",
+                    [
+                        "--interval",
+                        "1",
+                        "--token",
+                        "shared",
+                        "--ip",
+                        "10.0.0.1",
+                    ],
+                ),
+                (
+                    "10.0.0.2",
+                    ["--interval", "24", "--token", "own", "--ip", "10.0.0.2"],
+                ),
+            ],
+        )
+
+    def test_load_config_rejects_duplicate_instances(self):
+        self.write_config(
+            {"instances": [{"ip": "10.0.0.1"}, {"ip": "10.0.0.1"}]}
+        )
+
+        with self.assertRaises(ValueError):
+            load_config(self.path)
+
+    def test_run_result_summarises_failures(self):
+        error_report = ErrorReport()
+        error_report.record("remove_merged_branches", "boom")
+        error_report.record("remove_merged_branches", "boom")
+
+        result = run_result(
+            "internal", ["remove_merged_branches"], 0, error_report
+        )
+
+        self.assertEqual(result["started_at"], "1970-01-01T00:00:00+00:00")
+        self.assertEqual(result["failures"], 2)
+        self.assertEqual(result["failed_callers"], ["remove_merged_branches"])
+
+    def test_supervise_keeps_latest_result_per_instance(self):
+        results_path = os.path.join(self.directory.name, "results.json")
+
+        supervise(
+            [("internal", ["first"]), ("public", ["second"])],
+            finished_worker,
+            results_path,
+        )
+
+        with open(results_path) as results_file:
+            results = json.load(results_file)
+        self.assertEqual(
+            {name: result["tasks"] for name, result in results.items()},
+            {"internal": ["first"], "public": ["second"]},
+        )
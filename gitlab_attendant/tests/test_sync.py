@@ -0,0 +1,127 @@
+import mock
+import os
+import tempfile
+import unittest
+
+from datetime import timedelta
+
+from gitlab_attendant.sync import IncrementalSync
+
+
+class TestIncrementalSync(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "sync.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_first_fetch_is_full(self):
+        incremental_sync = IncrementalSync(self.path, timedelta(hours=24))
+        loader = mock.Mock(return_value=[{"id": 1, "state": "opened"}])
+
+        records = incremental_sync.fetch(
+            "issues", "http://localhost/api/v4/issues?state=opened", loader
+        )
+
+        self.assertEqual(records, [{"id": 1, "state": "opened"}])
+        loader.assert_called_once_with(
+            "http://localhost/api/v4/issues?state=opened"
+        )
+
+    def test_later_fetches_merge_changes_since_watermark(self):
+        incremental_sync = IncrementalSync(self.path, timedelta(hours=24))
+        pending = {}
+        incremental_sync.fetch(
+            "issues",
+            "http://localhost/api/v4/issues?state=opened",
+            lambda url: [
+                {"id": 1, "state": "opened", "title": "old"},
+                {"id": 2, "state": "opened"},
+            ],
+            pending,
+        )
+        incremental_sync.commit(pending)
+
+        # The working set and watermark are restored from disk
+        incremental_sync = IncrementalSync(self.path, timedelta(hours=24))
+        loader = mock.Mock(
+            return_value=[
+                {"id": 1, "state": "opened", "title": "new"},
+                {"id": 2, "state": "closed"},
+                {"id": 3, "state": "opened"},
+            ]
+        )
+
+        records = incremental_sync.fetch(
+            "issues", "http://localhost/api/v4/issues?state=opened", loader
+        )
+
+        self.assertEqual(
+            records,
+            [
+                {"id": 1, "state": "opened", "title": "new"},
+                {"id": 3, "state": "opened"},
+            ],
+        )
+        changed_url = loader.call_args[0][0]
+        self.assertIn("state=all", changed_url)
+        self.assertIn("updated_after=", changed_url)
+
+    def test_uncommitted_fetches_do_not_advance_watermark(self):
+        incremental_sync = IncrementalSync(self.path, timedelta(hours=24))
+        incremental_sync.fetch(
+            "merge_requests",
+            "http://localhost/api/v4/merge_requests",
+            lambda url: [],
+        )
+
+        loader = mock.Mock(return_value=[])
+        incremental_sync.fetch(
+            "merge_requests", "http://localhost/api/v4/merge_requests", loader
+        )
+
+        loader.assert_called_once_with(
+            "http://localhost/api/v4/merge_requests"
+        )
+
+    def test_commit_saves_only_the_runs_own_fetches(self):
+        incremental_sync = IncrementalSync(self.path, timedelta(hours=24))
+        failed_run, successful_run = {}, {}
+        incremental_sync.fetch(
+            "issues",
+            "http://localhost/issues",
+            lambda url: [{"id": 1, "state": "opened"}],
+            failed_run,
+        )
+        incremental_sync.fetch(
+            "merge_requests",
+            "http://localhost/merge_requests",
+            lambda url: [],
+            successful_run,
+        )
+
+        # Another run committing leaves the failed run's issues unsaved
+        incremental_sync.commit(successful_run)
+
+        loader = mock.Mock(return_value=[])
+        incremental_sync.fetch("issues", "http://localhost/issues", loader)
+        loader.assert_called_once_with("http://localhost/issues")
+        loader = mock.Mock(return_value=[])
+        incremental_sync.fetch(
+            "merge_requests", "http://localhost/merge_requests", loader
+        )
+        self.assertIn("updated_after=", loader.call_args[0][0])
+
+    def test_full_sync_after_interval(self):
+        incremental_sync = IncrementalSync(self.path, timedelta(0))
+        pending = {}
+        incremental_sync.fetch(
+            "issues", "http://localhost/issues", lambda url: [], pending
+        )
+        incremental_sync.commit(pending)
+
+        loader = mock.Mock(return_value=[])
+        incremental_sync.fetch("issues", "http://localhost/issues", loader)
+
+        loader.assert_called_once_with("http://localhost/issues")
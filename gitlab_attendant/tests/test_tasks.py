@@ -6,16 +6,30 @@ import unittest
 from datetime import datetime, timedelta
 from io import StringIO
 
+from gitlab_attendant.records import Issue, MergeRequest, Project, User
 from gitlab_attendant.tasks import (
     assign_open_merge_requests,
     assign_project_members_to_issues,
+    created_before_cutoff,
     notify_issue_assignees,
     notify_stale_merge_request_assignees,
     remove_merged_branches,
 )
+from gitlab_attendant.workload import WorkloadIndex
 
 
 class TestTasks(unittest.TestCase):
+    @mock.patch("gitlab_attendant.tasks.datetime")
+    def test_created_before_cutoff_is_stable_all_day(self, mock_datetime):
+        mock_datetime.utcnow.side_effect = [
+            datetime(2018, 8, 10, 0, 0, 1),
+            datetime(2018, 8, 10, 23, 59, 59, 999),
+        ]
+
+        cutoffs = {created_before_cutoff(7), created_before_cutoff(7)}
+
+        self.assertEqual(cutoffs, {pytz.utc.localize(datetime(2018, 8, 4))})
+
     @mock.patch("gitlab_attendant.tasks.assign_user_to_merge_request")
     @mock.patch("gitlab_attendant.tasks.get_all_project_members")
     @mock.patch("gitlab_attendant.tasks.get_all_open_merge_requests")
@@ -31,17 +45,19 @@ class TestTasks(unittest.TestCase):
         created_at = pytz.utc.localize(datetime.utcnow()) - timedelta(2)
 
         mock_open_merge_requests.return_value = [
-            {
-                "work_in_progress": False,
-                "created_at": created_at.isoformat(),
-                "assignee": None,
-                "project_id": 1,
-                "author": {"id": 1},
-                "iid": 1,
-            }
+            MergeRequest.from_json(
+                {
+                    "work_in_progress": False,
+                    "created_at": created_at.isoformat(),
+                    "assignee": None,
+                    "project_id": 1,
+                    "author": {"id": 1},
+                    "iid": 1,
+                }
+            )
         ]
 
-        mock_get_project_members.return_value = [{"id": 5}]
+        mock_get_project_members.return_value = [User.from_json({"id": 5})]
 
         assign_open_merge_requests(cli_args)
 
@@ -80,7 +96,9 @@ class TestTasks(unittest.TestCase):
     ):
         cli_args = {"ip_address": "localhost", "interval": 1, "token": "test"}
 
-        mock_open_merge_requests.return_value = [{"work_in_progress": True}]
+        mock_open_merge_requests.return_value = [
+            MergeRequest.from_json({"work_in_progress": True})
+        ]
 
         assign_open_merge_requests(cli_args)
 
@@ -104,14 +122,16 @@ class TestTasks(unittest.TestCase):
         created_at = pytz.utc.localize(datetime.utcnow())
 
         mock_open_merge_requests.return_value = [
-            {
-                "work_in_progress": False,
-                "created_at": created_at.isoformat(),
-                "assignee": None,
-                "project_id": 1,
-                "author": {"id": 1},
-                "iid": 1,
-            }
+            MergeRequest.from_json(
+                {
+                    "work_in_progress": False,
+                    "created_at": created_at.isoformat(),
+                    "assignee": None,
+                    "project_id": 1,
+                    "author": {"id": 1},
+                    "iid": 1,
+                }
+            )
         ]
 
         assign_open_merge_requests(cli_args)
@@ -136,11 +156,13 @@ class TestTasks(unittest.TestCase):
         created_at = pytz.utc.localize(datetime.utcnow()) - timedelta(2)
 
         mock_open_merge_requests.return_value = [
-            {
-                "work_in_progress": False,
-                "created_at": created_at.isoformat(),
-                "assignee": {"id": 2},
-            }
+            MergeRequest.from_json(
+                {
+                    "work_in_progress": False,
+                    "created_at": created_at.isoformat(),
+                    "assignee": {"id": 2},
+                }
+            )
         ]
 
         assign_open_merge_requests(cli_args)
@@ -165,14 +187,16 @@ class TestTasks(unittest.TestCase):
         created_at = pytz.utc.localize(datetime.utcnow()) - timedelta(2)
 
         mock_open_merge_requests.return_value = [
-            {
-                "work_in_progress": False,
-                "created_at": created_at.isoformat(),
-                "assignee": None,
-                "project_id": 1,
-                "author": {"id": 1},
-                "iid": 1,
-            }
+            MergeRequest.from_json(
+                {
+                    "work_in_progress": False,
+                    "created_at": created_at.isoformat(),
+                    "assignee": None,
+                    "project_id": 1,
+                    "author": {"id": 1},
+                    "iid": 1,
+                }
+            )
         ]
 
         mock_get_project_members.return_value = []
@@ -197,23 +221,62 @@ class TestTasks(unittest.TestCase):
         created_at = pytz.utc.localize(datetime.utcnow()) - timedelta(2)
 
         mock_open_merge_requests.return_value = [
-            {
-                "work_in_progress": False,
-                "created_at": created_at.isoformat(),
-                "assignee": None,
-                "project_id": 1,
-                "author": {"id": 1},
-                "iid": 1,
-            }
+            MergeRequest.from_json(
+                {
+                    "work_in_progress": False,
+                    "created_at": created_at.isoformat(),
+                    "assignee": None,
+                    "project_id": 1,
+                    "author": {"id": 1},
+                    "iid": 1,
+                }
+            )
         ]
 
-        mock_get_project_members.return_value = [{"id": 1}]
+        mock_get_project_members.return_value = [User.from_json({"id": 1})]
 
         assign_open_merge_requests(cli_args)
 
         self.assertEqual(mock_assign_user_to_merge.called, False)
         self.assertEqual(mock_assign_user_to_merge.call_count, 0)
 
+    @mock.patch("gitlab_attendant.tasks.assign_user_to_merge_request")
+    @mock.patch("gitlab_attendant.tasks.get_all_project_members")
+    @mock.patch("gitlab_attendant.tasks.get_all_open_merge_requests")
+    def test_assign_open_merge_requests_consecutive_work_in_progress(
+        self,
+        mock_open_merge_requests,
+        mock_get_project_members,
+        mock_assign_user_to_merge,
+    ):
+        cli_args = {"ip_address": "localhost", "interval": 1, "token": "test"}
+
+        # Set the created_at date to be over 24 hours old
+        created_at = pytz.utc.localize(datetime.utcnow()) - timedelta(2)
+
+        mock_open_merge_requests.return_value = iter(
+            [
+                MergeRequest.from_json(
+                    {
+                        "work_in_progress": work_in_progress,
+                        "created_at": created_at.isoformat(),
+                        "assignee": None,
+                        "project_id": 1,
+                        "author": {"id": 1},
+                        "iid": iid,
+                    }
+                )
+                for iid, work_in_progress in ((1, True), (2, True), (3, False))
+            ]
+        )
+
+        mock_get_project_members.return_value = [User.from_json({"id": 5})]
+
+        assign_open_merge_requests(cli_args)
+
+        self.assertEqual(mock_assign_user_to_merge.call_count, 1)
+        mock_assign_user_to_merge.assert_called_with(cli_args, 1, 3, 5)
+
     @mock.patch("gitlab_attendant.tasks.add_note_to_merge_request")
     @mock.patch("gitlab_attendant.tasks.get_all_open_merge_requests")
     def test_notify_stale_merge_request_assignees(
@@ -221,19 +284,23 @@ class TestTasks(unittest.TestCase):
     ):
         cli_args = {"ip_address": "localhost", "interval": 1, "token": "test"}
 
-        # Set the created_at date to be over 6 days old
-        created_at = pytz.utc.localize(datetime.utcnow()) - timedelta(7)
+        # Set the created_at date to be over 6 days old, as GitLab sends it
+        created_at = (
+            f"{datetime.utcnow() - timedelta(7):%Y-%m-%dT%H:%M:%S}.123Z"
+        )
 
         mock_open_merge_requests.return_value = [
-            {
-                "work_in_progress": False,
-                "created_at": created_at.isoformat(),
-                "project_id": 1,
-                "author": {"id": 1},
-                "iid": 1,
-                "assignee": {"id": 1, "username": "test-user"},
-                "merge_status": "can_be_merged",
-            }
+            MergeRequest.from_json(
+                {
+                    "work_in_progress": False,
+                    "created_at": created_at,
+                    "project_id": 1,
+                    "author": {"id": 1},
+                    "iid": 1,
+                    "assignee": {"id": 1, "username": "test-user"},
+                    "merge_status": "can_be_merged",
+                }
+            )
         ]
 
         notify_stale_merge_request_assignees(cli_args, 5)
@@ -246,7 +313,7 @@ class TestTasks(unittest.TestCase):
             1,
             1,
             {
-                "body": f"Nudging user @test-user - this merge request has been open since {created_at.isoformat()}. \n\n This could be merged without conflict."
+                "body": f"Nudging user @test-user - this merge request has been open since {created_at}. \n\n This could be merged without conflict."
             },
         )
 
@@ -257,19 +324,23 @@ class TestTasks(unittest.TestCase):
     ):
         cli_args = {"ip_address": "localhost", "interval": 1, "token": "test"}
 
-        # Set the created_at date to be over 6 days old
-        created_at = pytz.utc.localize(datetime.utcnow()) - timedelta(7)
+        # Set the created_at date to be over 6 days old, as GitLab sends it
+        created_at = (
+            f"{datetime.utcnow() - timedelta(7):%Y-%m-%dT%H:%M:%S}.123Z"
+        )
 
         mock_open_merge_requests.return_value = [
-            {
-                "work_in_progress": False,
-                "created_at": created_at.isoformat(),
-                "project_id": 1,
-                "author": {"id": 1},
-                "iid": 1,
-                "assignee": {"id": 1, "username": "test-user"},
-                "merge_status": "cannot_be_merged",
-            }
+            MergeRequest.from_json(
+                {
+                    "work_in_progress": False,
+                    "created_at": created_at,
+                    "project_id": 1,
+                    "author": {"id": 1},
+                    "iid": 1,
+                    "assignee": {"id": 1, "username": "test-user"},
+                    "merge_status": "cannot_be_merged",
+                }
+            )
         ]
 
         notify_stale_merge_request_assignees(cli_args, 5)
@@ -282,7 +353,7 @@ class TestTasks(unittest.TestCase):
             1,
             1,
             {
-                "body": f"Nudging user @test-user - this merge request has been open since {created_at.isoformat()}. \n\n Merge conflicts exist."
+                "body": f"Nudging user @test-user - this merge request has been open since {created_at}. \n\n Merge conflicts exist."
             },
         )
 
@@ -297,15 +368,17 @@ class TestTasks(unittest.TestCase):
         created_at = pytz.utc.localize(datetime.utcnow()) - timedelta(7)
 
         mock_open_merge_requests.return_value = [
-            {
-                "work_in_progress": False,
-                "created_at": created_at.isoformat(),
-                "project_id": 1,
-                "author": {"id": 1},
-                "iid": 1,
-                "assignee": None,
-                "merge_status": "cannot_be_merged",
-            }
+            MergeRequest.from_json(
+                {
+                    "work_in_progress": False,
+                    "created_at": created_at.isoformat(),
+                    "project_id": 1,
+                    "author": {"id": 1},
+                    "iid": 1,
+                    "assignee": None,
+                    "merge_status": "cannot_be_merged",
+                }
+            )
         ]
 
         notify_stale_merge_request_assignees(cli_args, 5)
@@ -324,15 +397,17 @@ class TestTasks(unittest.TestCase):
         created_at = pytz.utc.localize(datetime.utcnow()) - timedelta(7)
 
         mock_open_merge_requests.return_value = [
-            {
-                "work_in_progress": True,
-                "created_at": created_at.isoformat(),
-                "project_id": 1,
-                "author": {"id": 1},
-                "iid": 1,
-                "assignee": {"id": 1, "username": "test-user"},
-                "merge_status": "cannot_be_merged",
-            }
+            MergeRequest.from_json(
+                {
+                    "work_in_progress": True,
+                    "created_at": created_at.isoformat(),
+                    "project_id": 1,
+                    "author": {"id": 1},
+                    "iid": 1,
+                    "assignee": {"id": 1, "username": "test-user"},
+                    "merge_status": "cannot_be_merged",
+                }
+            )
         ]
 
         notify_stale_merge_request_assignees(cli_args, 5)
@@ -351,15 +426,17 @@ class TestTasks(unittest.TestCase):
         created_at = pytz.utc.localize(datetime.utcnow()) - timedelta(2)
 
         mock_open_merge_requests.return_value = [
-            {
-                "work_in_progress": False,
-                "created_at": created_at.isoformat(),
-                "project_id": 1,
-                "author": {"id": 1},
-                "iid": 1,
-                "assignee": {"id": 1, "username": "test-user"},
-                "merge_status": "cannot_be_merged",
-            }
+            MergeRequest.from_json(
+                {
+                    "work_in_progress": False,
+                    "created_at": created_at.isoformat(),
+                    "project_id": 1,
+                    "author": {"id": 1},
+                    "iid": 1,
+                    "assignee": {"id": 1, "username": "test-user"},
+                    "merge_status": "cannot_be_merged",
+                }
+            )
         ]
 
         notify_stale_merge_request_assignees(cli_args, 5)
@@ -374,7 +451,7 @@ class TestTasks(unittest.TestCase):
     ):
         cli_args = {"ip_address": "localhost", "interval": 1, "token": "test"}
 
-        mock_get_all_projects.return_value = [{"id": 1}]
+        mock_get_all_projects.return_value = [Project.from_json({"id": 1})]
 
         mock_delete_merged_branches.side_effect = [{"message": "202 Accepted"}]
 
@@ -390,11 +467,17 @@ class TestTasks(unittest.TestCase):
     @mock.patch("gitlab_attendant.tasks.delete_merged_branches")
     @mock.patch("gitlab_attendant.tasks.get_all_projects")
     def test_remove_merged_branches_with_errors(
-        self, mock_get_all_projects, mock_delete_merged_branches, mock_log_error
+        self,
+        mock_get_all_projects,
+        mock_delete_merged_branches,
+        mock_log_error,
     ):
         cli_args = {"ip_address": "localhost", "interval": 1, "token": "test"}
 
-        mock_get_all_projects.return_value = [{"id": 1}, {"id": 2}]
+        mock_get_all_projects.return_value = [
+            Project.from_json({"id": 1}),
+            Project.from_json({"id": 2}),
+        ]
 
         mock_delete_merged_branches.side_effect = [
             {"message": "202 Accepted"},
@@ -408,6 +491,85 @@ class TestTasks(unittest.TestCase):
         self.assertEqual(mock_log_error.called, True)
         self.assertEqual(mock_log_error.call_count, 1)
 
+    @mock.patch("gitlab_attendant.tasks.logger.error")
+    @mock.patch("gitlab_attendant.tasks.delete_merged_branches")
+    @mock.patch("gitlab_attendant.tasks.get_all_projects")
+    def test_remove_merged_branches_parallel_summary(
+        self,
+        mock_get_all_projects,
+        mock_delete_merged_branches,
+        mock_log_error,
+    ):
+        cli_args = {
+            "ip_address": "localhost",
+            "interval": 1,
+            "token": "test",
+            "branch_workers": 4,
+        }
+
+        mock_get_all_projects.return_value = [
+            Project.from_json({"id": 1}),
+            Project.from_json({"id": 2}),
+            Project.from_json({"id": 3}),
+        ]
+
+        def delete_merged_branches(cli_args, project_id):
+            if project_id == 2:
+                raise KeyError("message")
+            return {"message": "202 Accepted"}
+
+        mock_delete_merged_branches.side_effect = delete_merged_branches
+
+        summary = remove_merged_branches(cli_args)
+
+        self.assertEqual(mock_delete_merged_branches.call_count, 3)
+        self.assertEqual(
+            summary,
+            {1: "202 Accepted", 2: "KeyError: 'message'", 3: "202 Accepted"},
+        )
+        self.assertEqual(mock_log_error.call_count, 1)
+
+    @mock.patch("gitlab_attendant.tasks.assign_issue")
+    @mock.patch("gitlab_attendant.tasks.get_all_project_members")
+    @mock.patch("gitlab_attendant.tasks.get_all_open_merge_requests")
+    @mock.patch("gitlab_attendant.tasks.get_all_open_issues")
+    def test_assign_project_members_to_streamed_issues(
+        self,
+        mock_all_open_issues,
+        mock_all_open_merge_requests,
+        mock_all_project_members,
+        mock_assign_issue,
+    ):
+        cli_args = {
+            "ip_address": "localhost",
+            "interval": 1,
+            "token": "test",
+            "stream_json": True,
+            "workload": WorkloadIndex(),
+        }
+
+        mock_all_open_issues.return_value = iter(
+            [
+                Issue.from_json({"id": 1, "iid": 1, "project_id": 1}),
+                Issue.from_json(
+                    {"id": 2, "iid": 2, "project_id": 1, "assignee": {"id": 1}}
+                ),
+            ]
+        )
+        mock_all_open_merge_requests.return_value = iter([])
+        mock_all_project_members.return_value = [
+            User.from_json({"id": 1}),
+            User.from_json({"id": 2}),
+        ]
+
+        assign_project_members_to_issues(cli_args)
+
+        # The one full listing of each dataset both counts the workload
+        # and supplies the issues to assign
+        mock_all_open_issues.assert_called_once_with(cli_args)
+        mock_all_open_merge_requests.assert_called_once_with(cli_args)
+        mock_assign_issue.assert_called_once_with(cli_args, 1, 1, 2)
+
     @mock.patch("gitlab_attendant.tasks.assign_issue")
     @mock.patch("gitlab_attendant.tasks.get_all_project_members")
     @mock.patch("gitlab_attendant.tasks.get_all_open_issues")
@@ -417,25 +579,29 @@ class TestTasks(unittest.TestCase):
         cli_args = {"ip_address": "localhost", "interval": 1, "token": "test"}
 
         mock_all_open_issues.return_value = [
-            {
-                "id": 1,
-                "iid": 1,
-                "project_id": 1,
-                "assignee": {"id": 1},
-                "assignees": [],
-            },
-            {
-                "id": 2,
-                "iid": 2,
-                "project_id": 1,
-                "assignee": None,
-                "assignees": [],
-            },
+            Issue.from_json(
+                {
+                    "id": 1,
+                    "iid": 1,
+                    "project_id": 1,
+                    "assignee": {"id": 1},
+                    "assignees": [],
+                }
+            ),
+            Issue.from_json(
+                {
+                    "id": 2,
+                    "iid": 2,
+                    "project_id": 1,
+                    "assignee": None,
+                    "assignees": [],
+                }
+            ),
         ]
 
         mock_all_project_members.return_value = [
-            {"id": 1, "iid": 1},
-            {"id": 2, "iid": 2},
+            User.from_json({"id": 1, "iid": 1}),
+            User.from_json({"id": 2, "iid": 2}),
         ]
 
         assign_project_members_to_issues(cli_args)
@@ -453,23 +619,29 @@ class TestTasks(unittest.TestCase):
         cli_args = {"ip_address": "localhost", "interval": 1, "token": "test"}
 
         mock_all_open_issues.return_value = [
-            {
-                "id": 1,
-                "iid": 1,
-                "project_id": 1,
-                "assignee": None,
-                "assignees": [{"id": 1}, {"id": 2}],
-            },
-            {
-                "id": 2,
-                "iid": 2,
-                "project_id": 1,
-                "assignee": None,
-                "assignees": [],
-            },
+            Issue.from_json(
+                {
+                    "id": 1,
+                    "iid": 1,
+                    "project_id": 1,
+                    "assignee": None,
+                    "assignees": [{"id": 1}, {"id": 2}],
+                }
+            ),
+            Issue.from_json(
+                {
+                    "id": 2,
+                    "iid": 2,
+                    "project_id": 1,
+                    "assignee": None,
+                    "assignees": [],
+                }
+            ),
         ]
 
-        mock_all_project_members.return_value = [{"id": 1, "iid": 1}]
+        mock_all_project_members.return_value = [
+            User.from_json({"id": 1, "iid": 1})
+        ]
 
         assign_project_members_to_issues(cli_args)
 
@@ -477,6 +649,66 @@ class TestTasks(unittest.TestCase):
         self.assertEqual(mock_assign_issue.call_count, 1)
         mock_assign_issue.assert_called_with(cli_args, 1, 2, 1)
 
+    @mock.patch("gitlab_attendant.tasks.assign_issue")
+    @mock.patch("gitlab_attendant.tasks.get_all_project_members")
+    @mock.patch("gitlab_attendant.tasks.get_all_open_merge_requests")
+    @mock.patch("gitlab_attendant.tasks.get_all_open_issues")
+    def test_assign_project_members_to_open_issues_least_loaded(
+        self,
+        mock_all_open_issues,
+        mock_all_open_merge_requests,
+        mock_all_project_members,
+        mock_assign_issue,
+    ):
+        cli_args = {
+            "ip_address": "localhost",
+            "interval": 1,
+            "token": "test",
+            "workload": WorkloadIndex(),
+        }
+        unassigned_issues = [
+            Issue.from_json({"id": iid, "iid": iid, "project_id": 1})
+            for iid in range(1, 4)
+        ]
+        assigned_issues = [
+            Issue.from_json(
+                {"id": 10, "iid": 10, "project_id": 2, "assignee": {"id": 1}}
+            )
+        ]
+
+        mock_all_open_issues.side_effect = lambda cli_args, assigned: (
+            assigned_issues if assigned else unassigned_issues
+        )
+        mock_all_open_merge_requests.return_value = [
+            MergeRequest.from_json(
+                {"id": 20, "iid": 20, "project_id": 2, "assignee": {"id": 2}}
+            )
+        ]
+        mock_all_project_members.return_value = [
+            User.from_json({"id": 1}),
+            User.from_json({"id": 2}),
+            User.from_json({"id": 3}),
+        ]
+
+        assign_project_members_to_issues(cli_args)
+
+        chosen = [call[0][3] for call in mock_assign_issue.call_args_list]
+
+        # The idle member goes first, then everyone is level, so the last
+        # two issues go to different members, whichever wins each tie
+        self.assertEqual(chosen[0], 3)
+        self.assertNotEqual(chosen[1], chosen[2])
+        self.assertEqual(
+            sorted(
+                cli_args["workload"].load_of(user_id) for user_id in (1, 2, 3)
+            ),
+            [1, 2, 2],
+        )
+        self.assertEqual(mock_all_open_merge_requests.call_count, 1)
+        mock_all_open_merge_requests.assert_called_with(
+            cli_args, assigned=True
+        )
+
     @mock.patch("gitlab_attendant.tasks.assign_issue")
     @mock.patch("gitlab_attendant.tasks.get_all_project_members")
     @mock.patch("gitlab_attendant.tasks.get_all_open_issues")
@@ -486,23 +718,29 @@ class TestTasks(unittest.TestCase):
         cli_args = {"ip_address": "localhost", "interval": 1, "token": "test"}
 
         mock_all_open_issues.return_value = [
-            {
-                "id": 1,
-                "iid": 1,
-                "project_id": 1,
-                "assignee": None,
-                "assignees": [{"id": 1}, {"id": 2}],
-            },
-            {
-                "id": 2,
-                "iid": 2,
-                "project_id": 1,
-                "assignee": {"id": 1},
-                "assignees": [],
-            },
+            Issue.from_json(
+                {
+                    "id": 1,
+                    "iid": 1,
+                    "project_id": 1,
+                    "assignee": None,
+                    "assignees": [{"id": 1}, {"id": 2}],
+                }
+            ),
+            Issue.from_json(
+                {
+                    "id": 2,
+                    "iid": 2,
+                    "project_id": 1,
+                    "assignee": {"id": 1},
+                    "assignees": [],
+                }
+            ),
         ]
 
-        mock_all_project_members.return_value = [{"id": 1, "iid": 1}]
+        mock_all_project_members.return_value = [
+            User.from_json({"id": 1, "iid": 1})
+        ]
 
         assign_project_members_to_issues(cli_args)
 
@@ -539,25 +777,29 @@ class TestTasks(unittest.TestCase):
         )
 
         mock_all_open_issues.return_value = [
-            {
-                "id": 1,
-                "iid": 1,
-                "project_id": 1,
-                "assignee": None,
-                "assignees": [
-                    {"id": 1, "username": "test-user"},
-                    {"id": 2, "username": "admin-user"},
-                ],
-                "due_date": due_date,
-            },
-            {
-                "id": 2,
-                "iid": 2,
-                "project_id": 1,
-                "assignee": {"id": 1, "username": "developer"},
-                "assignees": [],
-                "due_date": overdue_date,
-            },
+            Issue.from_json(
+                {
+                    "id": 1,
+                    "iid": 1,
+                    "project_id": 1,
+                    "assignee": None,
+                    "assignees": [
+                        {"id": 1, "username": "test-user"},
+                        {"id": 2, "username": "admin-user"},
+                    ],
+                    "due_date": due_date,
+                }
+            ),
+            Issue.from_json(
+                {
+                    "id": 2,
+                    "iid": 2,
+                    "project_id": 1,
+                    "assignee": {"id": 1, "username": "developer"},
+                    "assignees": [],
+                    "due_date": overdue_date,
+                }
+            ),
         ]
 
         cli_args = {"ip_address": "localhost", "interval": 1, "token": "test"}
@@ -599,22 +841,26 @@ class TestTasks(unittest.TestCase):
         )
 
         mock_all_open_issues.return_value = [
-            {
-                "id": 1,
-                "iid": 1,
-                "project_id": 1,
-                "assignee": None,
-                "assignees": [],
-                "due_date": due_date,
-            },
-            {
-                "id": 2,
-                "iid": 2,
-                "project_id": 1,
-                "assignee": None,
-                "assignees": [],
-                "due_date": overdue_date,
-            },
+            Issue.from_json(
+                {
+                    "id": 1,
+                    "iid": 1,
+                    "project_id": 1,
+                    "assignee": None,
+                    "assignees": [],
+                    "due_date": due_date,
+                }
+            ),
+            Issue.from_json(
+                {
+                    "id": 2,
+                    "iid": 2,
+                    "project_id": 1,
+                    "assignee": None,
+                    "assignees": [],
+                    "due_date": overdue_date,
+                }
+            ),
         ]
 
         cli_args = {"ip_address": "localhost", "interval": 1, "token": "test"}
@@ -637,22 +883,26 @@ class TestTasks(unittest.TestCase):
         )
 
         mock_all_open_issues.return_value = [
-            {
-                "id": 1,
-                "iid": 1,
-                "project_id": 1,
-                "assignee": {"id": 1, "username": "developer"},
-                "assignees": [],
-                "due_date": due_date,
-            },
-            {
-                "id": 2,
-                "iid": 2,
-                "project_id": 1,
-                "assignee": {"id": 2, "username": "tester"},
-                "assignees": [],
-                "due_date": overdue_date,
-            },
+            Issue.from_json(
+                {
+                    "id": 1,
+                    "iid": 1,
+                    "project_id": 1,
+                    "assignee": {"id": 1, "username": "developer"},
+                    "assignees": [],
+                    "due_date": due_date,
+                }
+            ),
+            Issue.from_json(
+                {
+                    "id": 2,
+                    "iid": 2,
+                    "project_id": 1,
+                    "assignee": {"id": 2, "username": "tester"},
+                    "assignees": [],
+                    "due_date": overdue_date,
+                }
+            ),
         ]
 
         cli_args = {"ip_address": "localhost", "interval": 1, "token": "test"}
@@ -695,28 +945,32 @@ class TestTasks(unittest.TestCase):
         )
 
         mock_all_open_issues.return_value = [
-            {
-                "id": 1,
-                "iid": 1,
-                "project_id": 1,
-                "assignee": None,
-                "assignees": [
-                    {"id": 1, "username": "developer"},
-                    {"id": 2, "username": "tester"},
-                ],
-                "due_date": due_date,
-            },
-            {
-                "id": 2,
-                "iid": 2,
-                "project_id": 1,
-                "assignee": None,
-                "assignees": [
-                    {"id": 3, "username": "test-user"},
-                    {"id": 4, "username": "admin-user"},
-                ],
-                "due_date": overdue_date,
-            },
+            Issue.from_json(
+                {
+                    "id": 1,
+                    "iid": 1,
+                    "project_id": 1,
+                    "assignee": None,
+                    "assignees": [
+                        {"id": 1, "username": "developer"},
+                        {"id": 2, "username": "tester"},
+                    ],
+                    "due_date": due_date,
+                }
+            ),
+            Issue.from_json(
+                {
+                    "id": 2,
+                    "iid": 2,
+                    "project_id": 1,
+                    "assignee": None,
+                    "assignees": [
+                        {"id": 3, "username": "test-user"},
+                        {"id": 4, "username": "admin-user"},
+                    ],
+                    "due_date": overdue_date,
+                }
+            ),
         ]
 
         cli_args = {"ip_address": "localhost", "interval": 1, "token": "test"}
@@ -756,17 +1010,19 @@ class TestTasks(unittest.TestCase):
         )
 
         mock_all_open_issues.return_value = [
-            {
-                "id": 1,
-                "iid": 1,
-                "project_id": 1,
-                "assignee": None,
-                "assignees": [
-                    {"id": 1, "username": "developer"},
-                    {"id": 2, "username": "tester"},
-                ],
-                "due_date": due_date,
-            }
+            Issue.from_json(
+                {
+                    "id": 1,
+                    "iid": 1,
+                    "project_id": 1,
+                    "assignee": None,
+                    "assignees": [
+                        {"id": 1, "username": "developer"},
+                        {"id": 2, "username": "tester"},
+                    ],
+                    "due_date": due_date,
+                }
+            )
         ]
 
         cli_args = {"ip_address": "localhost", "interval": 1, "token": "test"}
@@ -794,17 +1050,19 @@ class TestTasks(unittest.TestCase):
         )
 
         mock_all_open_issues.return_value = [
-            {
-                "id": 1,
-                "iid": 1,
-                "project_id": 1,
-                "assignee": None,
-                "assignees": [
-                    {"id": 1, "username": "developer"},
-                    {"id": 2, "username": "tester"},
-                ],
-                "due_date": due_date,
-            }
+            Issue.from_json(
+                {
+                    "id": 1,
+                    "iid": 1,
+                    "project_id": 1,
+                    "assignee": None,
+                    "assignees": [
+                        {"id": 1, "username": "developer"},
+                        {"id": 2, "username": "tester"},
+                    ],
+                    "due_date": due_date,
+                }
+            )
         ]
 
         cli_args = {"ip_address": "localhost", "interval": 1, "token": "test"}
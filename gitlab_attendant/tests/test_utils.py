@@ -0,0 +1,211 @@
+import mock
+import tempfile
+import unittest
+
+from gitlab_attendant.cache import ResponseCache
+
+from gitlab_attendant.utils import (
+    GitLabSession,
+    delete_request,
+    get_paginated_request,
+    get_request,
+    post_request,
+    put_request,
+    with_query_params,
+)
+
+
+class TestUtils(unittest.TestCase):
+    def test_gitlab_session_default_headers(self):
+        session = GitLabSession("test")
+
+        self.assertEqual(session.headers["Private-Token"], "test")
+
+    def test_gitlab_session_shares_pooled_adapter(self):
+        session = GitLabSession("test", pool_size=4)
+
+        http_adapter = session.get_adapter("http://localhost")
+        https_adapter = session.get_adapter("https://localhost")
+
+        self.assertIs(http_adapter, https_adapter)
+        self.assertEqual(http_adapter._pool_maxsize, 4)
+        self.assertEqual(http_adapter.max_retries.total, 5)
+
+    def test_requests_reuse_session(self):
+        session = mock.Mock()
+        session.get.return_value.json.return_value = []
+        session.put.return_value.json.return_value = {}
+        session.post.return_value.json.return_value = {}
+        session.delete.return_value.json.return_value = {}
+
+        get_request("http://localhost/api/v4/projects", session)
+        put_request("http://localhost/api/v4/projects/1", session, {})
+        post_request("http://localhost/api/v4/projects/1", session, {})
+        delete_request("http://localhost/api/v4/projects/1", session)
+
+        session.get.assert_called_once_with(
+            "http://localhost/api/v4/projects", headers={}
+        )
+        session.put.assert_called_once_with(
+            "http://localhost/api/v4/projects/1", data={}
+        )
+        session.post.assert_called_once_with(
+            "http://localhost/api/v4/projects/1", data={}
+        )
+        session.delete.assert_called_once_with(
+            "http://localhost/api/v4/projects/1"
+        )
+
+    def test_with_query_params(self):
+        self.assertEqual(
+            with_query_params(
+                "http://localhost/api/v4/issues?state=opened&page=1",
+                {"page": 2, "per_page": 100},
+            ),
+            "http://localhost/api/v4/issues?state=opened&page=2&per_page=100",
+        )
+
+    def test_get_paginated_request_follows_link_header(self):
+        first_page = mock.Mock(
+            headers={"Link": '<http://localhost/next>; rel="next"'}
+        )
+        first_page.json.return_value = [{"id": 1}, {"id": 2}]
+        second_page = mock.Mock(headers={"X-Next-Page": ""})
+        second_page.json.return_value = [{"id": 3}]
+
+        session = mock.Mock()
+        session.get.side_effect = [first_page, second_page]
+
+        items = get_paginated_request(
+            "http://localhost/api/v4/projects", session
+        )
+
+        self.assertEqual(next(items), {"id": 1})
+        self.assertEqual(session.get.call_count, 1)
+        self.assertEqual(list(items), [{"id": 2}, {"id": 3}])
+        session.get.assert_has_calls(
+            [
+                mock.call(
+                    "http://localhost/api/v4/projects?per_page=100",
+                    headers={},
+                ),
+                mock.call("http://localhost/next", headers={}),
+            ]
+        )
+
+    def test_get_paginated_request_follows_next_page_header(self):
+        first_page = mock.Mock(headers={"X-Next-Page": "2"})
+        first_page.json.return_value = [{"id": 1}]
+        second_page = mock.Mock(headers={"X-Next-Page": ""})
+        second_page.json.return_value = [{"id": 2}]
+
+        session = mock.Mock()
+        session.get.side_effect = [first_page, second_page]
+
+        items = list(
+            get_paginated_request(
+                "http://localhost/api/v4/issues?state=opened", session
+            )
+        )
+
+        self.assertEqual(items, [{"id": 1}, {"id": 2}])
+        session.get.assert_called_with(
+            "http://localhost/api/v4/issues?state=opened&per_page=100&page=2",
+            headers={},
+        )
+
+    def test_get_paginated_request_streams_items(self):
+        first_page = mock.MagicMock(ok=True, headers={"X-Next-Page": "2"})
+        first_page.iter_content.return_value = [b'[{"id": 1}, {"i', b'd": 2}]']
+        second_page = mock.MagicMock(ok=True, headers={"X-Next-Page": ""})
+        second_page.iter_content.return_value = [b'[{"id": 3}]']
+
+        session = mock.Mock()
+        session.get.side_effect = [first_page, second_page]
+
+        items = get_paginated_request(
+            "http://localhost/api/v4/issues", session, stream=True
+        )
+
+        self.assertEqual(list(items), [{"id": 1}, {"id": 2}, {"id": 3}])
+        session.get.assert_called_with(
+            "http://localhost/api/v4/issues?per_page=100&page=2",
+            headers={},
+            stream=True,
+        )
+        self.assertEqual(first_page.json.called, False)
+
+    def test_get_request_revalidates_cached_response(self):
+        modified = mock.Mock(
+            status_code=200, headers={"ETag": 'W/"1"'}, text='[{"id": 1}]'
+        )
+        modified.json.return_value = [{"id": 1}]
+        not_modified = mock.Mock(status_code=304, headers={})
+
+        session = mock.Mock()
+        session.get.side_effect = [modified, not_modified]
+
+        with tempfile.TemporaryDirectory() as directory:
+            response_cache = ResponseCache(directory)
+
+            first = get_request(
+                "http://localhost/api/v4/projects", session, response_cache
+            )
+            second = get_request(
+                "http://localhost/api/v4/projects", session, response_cache
+            )
+
+            # A fresh cache must decode the body stored on disk
+            restored = ResponseCache(directory).body(
+                "http://localhost/api/v4/projects",
+                response_cache.lookup("http://localhost/api/v4/projects"),
+            )
+
+        self.assertEqual(first, [{"id": 1}])
+        self.assertIs(second, first)
+        self.assertEqual(restored, [{"id": 1}])
+        session.get.assert_called_with(
+            "http://localhost/api/v4/projects",
+            headers={"If-None-Match": 'W/"1"'},
+        )
+        self.assertEqual(not_modified.json.called, False)
+
+    def test_get_paginated_request_follows_cached_pagination(self):
+        first_page = mock.Mock(
+            status_code=200,
+            headers={"ETag": '"a"', "X-Next-Page": "2"},
+            text='[{"id": 1}]',
+        )
+        first_page.json.return_value = [{"id": 1}]
+        second_page = mock.Mock(
+            status_code=200, headers={"X-Next-Page": ""}, text='[{"id": 2}]'
+        )
+        second_page.json.return_value = [{"id": 2}]
+        not_modified = mock.Mock(status_code=304, headers={})
+
+        session = mock.Mock()
+        session.get.side_effect = [
+            first_page,
+            second_page,
+            not_modified,
+            second_page,
+        ]
+
+        with tempfile.TemporaryDirectory() as directory:
+            response_cache = ResponseCache(directory)
+            url = "http://localhost/api/v4/projects"
+
+            first_run = list(
+                get_paginated_request(
+                    url, session, response_cache=response_cache
+                )
+            )
+            second_run = list(
+                get_paginated_request(
+                    url, session, response_cache=response_cache
+                )
+            )
+
+        self.assertEqual(first_run, [{"id": 1}, {"id": 2}])
+        self.assertEqual(second_run, [{"id": 1}, {"id": 2}])
+        self.assertEqual(session.get.call_count, 4)
@@ -0,0 +1,166 @@
+import json
+import mock
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+from datetime import datetime, timedelta
+
+from gitlab_attendant.records import MergeRequest
+from gitlab_attendant.webhooks import (
+    TASK_FOR_KIND,
+    WebhookReceiver,
+    event_key,
+)
+
+
+def merge_request(created_at: datetime, **fields) -> MergeRequest:
+    return MergeRequest.from_json(
+        {
+            "id": 1,
+            "iid": 2,
+            "project_id": 3,
+            "state": "opened",
+            "work_in_progress": False,
+            "created_at": created_at.isoformat() + "Z",
+            "author": {"id": 4},
+            "assignee": None,
+            **fields,
+        }
+    )
+
+
+class TestWebhooks(unittest.TestCase):
+    def setUp(self):
+        self.receiver = WebhookReceiver(
+            {
+                "token": "token",
+                "task_locks": {
+                    task_name: threading.Lock()
+                    for task_name in TASK_FOR_KIND.values()
+                },
+            },
+            "127.0.0.1",
+            0,
+            "secret",
+        )
+
+    def tearDown(self):
+        self.receiver._server.server_close()
+        self.receiver._session.close()
+
+    def post(self, payload: dict, event: str, token: str = "secret"):
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{self.receiver.port}/",
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"X-Gitlab-Event": event, "X-Gitlab-Token": token},
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as ex:
+            return ex.code, json.loads(ex.read())
+
+    def test_event_keys(self):
+        self.assertEqual(
+            event_key(
+                "Merge Request Hook",
+                {
+                    "object_attributes": {
+                        "target_project_id": 3,
+                        "iid": 2,
+                        "state": "opened",
+                    }
+                },
+            ),
+            ("merge_request", 3, 2),
+        )
+        self.assertEqual(
+            event_key(
+                "Issue Hook",
+                {
+                    "object_attributes": {
+                        "project_id": 3,
+                        "iid": 5,
+                        "state": "closed",
+                    }
+                },
+            ),
+            None,
+        )
+        push = {
+            "project_id": 3,
+            "ref": "refs/heads/main",
+            "project": {"default_branch": "main"},
+        }
+        self.assertEqual(event_key("Push Hook", push), ("merged_branches", 3))
+        self.assertEqual(
+            event_key("Push Hook", {**push, "ref": "refs/heads/feature"}),
+            None,
+        )
+
+    def test_receiver_checks_token_and_queues_events(self):
+        threading.Thread(
+            target=self.receiver._server.serve_forever, daemon=True
+        ).start()
+        payload = {
+            "object_attributes": {"project_id": 3, "iid": 5, "state": "opened"}
+        }
+
+        try:
+            rejected = self.post(payload, "Issue Hook", token="wrong")
+            queued = self.post(payload, "Issue Hook")
+            ignored = self.post(payload, "Pipeline Hook")
+        finally:
+            self.receiver._server.shutdown()
+
+        self.assertEqual(rejected, (401, {"status": "invalid token"}))
+        self.assertEqual(queued, (202, {"status": "queued"}))
+        self.assertEqual(ignored, (202, {"status": "ignored"}))
+        self.assertEqual(list(self.receiver._pending), [("issue", 3, 5)])
+
+    def test_schedule_keeps_earliest_time(self):
+        self.receiver.schedule(("merged_branches", 3), 60)
+        due = self.receiver._pending[("merged_branches", 3)]
+        self.receiver.schedule(("merged_branches", 3), 120)
+
+        self.assertEqual(self.receiver._pending[("merged_branches", 3)], due)
+
+    @mock.patch("gitlab_attendant.webhooks.assign_merge_request")
+    @mock.patch("gitlab_attendant.webhooks.get_merge_request")
+    def test_new_merge_request_checked_again_when_due(
+        self, mock_get_merge_request, mock_assign_merge_request
+    ):
+        mock_get_merge_request.return_value = merge_request(
+            datetime.utcnow() - timedelta(hours=23)
+        )
+
+        delay = self.receiver.process(("merge_request", 3, 2))
+
+        self.assertAlmostEqual(delay, 3600, delta=60)
+        self.assertEqual(mock_assign_merge_request.called, False)
+
+    @mock.patch("gitlab_attendant.webhooks.assign_merge_request")
+    @mock.patch("gitlab_attendant.webhooks.get_merge_request")
+    def test_due_merge_request_assigned(
+        self, mock_get_merge_request, mock_assign_merge_request
+    ):
+        mock_get_merge_request.return_value = merge_request(
+            datetime.utcnow() - timedelta(days=2)
+        )
+
+        self.assertIsNone(self.receiver.process(("merge_request", 3, 2)))
+        self.assertEqual(mock_assign_merge_request.call_count, 1)
+
+    @mock.patch("gitlab_attendant.webhooks.assign_merge_request")
+    @mock.patch("gitlab_attendant.webhooks.get_merge_request")
+    def test_assigned_merge_request_ignored(
+        self, mock_get_merge_request, mock_assign_merge_request
+    ):
+        mock_get_merge_request.return_value = merge_request(
+            datetime.utcnow() - timedelta(hours=1), assignee={"id": 5}
+        )
+
+        self.assertIsNone(self.receiver.process(("merge_request", 3, 2)))
+        self.assertEqual(mock_assign_merge_request.called, False)
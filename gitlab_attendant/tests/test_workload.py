@@ -0,0 +1,85 @@
+import unittest
+
+from gitlab_attendant.records import Issue, MergeRequest, User
+from gitlab_attendant.workload import WorkloadIndex
+
+
+class TestWorkload(unittest.TestCase):
+    def test_load_counts_each_assignee_once_per_record(self):
+        workload = WorkloadIndex()
+
+        workload.load(
+            [
+                Issue.from_json(
+                    {
+                        "id": 1,
+                        "assignee": {"id": 1},
+                        "assignees": [{"id": 1}, {"id": 2}],
+                    }
+                ),
+                MergeRequest.from_json({"id": 2, "assignee": {"id": 1}}),
+            ]
+        )
+
+        self.assertEqual(workload.loaded, True)
+        self.assertEqual(
+            [workload.load_of(user_id) for user_id in (1, 2, 3)], [2, 1, 0]
+        )
+
+    def test_load_returns_unassigned_records(self):
+        workload = WorkloadIndex()
+        unassigned = Issue.from_json({"id": 2})
+
+        self.assertEqual(
+            workload.load(
+                [Issue.from_json({"id": 1, "assignee": {"id": 1}}), unassigned]
+            ),
+            [unassigned],
+        )
+        self.assertEqual(workload.load_of(1), 1)
+
+    def test_least_loaded_member_is_chosen(self):
+        workload = WorkloadIndex()
+        workload.load(
+            [
+                Issue.from_json({"id": 1, "assignee": {"id": 1}}),
+                Issue.from_json({"id": 2, "assignee": {"id": 1}}),
+                Issue.from_json({"id": 3, "assignee": {"id": 2}}),
+            ]
+        )
+        members = [User(1, "first"), User(2, "second"), User(3, "third")]
+
+        chosen = [workload.choose(1, members) for _ in range(6)]
+
+        # Idle members catch up before work is shared out evenly
+        self.assertEqual(chosen[0], 3)
+        self.assertEqual(sorted(chosen[1:3]), [2, 3])
+        self.assertEqual(sorted(chosen[3:]), [1, 2, 3])
+        self.assertEqual(
+            [workload.load_of(user_id) for user_id in (1, 2, 3)], [3, 3, 3]
+        )
+
+    def test_excluded_member_is_skipped_but_kept(self):
+        workload = WorkloadIndex()
+        members = [User(1, "author"), User(2, "reviewer")]
+
+        self.assertEqual(workload.choose(1, members, exclude=1), 2)
+        self.assertEqual(workload.choose(1, members, exclude=1), 2)
+        self.assertEqual(workload.choose(1, members), 1)
+        self.assertEqual(workload.choose(2, [User(1, "author")], 1), None)
+
+    def test_load_is_shared_between_projects(self):
+        workload = WorkloadIndex()
+        first_project = [User(1, "shared"), User(2, "first")]
+        second_project = [User(1, "shared"), User(3, "second")]
+        workload.choose(2, second_project)
+
+        # Work in one project counts against a member in every project
+        for _ in range(3):
+            workload.choose(3, [User(1, "shared")])
+
+        self.assertEqual(workload.choose(2, second_project), 3)
+        self.assertEqual(workload.choose(1, first_project), 2)
+
+    def test_no_members(self):
+        self.assertEqual(WorkloadIndex().choose(1, []), None)
@@ -1,123 +1,458 @@
 import requests
-import sys
-import traceback
+import time
+
+from typing import Iterator, Mapping, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 from requests.packages.urllib3.util.retry import Retry
 from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import parse_header_links
+
+from gitlab_attendant.cache import ResponseCache
+from gitlab_attendant.errors import ErrorReport
+from gitlab_attendant.governor import RateLimitGovernor
+from gitlab_attendant.log_handlers import log_body, logger
+from gitlab_attendant.metrics import MetricsRegistry, endpoint_template
+from gitlab_attendant.planner import RunPlan
+
+# Stream list responses item by item when ijson is installed
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
-from gitlab_attendant.log_handlers import logger
+# Bytes of a streamed response body read from the connection at once
+STREAM_CHUNK_SIZE = 64 * 1024
 
 
-def get_request(request_url: str, token: str) -> dict:
+class GitLabSession(requests.Session):
     """
-    Wrapper for HTTP GET requests.
+    Long-lived HTTP client shared by every GitLab API call in a run,
+    keeping connections alive in a pool and sending the access token
+    with each request.
     """
 
-    session = requests.Session()
+    def __init__(
+        self,
+        token: str,
+        pool_size: int = 10,
+        max_retries: int = 5,
+        governor: Optional[RateLimitGovernor] = None,
+        max_rate_limit_retries: int = 10,
+        error_report: Optional[ErrorReport] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        plan: Optional[RunPlan] = None,
+    ):
+        super().__init__()
+
+        self.governor = governor
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self.error_report = error_report
+        self.metrics = metrics
+        self.plan = plan
+
+        # Define the maximum number of retries and the time between each one.
+        # Server errors are only retried for idempotent methods (GET, PUT
+        # and DELETE), so a note is never posted twice. Rate limited
+        # responses are left to the governor, which shares the pause with
+        # every other request
+        retries = Retry(
+            total=max_retries,
+            backoff_factor=0.1,
+            status_forcelist=(500, 502, 503, 504),
+            raise_on_status=False,
+            respect_retry_after_header=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=retries,
+        )
+
+        # Mount both HTTP and HTTPS protocols
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+        self.headers.update({"Private-Token": token})
+
+    def request(self, method, url, *args, **kwargs) -> requests.Response:
+        """
+        Sends every request through the rate limit governor, if there is
+        one, waiting and retrying when GitLab rejects it as rate limited.
+        """
+
+        if self.governor is None:
+            return self._send(method, url, *args, **kwargs)
+
+        for _ in range(self.max_rate_limit_retries):
+            self.governor.acquire()
+            response = self._send(method, url, *args, **kwargs)
+            delay = self.governor.observe(response)
+            if delay is None:
+                return response
+            logger.info(
+                f"Rate limited by GitLab, retrying {method} request to {url} in {delay:.1f} seconds..."
+            )
+            # Hand a streamed response's connection back to the pool
+            response.close()
+
+        return response
+
+    def _send(self, method, url, *args, **kwargs) -> requests.Response:
+        """
+        Sends a request, recording its latency and outcome in the metrics
+        registry and its size in the dry run plan, if there are any.
+        """
+
+        if self.plan is not None and method.upper() != "GET":
+            raise RuntimeError(
+                f"{method} request to {url} attempted during a dry run"
+            )
+        if self.metrics is None and self.plan is None:
+            return super().request(method, url, *args, **kwargs)
+
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.exceptions.RequestException:
+            if self.metrics is not None:
+                self.metrics.observe_request(
+                    method, url, time.perf_counter() - start, None
+                )
+            raise
 
-    # Define the maximum number of retries and the time between each one
-    retries = Retry(total=5, backoff_factor=0.1)
+        if self.metrics is not None:
+            self.metrics.observe_request(
+                method, url, time.perf_counter() - start, response.status_code
+            )
+        if self.plan is not None:
+            # Reading a streamed body to size it would defeat streaming, so
+            # its Content-Length is taken instead
+            self.plan.record_request(
+                method,
+                url,
+                len(response.request.body or b""),
+                (
+                    int(response.headers.get("Content-Length", 0))
+                    if kwargs.get("stream")
+                    else len(response.content)
+                ),
+            )
+        return response
 
-    # Mount both HTTP and HTTPS protocols
-    session.mount("http://", HTTPAdapter(max_retries=retries))
-    session.mount("https://", HTTPAdapter(max_retries=retries))
 
+def with_query_params(request_url: str, params: dict) -> str:
+    """
+    Returns the given URL with the query parameters added, replacing any
+    parameters of the same name that are already present.
+    """
+
+    scheme, netloc, path, query, fragment = urlsplit(request_url)
+    query_params = dict(parse_qsl(query))
+    query_params.update(params)
+    return urlunsplit(
+        (scheme, netloc, path, urlencode(query_params), fragment)
+    )
+
+
+def _report_failure(
+    session: requests.Session,
+    caller: Optional[str],
+    method: str,
+    request_url: str,
+    ex: requests.exceptions.RequestException,
+):
+    """
+    Logs a failed request and records it in the session's error report,
+    leaving the caller to carry on with its remaining work. Requests made
+    without a caller's name are reported by method and endpoint.
+    """
+
+    caller = caller or f"{method} {endpoint_template(request_url)}"
+
+    logger.error(
+        f"{caller} call to GitLab API failed with RequestException: {ex}"
+    )
+
+    error_report = getattr(session, "error_report", None)
+    if error_report is not None:
+        response = getattr(ex, "response", None)
+        error_report.record(
+            caller,
+            str(ex),
+            method=method,
+            request_url=request_url,
+            status_code=response.status_code if response is not None else None,
+        )
+
+
+def _stream_items(
+    request_url: str,
+    session: requests.Session,
+    response: requests.Response,
+    caller: Optional[str] = None,
+) -> Iterator[dict]:
+    """
+    Lazily decodes the items of a JSON list response as its body arrives,
+    so only a chunk of the body and the items in it are held at once.
+    Returns False once the items have been yielded if the body couldn't
+    be read in full.
+    """
+
+    items = ijson.sendable_list()
+    decoder = ijson.items_coro(items, "item", use_float=True)
     try:
-        logger.debug(f"Making GET request to {request_url}...")
-        response = session.get(request_url, headers={"Private-Token": token})
-        logger.debug(
-            f"Response status code from GET request to {request_url}: {response.status_code}"
+        with response:
+            for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                decoder.send(chunk)
+                yield from items
+                del items[:]
+            decoder.close()
+            yield from items
+    except (requests.exceptions.RequestException, ijson.JSONError) as ex:
+        _report_failure(
+            session,
+            caller,
+            "GET",
+            request_url,
+            ex,
         )
+        return False
+    return True
+
+
+def _get_json(
+    request_url: str,
+    session: requests.Session,
+    response_cache: Optional[ResponseCache] = None,
+    stream: bool = False,
+    caller: Optional[str] = None,
+) -> Tuple[object, Mapping]:
+    """
+    Makes a HTTP GET request and returns the decoded body and headers,
+    or None and no headers if it failed. With a response cache the
+    request is made conditional on the cached ETag, and an unchanged
+    response is served from the cache instead. When streamed, the body
+    is instead an iterator decoding a list response as it's read.
+    """
+
+    cached = response_cache.lookup(request_url) if response_cache else None
+    headers = {"If-None-Match": cached["etag"]} if cached else {}
+    # A cached response keeps its whole body, so it can't be streamed
+    stream = stream and ijson is not None and response_cache is None
+
+    try:
+        logger.debug("Making GET request to %s...", request_url)
+        if stream:
+            response = session.get(request_url, headers=headers, stream=True)
+        else:
+            response = session.get(request_url, headers=headers)
         logger.debug(
-            f"Response body from GET request to {request_url}: {response.json()}"
+            "Response status code from GET request to %s: %s",
+            request_url,
+            response.status_code,
         )
+        if cached and response.status_code == 304:
+            return (
+                response_cache.body(request_url, cached),
+                CaseInsensitiveDict(cached["headers"]),
+            )
+        if stream:
+            if not response.ok:
+                response.close()
+            response.raise_for_status()
+            return (
+                _stream_items(request_url, session, response, caller),
+                response.headers,
+            )
+        body = response.json()
+        log_body("Response body from GET request to %s: %s", request_url, body)
         response.raise_for_status()
     except requests.exceptions.RequestException as ex:
-        logger.error(
-            f"{traceback.extract_stack(None, 2)[0][2]} call to GitLab API failed with RequestException: {ex}"
+        _report_failure(
+            session,
+            caller,
+            "GET",
+            request_url,
+            ex,
+        )
+        return None, {}
+
+    if response_cache and response.headers.get("ETag"):
+        response_cache.store(request_url, response, body)
+
+    return body, response.headers
+
+
+def get_request(
+    request_url: str,
+    session: requests.Session,
+    response_cache: Optional[ResponseCache] = None,
+    caller: Optional[str] = None,
+) -> Optional[dict]:
+    """
+    Wrapper for HTTP GET requests.
+    """
+
+    return _get_json(request_url, session, response_cache, caller=caller)[0]
+
+
+def get_paginated_request(
+    request_url: str,
+    session: requests.Session,
+    per_page: int = 100,
+    response_cache: Optional[ResponseCache] = None,
+    stream: bool = False,
+    caller: Optional[str] = None,
+) -> Iterator[dict]:
+    """
+    Wrapper for HTTP GET requests to list endpoints. Follows GitLab's
+    pagination headers and lazily yields items one page at a time, or
+    item by item as each page is read when streamed.
+    """
+
+    next_url = with_query_params(request_url, {"per_page": per_page})
+
+    while next_url:
+        body, headers = _get_json(
+            next_url, session, response_cache, stream, caller
         )
-        sys.exit(1)
+        if body is None:
+            return
+        # A streamed page that broke off part way ends the listing, as a
+        # page that failed outright does
+        if (yield from body) is False:
+            return
 
-    return response.json()
+        # Prefer the Link header, falling back to X-Next-Page
+        next_url = next(
+            (
+                link["url"]
+                for link in parse_header_links(headers.get("Link", ""))
+                if link.get("rel") == "next"
+            ),
+            None,
+        )
+        if not next_url and headers.get("X-Next-Page"):
+            next_url = with_query_params(
+                request_url,
+                {"per_page": per_page, "page": headers["X-Next-Page"]},
+            )
 
 
-def put_request(request_url: str, token: str, body: dict) -> dict:
+def put_request(
+    request_url: str,
+    session: requests.Session,
+    body: dict,
+    caller: Optional[str] = None,
+) -> Optional[dict]:
     """
     Wrapper for HTTP PUT requests.
     """
 
     try:
-        logger.debug(
-            f"Making PUT request to {request_url} with payload: {body}..."
-        )
-        response = requests.put(
-            request_url, headers={"Private-Token": token}, data=body
+        log_body(
+            "Making PUT request to %s with payload: %s...", request_url, body
         )
+        response = session.put(request_url, data=body)
         logger.debug(
-            f"Response status code from PUT request to {request_url}: {response.status_code}"
+            "Response status code from PUT request to %s: %s",
+            request_url,
+            response.status_code,
         )
-        logger.debug(
-            f"Response body from PUT request to {request_url}: {response.json()}"
+        response_body = response.json()
+        log_body(
+            "Response body from PUT request to %s: %s",
+            request_url,
+            response_body,
         )
         response.raise_for_status()
     except requests.exceptions.RequestException as ex:
-        logger.error(
-            f"{traceback.extract_stack(None, 2)[0][2]} call to GitLab API failed with RequestException: {ex}"
+        _report_failure(
+            session,
+            caller,
+            "PUT",
+            request_url,
+            ex,
         )
-        sys.exit(1)
+        return None
 
-    return response.json()
+    return response_body
 
 
-def post_request(request_url: str, token: str, body: dict) -> dict:
+def post_request(
+    request_url: str,
+    session: requests.Session,
+    body: dict,
+    caller: Optional[str] = None,
+) -> Optional[dict]:
     """
     Wrapper for HTTP POST requests.
     """
 
     try:
-        logger.debug(
-            f"Making POST request to {request_url} with payload: {body}..."
-        )
-        response = requests.post(
-            request_url, headers={"Private-Token": token}, data=body
+        log_body(
+            "Making POST request to %s with payload: %s...", request_url, body
         )
+        response = session.post(request_url, data=body)
         logger.debug(
-            f"Response status code from POST request to {request_url}: {response.status_code}"
+            "Response status code from POST request to %s: %s",
+            request_url,
+            response.status_code,
         )
-        logger.debug(
-            f"Response body from POST request to {request_url}: {response.json()}"
+        response_body = response.json()
+        log_body(
+            "Response body from POST request to %s: %s",
+            request_url,
+            response_body,
         )
         response.raise_for_status()
     except requests.exceptions.RequestException as ex:
-        logger.error(
-            f"{traceback.extract_stack(None, 2)[0][2]} call to GitLab API failed with RequestException: {ex}"
+        _report_failure(
+            session,
+            caller,
+            "POST",
+            request_url,
+            ex,
         )
-        sys.exit(1)
+        return None
 
-    return response.json()
+    return response_body
 
 
-def delete_request(request_url: str, token: str) -> dict:
+def delete_request(
+    request_url: str,
+    session: requests.Session,
+    caller: Optional[str] = None,
+) -> Optional[dict]:
     """
     Wrapper for HTTP DELETE requests.
     """
 
     try:
-        logger.debug(f"Making DELETE request to {request_url}...")
-        response = requests.delete(
-            request_url, headers={"Private-Token": token}
-        )
+        logger.debug("Making DELETE request to %s...", request_url)
+        response = session.delete(request_url)
         logger.debug(
-            f"Response status code from DELETE request to {request_url}: {response.status_code}"
+            "Response status code from DELETE request to %s: %s",
+            request_url,
+            response.status_code,
         )
-        logger.debug(
-            f"Response body from DELETE request to {request_url}: {response.json()}"
+        response_body = response.json()
+        log_body(
+            "Response body from DELETE request to %s: %s",
+            request_url,
+            response_body,
         )
         response.raise_for_status()
     except requests.exceptions.RequestException as ex:
-        logger.error(
-            f"{traceback.extract_stack(None, 2)[0][2]} call to GitLab API failed with RequestException: {ex}"
+        _report_failure(
+            session,
+            caller,
+            "DELETE",
+            request_url,
+            ex,
         )
-        sys.exit(1)
+        return None
 
-    return response.json()
+    return response_body
@@ -0,0 +1,263 @@
+import hmac
+import json
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import Optional, Tuple
+
+from gitlab_attendant.api_calls import (
+    delete_merged_branches,
+    get_issue,
+    get_merge_request,
+)
+from gitlab_attendant.errors import ErrorReport
+from gitlab_attendant.log_handlers import logger
+from gitlab_attendant.metrics import task_label
+from gitlab_attendant.sharding import owns_project
+from gitlab_attendant.tasks import (
+    assign_merge_request,
+    assign_project_member_to_issue,
+    branch_removal_message,
+    merge_request_assignment_delay,
+)
+from gitlab_attendant.utils import GitLabSession
+
+# Largest webhook body accepted, GitLab's push payloads list commits
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+# Pushes often arrive in bursts, so merged branches are removed once
+# the pushes to a project have settled
+PUSH_SETTLE_SECONDS = 60
+
+# The scheduled task that handles each kind of object
+TASK_FOR_KIND = {
+    "issue": "assign_project_members_to_issues",
+    "merge_request": "assign_open_merge_requests",
+    "merged_branches": "remove_merged_branches",
+}
+
+
+def event_key(event: str, payload: dict) -> Optional[Tuple]:
+    """
+    Returns the object a webhook is about, as a key that identifies the
+    work to be done, or None if there is nothing to do for it.
+    """
+
+    if event in ("Issue Hook", "Confidential Issue Hook"):
+        issue = payload["object_attributes"]
+        if issue.get("state") == "opened":
+            return ("issue", issue["project_id"], issue["iid"])
+    elif event == "Merge Request Hook":
+        merge_request = payload["object_attributes"]
+        if merge_request.get("state") == "opened":
+            return (
+                "merge_request",
+                merge_request["target_project_id"],
+                merge_request["iid"],
+            )
+    elif event == "Push Hook":
+        default_branch = payload.get("project", {}).get("default_branch")
+        if default_branch and payload.get("ref") == (
+            f"refs/heads/{default_branch}"
+        ):
+            return ("merged_branches", payload["project_id"])
+    return None
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class WebhookReceiver:
+    """
+    Receives GitLab issue, merge request and push webhooks, and applies
+    the scheduled tasks' logic to just the object each one is about on a
+    worker thread. Merge requests that aren't yet due an assignee are
+    checked again once they are, while the scheduled sweep remains the
+    safety net for anything missed.
+    """
+
+    def __init__(
+        self,
+        cli_args: dict,
+        host: str,
+        port: int,
+        secret: Optional[str] = None,
+    ):
+        self.cli_args = cli_args
+        self.secret = secret
+        self._pending = {}
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._server = _ThreadingHTTPServer((host, port), self._handler())
+        self._session = GitLabSession(
+            cli_args["token"],
+            governor=cli_args.get("governor"),
+            metrics=cli_args.get("metrics"),
+        )
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> "WebhookReceiver":
+        for target in (self._server.serve_forever, self._work):
+            threading.Thread(target=target, daemon=True).start()
+        logger.info(f"Receiving GitLab webhooks on port {self.port}...")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._session.close()
+
+    def submit(self, event: str, payload: dict) -> bool:
+        """
+        Queues the work for a webhook, returning whether there is any.
+        """
+
+        metrics = self.cli_args.get("metrics")
+        if metrics is not None:
+            metrics.inc("webhook_events_total", {"event": event})
+
+        key = event_key(event, payload)
+        if key is None:
+            return False
+        enabled_tasks = self.cli_args.get("enabled_tasks")
+        if enabled_tasks is not None and (
+            TASK_FOR_KIND[key[0]] not in enabled_tasks
+        ):
+            return False
+        # Objects in another replica's shard are left to that replica
+        if not owns_project(self.cli_args, key[1]):
+            return False
+        self.schedule(
+            key, PUSH_SETTLE_SECONDS if key[0] == "merged_branches" else 0
+        )
+        return True
+
+    def schedule(self, key: Tuple, delay: float):
+        """
+        Queues work on an object after the given number of seconds. Work
+        already queued for the same object is done once, at the earlier
+        of the two times.
+        """
+
+        due = time.monotonic() + delay
+        with self._condition:
+            if key not in self._pending or due < self._pending[key]:
+                self._pending[key] = due
+                self._condition.notify()
+
+    def process(self, key: Tuple) -> Optional[float]:
+        """
+        Acts on the object a webhook was about, returning the number of
+        seconds after which to check it again, if it should be.
+        """
+
+        run_args = {
+            **self.cli_args,
+            "session": self._session,
+            "error_report": ErrorReport(),
+        }
+        kind, project_id = key[:2]
+
+        if kind == "merge_request":
+            merge_request = get_merge_request(run_args, project_id, key[2])
+            if merge_request is None:
+                return None
+            delay = merge_request_assignment_delay(merge_request)
+            if delay is None:
+                return None
+            if delay.total_seconds() > 0:
+                return delay.total_seconds()
+            assign_merge_request(run_args, merge_request)
+        elif kind == "issue":
+            issue = get_issue(run_args, project_id, key[2])
+            if issue is not None:
+                assign_project_member_to_issue(run_args, issue)
+        elif kind == "merged_branches":
+            logger.info(
+                f"Merged branch removal for project {project_id}: "
+                + branch_removal_message(
+                    delete_merged_branches(run_args, project_id)
+                ),
+                extra={"project_id": project_id},
+            )
+        return None
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    now = time.monotonic()
+                    key, due = min(
+                        self._pending.items(),
+                        key=lambda item: item[1],
+                        default=(None, None),
+                    )
+                    if key is not None and due <= now:
+                        del self._pending[key]
+                        break
+                    self._condition.wait(None if key is None else due - now)
+                if self._stopped:
+                    return
+
+            # Objects are handled one at a time, and never while the task
+            # that would otherwise handle them is running
+            task_name = TASK_FOR_KIND[key[0]]
+            try:
+                with self.cli_args["task_locks"][task_name], task_label(
+                    task_name
+                ):
+                    delay = self.process(key)
+            except Exception as ex:
+                logger.error(f"Failed to handle webhook for {key}: {ex}")
+                continue
+            if delay is not None:
+                self.schedule(key, delay)
+
+    def _handler(self):
+        receiver = self
+
+        class WebhookHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if receiver.secret is not None and not hmac.compare_digest(
+                    self.headers.get("X-Gitlab-Token", "").encode("utf-8"),
+                    receiver.secret.encode("utf-8"),
+                ):
+                    self._respond(401, "invalid token")
+                    return
+
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > MAX_BODY_BYTES:
+                    self._respond(413, "payload too large")
+                    return
+                try:
+                    payload = json.loads(self.rfile.read(length))
+                    queued = receiver.submit(
+                        self.headers.get("X-Gitlab-Event", ""), payload
+                    )
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    self._respond(400, "invalid payload")
+                    return
+
+                self._respond(202, "queued" if queued else "ignored")
+
+            def _respond(self, status: int, message: str):
+                body = json.dumps({"status": message}).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return WebhookHandler
@@ -0,0 +1,90 @@
+import collections
+import heapq
+import random
+
+from typing import Iterable, List, Optional
+
+
+class WorkloadIndex:
+    """
+    How many open issues and merge requests are assigned to each user,
+    used to hand new work to the least loaded project member. Each
+    project's members are kept in a heap ordered by load, and a member's
+    load is counted up as soon as they are chosen, so each choice takes
+    logarithmic time however many are made in a run.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        # Records without an assignee seen while loading from a full
+        # listing, by dataset, for the tasks that assign them
+        self.unassigned = {}
+        self._loads = collections.Counter()
+        self._heaps = {}
+        self._random = random.SystemRandom()
+
+    def load(self, records: Iterable[tuple]) -> List[tuple]:
+        """
+        Counts the assignees of the given open issues or merge requests,
+        returning those that have none.
+        """
+
+        unassigned = []
+        for record in records:
+            assignees = {user.id for user in record.assignees}
+            if record.assignee is not None:
+                assignees.add(record.assignee.id)
+            if assignees:
+                self._loads.update(assignees)
+            else:
+                unassigned.append(record)
+        self.loaded = True
+        return unassigned
+
+    def load_of(self, user_id: int) -> int:
+        return self._loads[user_id]
+
+    def choose(
+        self,
+        project_id: int,
+        project_members: list,
+        exclude: Optional[int] = None,
+    ) -> Optional[int]:
+        """
+        Returns the id of the project member with the fewest open issues
+        and merge requests, other than the excluded user, counting the
+        new assignment against them. Ties are broken at random. Returns
+        None if nobody is eligible.
+        """
+
+        heap = self._heaps.get(project_id)
+        if heap is None:
+            heap = [
+                (self._loads[member.id], self._random.random(), member.id)
+                for member in project_members
+            ]
+            heapq.heapify(heap)
+            self._heaps[project_id] = heap
+
+        skipped = []
+        chosen = None
+        while heap:
+            load, tiebreak, user_id = heapq.heappop(heap)
+            if load != self._loads[user_id]:
+                # The member was chosen for another project since this
+                # entry was pushed, so it goes back with their new load
+                heapq.heappush(heap, (self._loads[user_id], tiebreak, user_id))
+            elif user_id == exclude:
+                skipped.append((load, tiebreak, user_id))
+            else:
+                chosen = user_id
+                break
+
+        if chosen is not None:
+            self._loads[chosen] += 1
+            heapq.heappush(
+                heap, (self._loads[chosen], self._random.random(), chosen)
+            )
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        return chosen
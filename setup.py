@@ -16,8 +16,14 @@ setuptools.setup(
     entry_points={
         "console_scripts": ["gitlab-attendant=gitlab_attendant.main:main"]
     },
-    packages=setuptools.find_packages(),
-    install_requires=["requests", "pytz", "python-dateutil", "schedule==0.5.0"],
+    packages=setuptools.find_packages(exclude=("benchmarks",)),
+    install_requires=[
+        "requests",
+        "pytz",
+        "python-dateutil",
+        "schedule==0.5.0",
+        'contextvars; python_version < "3.7"',
+    ],
     tests_require=["unittest", "mock", "pytz"],
     classifiers=(
         "Environment :: Console",